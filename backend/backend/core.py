@@ -5,3 +5,24 @@ class HTTPMethod:
     PATCH = 'PATCH'
     PUT = 'PUT'
     DELETE = 'DELETE'
+
+
+class MaintainedFieldsMixin:
+    """Не пишет при сохранении поля, которые база меняет сама.
+
+    Счётчики и маски меняются запросами с F() и триггерами, поэтому
+    сохранение уже существующего объекта без update_fields обновляет все
+    поля, кроме maintained_fields: иначе оно вернуло бы значения,
+    прочитанные до чужих изменений.
+    """
+    maintained_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and not kwargs.get('force_insert')
+                and kwargs.get('update_fields') is None and not args):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.maintained_fields
+            ]
+        super().save(*args, **kwargs)
@@ -47,6 +47,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'foodgram.middleware.RateLimitHeadersMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -83,6 +84,19 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'foodgram-local',
+    },
+}
+
 
 # Password validation
 
@@ -122,6 +136,9 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'backend_static')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Uploads are named by content hash under MEDIA_HASHED_DIR and never change
+DEFAULT_FILE_STORAGE = 'foodgram.storage.HashedStorage'
+MEDIA_HASHED_DIR = 'hashed'
 
 # Custom User model
 
@@ -134,13 +151,88 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'foodgram.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'foodgram.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'foodgram.throttling.AnonBucketThrottle',
+        'foodgram.throttling.UserBucketThrottle',
+        'foodgram.throttling.ScopedBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': os.getenv('THROTTLE_ANON_RATE', '600/min'),
+        'user': os.getenv('THROTTLE_USER_RATE', '1200/min'),
+        'login': os.getenv('THROTTLE_LOGIN_RATE', '10/min'),
+        'shopping_cart': os.getenv('THROTTLE_SHOPPING_CART_RATE', '20/min'),
+    },
+    # Client IP is the X-Forwarded-For entry added by the nginx in front
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 1)),
 }
 
 
-# Shopping list filename
+# Shopping list filename, the extension follows the requested format
 SHOPPING_LIST_FILENAME = 'shopping_list.txt'
+SHOPPING_LIST_PDF_FONT = os.path.join(BASE_DIR, 'data', 'fonts', 'DejaVuSans.ttf')
+
+# Largest ?limit= accepted by numbered recipe pages and by cursor pages
+PAGE_MAX_SIZE = 100
+
+# Recipes shown for each author on the subscriptions page
+SUBSCRIPTION_RECIPES_LIMIT = 3
+SUBSCRIPTION_RECIPES_MAX_LIMIT = 30
+
+# Ingredient autocomplete
+INGREDIENT_SEARCH_LIMIT = 20
+INGREDIENT_SEARCH_MAX_LIMIT = 100
+INGREDIENT_FUZZY_MIN_RESULTS = 3
+INGREDIENT_FUZZY_MIN_LENGTH = 3
+INGREDIENT_FUZZY_CANDIDATES = 200
+INGREDIENT_FUZZY_TIME_BUDGET = 0.02
+
+# Recipe image variants: name -> (width, height, crop to the exact size)
+RECIPE_IMAGE_VARIANTS = {
+    'card': (480, 320, True),
+    'detail': (1200, 1200, False),
+}
+RECIPE_IMAGE_VARIANTS_DIR = 'recipes/variants'
+RECIPE_IMAGE_PLACEHOLDER_SIZE = 16
+
+# Uploaded recipe images: file size in bytes and decoded size in pixels
+RECIPE_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+RECIPE_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+
+# Full-text recipe search: words taken from the query
+RECIPE_SEARCH_MAX_TERMS = 8
+
+# Cached responses for anonymous visitors, seconds; 0 turns the cache off
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 60))
+
+# Users of API tokens kept in the cache, seconds; 0 turns the cache off
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', 300))
+
+# Cache alias holding the throttle buckets: 'default' is shared between
+# processes when CACHE_BACKEND is set, 'local' keeps them per process
+THROTTLE_CACHE = os.getenv('THROTTLE_CACHE', 'default')
+
+# CPU-heavy requests run at once by all processes sharing THROTTLE_CACHE,
+# seconds to wait for a slot, and seconds before a leaked slot count resets
+CONCURRENCY_LIMITS = {
+    'login': int(os.getenv('CONCURRENCY_LOGIN', 4)),
+    'upload': int(os.getenv('CONCURRENCY_UPLOAD', 2)),
+}
+CONCURRENCY_WAIT = 2
+CONCURRENCY_SLOT_TIMEOUT = 60
+
+# Recipe ids accepted by one bulk favorite or shopping cart request
+RELATIONS_BULK_MAX_SIZE = 500
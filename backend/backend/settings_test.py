@@ -0,0 +1,14 @@
+"""Настройки для тестов и замеров: SQLite и ключ только для разработки."""
+import os
+
+from backend.settings import *  # noqa: F401, F403
+from backend.settings import BASE_DIR
+
+SECRET_KEY = 'foodgram-test-secret-key'
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+    }
+}
@@ -0,0 +1,144 @@
+"""Пиковая память процесса при загрузке фотографии рецепта.
+
+Каждый способ загрузки замеряется в отдельном процессе. Перед запросом
+пик памяти сбрасывается через /proc/self/clear_refs, а после запроса
+из VmHWM вычитается текущий объём памяти до запроса. Тело запроса
+строится заранее и в замер не входит. С ключом --without-variants
+копии изображения не создаются, и замер показывает только разбор
+запроса и проверку файла.
+"""
+import argparse
+import base64
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+from unittest import mock
+
+from benchmarks.utils import setup, test_database
+
+MODES = ('base64', 'multipart')
+
+
+def make_photo(width, height):
+    from PIL import Image
+
+    image = Image.merge('RGB', [
+        Image.effect_noise((width, height), sigma).convert('L')
+        for sigma in (40, 60, 80)
+    ])
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=92)
+    return buffer.getvalue()
+
+
+def build_request(mode, photo, user, tag, ingredient):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    payload = {
+        'tags': [tag.id],
+        'name': 'Фото',
+        'text': 'Замер загрузки',
+        'cooking_time': 5,
+    }
+    ingredients = [{'id': ingredient.id, 'amount': 1}]
+    if mode == 'base64':
+        payload['ingredients'] = ingredients
+        payload['image'] = (
+            f'data:image/jpeg;base64,{base64.b64encode(photo).decode()}'
+        )
+        request = APIRequestFactory().post(
+            '/api/recipes/', payload, format='json'
+        )
+    else:
+        payload['ingredients'] = json.dumps(ingredients)
+        payload['image'] = SimpleUploadedFile(
+            'photo.jpg', photo, content_type='image/jpeg'
+        )
+        request = APIRequestFactory().post(
+            '/api/recipes/', payload, format='multipart'
+        )
+    force_authenticate(request, user)
+    return request
+
+
+def memory(field):
+    """VmRSS или VmHWM процесса в мегабайтах."""
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(f'{field}:'):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError(f'В /proc/self/status нет {field}')
+
+
+def reset_peak():
+    with open('/proc/self/clear_refs', 'w') as clear_refs:
+        clear_refs.write('5')
+
+
+def measure(mode, width, height, without_variants):
+    setup()
+    from django.conf import settings
+
+    from foodgram.models import Ingredient, Tag
+    from foodgram.views import RecipeViewSet
+    from users.models import User
+
+    settings.RECIPE_IMAGE_MAX_SIZE = 64 * 1024 * 1024
+    settings.MEDIA_ROOT = tempfile.mkdtemp()
+    view = RecipeViewSet.as_view({'post': 'create'})
+    with test_database():
+        user = User.objects.create_user(
+            username='bench', email='bench@foodgram.test', password='x'
+        )
+        tag = Tag.objects.create(name='Тег', color='#000000', slug='tag')
+        ingredient = Ingredient.objects.create(
+            name='Соль', measurement_unit='г'
+        )
+        photo = make_photo(width, height)
+        request = build_request(mode, photo, user, tag, ingredient)
+        patch = mock.patch('foodgram.signals.update_variants')
+        if without_variants:
+            patch.start()
+        reset_peak()
+        baseline = memory('VmRSS')
+        start = time.perf_counter()
+        response = view(request)
+        elapsed = time.perf_counter() - start
+        peak = memory('VmHWM')
+        request.close()
+        assert response.status_code == 201, response.data
+        print(
+            f'{mode:<10} файл={len(photo) / 2 ** 20:5.1f} МБ '
+            f'пик +{peak - baseline:6.1f} МБ '
+            f'время={elapsed * 1000:7.1f} мс'
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--mode', choices=MODES)
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--without-variants', action='store_true')
+    args = parser.parse_args()
+    if args.mode:
+        measure(args.mode, args.width, args.height, args.without_variants)
+        return
+    for mode in MODES:
+        command = [
+            sys.executable, '-m', 'benchmarks.image_upload',
+            '--mode', mode,
+            '--width', str(args.width),
+            '--height', str(args.height),
+        ]
+        if args.without_variants:
+            command.append('--without-variants')
+        subprocess.run(command, check=True)
+
+
+if __name__ == '__main__':
+    main()
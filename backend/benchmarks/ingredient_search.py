@@ -0,0 +1,87 @@
+"""Задержка подсказок ингредиентов при наборе запроса по буквам.
+
+Для каждого запроса из QUERIES отправляются все его префиксы, как если бы
+пользователь набирал слово в поле поиска. Сравнивается прежний
+SearchFilter по name (icontains) и поиск по нормализованному полю.
+Отдельно замеряются запросы с опечатками, для которых срабатывает
+нечёткий поиск.
+"""
+from csv import reader
+
+from benchmarks.utils import report, setup, test_database, timed
+
+QUERIES = ('сахар', 'молоко', 'мука пшеничная', 'яйца', 'ёжевика', 'сыр')
+TYPOS = ('мaнго', 'карофель', 'малако', 'пшенчная мука', 'сахр', 'чеснак')
+ROUNDS = 5
+
+
+def load_ingredients():
+    from foodgram.models import Ingredient
+    from foodgram.search import normalize_name
+
+    with open('data/ingredients.csv', encoding='UTF-8') as rows:
+        Ingredient.objects.bulk_create(
+            Ingredient(
+                name=name,
+                measurement_unit=unit,
+                search_name=normalize_name(name)
+            )
+            for name, unit in (row for row in reader(rows) if len(row) == 2)
+        )
+    return Ingredient.objects.count()
+
+
+def keystrokes():
+    for query in QUERIES:
+        for end in range(1, len(query) + 1):
+            yield query[:end]
+
+
+def main():
+    setup()
+    from rest_framework import filters, mixins
+    from rest_framework.test import APIRequestFactory
+
+    from foodgram.views import IngredientsViewSet
+
+    class LegacyFilter(filters.SearchFilter):
+        search_param = 'name'
+
+    class LegacyViewSet(IngredientsViewSet):
+        filter_backends = (LegacyFilter,)
+        search_fields = ('^name', 'name')
+
+        def list(self, request, *args, **kwargs):
+            # Обычный список с фильтром, а не справочник из кэша.
+            return mixins.ListModelMixin.list(
+                self, request, *args, **kwargs
+            )
+
+    views = (
+        ('SearchFilter (icontains)', LegacyViewSet.as_view({'get': 'list'})),
+        ('search_name + ранжирование',
+         IngredientsViewSet.as_view({'get': 'list'})),
+    )
+    factory = APIRequestFactory()
+    with test_database():
+        print(f'Ингредиентов: {load_ingredients()}')
+        for title, view in views:
+            timings = []
+            for _ in range(ROUNDS):
+                for prefix in keystrokes():
+                    request = factory.get(
+                        '/api/ingredients/', {'name': prefix}
+                    )
+                    timings.append(timed(lambda: view(request).render()))
+            report(title, timings)
+        view = views[-1][1]
+        timings = []
+        for _ in range(ROUNDS):
+            for query in TYPOS:
+                request = factory.get('/api/ingredients/', {'name': query})
+                timings.append(timed(lambda: view(request).render()))
+        report('опечатки (нечёткий поиск)', timings)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Кодирование и разбор JSON для страницы из 100 рецептов.
+
+Данные — вывод RecipeGetSerializer с вложенными автором, тегами и
+ингредиентами, как в списке рецептов. Сравниваются стандартный
+JSONRenderer DRF и FastJSONRenderer на orjson, если он установлен, а
+также соответствующие парсеры на теле того же ответа.
+"""
+import argparse
+from io import BytesIO
+
+from benchmarks.utils import report, seed_recipes, setup, test_database, timed
+
+
+def build_payload(recipes):
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from foodgram.models import Recipe
+    from foodgram.serializers import RecipeGetSerializer
+
+    request = Request(APIRequestFactory().get('/api/recipes/'))
+    queryset = Recipe.objects.with_related(request.user)[:recipes]
+    return RecipeGetSerializer(
+        queryset, many=True, context={'request': request}
+    ).data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=300)
+    args = parser.parse_args()
+    setup()
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from foodgram import renderers
+    from foodgram.parsers import FastJSONParser
+    from foodgram.renderers import FastJSONRenderer
+
+    with test_database():
+        seed_recipes(args.recipes)
+        payload = build_payload(args.recipes)
+    content = JSONRenderer().render(payload)
+    print(
+        f'Рецептов: {len(payload)}, размер ответа: {len(content)} байт, '
+        f'orjson: {"есть" if renderers.orjson else "нет"}'
+    )
+    codecs = (
+        ('json', JSONRenderer(), JSONParser()),
+        ('orjson', FastJSONRenderer(), FastJSONParser()),
+    )
+    if renderers.orjson is None:
+        codecs = codecs[:1]
+    for name, renderer, parser in codecs:
+        assert renderer.render(payload) == content
+        report(f'{name}: кодирование', [
+            timed(renderer.render, payload) for _ in range(args.rounds)
+        ])
+        report(f'{name}: разбор', [
+            timed(lambda: parser.parse(BytesIO(content)))
+            for _ in range(args.rounds)
+        ])
+
+
+if __name__ == '__main__':
+    main()
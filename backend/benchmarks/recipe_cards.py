@@ -0,0 +1,49 @@
+"""Скорость сборки карточек рецептов: RecipeGetSerializer и recipe_cards.
+
+Обычный путь загружает модели через with_related и проходит поля DRF
+для каждого рецепта, автора, тега и ингредиента. Быстрый путь собирает
+словари из строк as_cards и трёх запросов за связями. Замер включает
+запросы к базе и выводит, сколько рецептов собирается в секунду.
+"""
+import argparse
+
+from benchmarks.utils import report, seed_recipes, setup, test_database, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=1000)
+    parser.add_argument('--page', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=100)
+    args = parser.parse_args()
+    setup()
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from foodgram.models import Recipe
+    from foodgram.serializers import RecipeGetSerializer
+
+    request = Request(APIRequestFactory().get('/api/recipes/'))
+    context = {'request': request}
+    paths = (
+        ('RecipeGetSerializer', lambda: RecipeGetSerializer(
+            list(Recipe.objects.with_related(request.user)[:args.page]),
+            many=True, context=context
+        ).data),
+        ('recipe_cards', lambda: RecipeGetSerializer(
+            list(Recipe.objects.as_cards(request.user)[:args.page]),
+            many=True, context=context
+        ).data),
+    )
+    with test_database():
+        seed_recipes(args.recipes)
+        print(f'Рецептов: {args.recipes}, на странице: {args.page}')
+        for title, build in paths:
+            build()
+            timings = [timed(build) for _ in range(args.rounds)]
+            speed = args.page * len(timings) / sum(timings) * 1000
+            report(f'{title}: {speed:6.0f} рец/с', timings)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Пропускная способность анонимного списка рецептов с кэшем ответов и без.
+
+Анонимы запрашивают первую страницу рецептов с несколькими популярными
+наборами тегов и без них. Без кэша каждый запрос идёт в базу и
+сериализуется заново, с кэшем — после первого промаха отдаётся готовое
+тело ответа. Между проходами часть рецептов правится, чтобы было видно
+цену промахов после точечного сброса.
+"""
+import argparse
+import time
+
+from benchmarks.utils import (report, seed_recipes, setup, test_database,
+                              timed)
+
+QUERIES = (
+    {'limit': 6},
+    {'limit': 6, 'tags': ['tag-0']},
+    {'limit': 6, 'tags': ['tag-1', 'tag-2']},
+    {'limit': 6, 'tags': ['tag-0', 'tag-2'], 'tags_mode': 'all'},
+    {'limit': 6, 'page': 2},
+)
+
+
+def fetch(view, request):
+    """Ответ из кэша уже готов, построенный заново нужно отрисовать."""
+    response = view(request)
+    if hasattr(response, 'render'):
+        response.render()
+    return response
+
+
+def run(view, factory, rounds, writes):
+    from foodgram.models import Recipe
+
+    timings = []
+    start = time.perf_counter()
+    for number in range(rounds):
+        if writes and number % writes == 0:
+            recipe = Recipe.objects.order_by('?').first()
+            recipe.cooking_time += 1
+            recipe.save()
+        for query in QUERIES:
+            request = factory.get('/api/recipes/', query)
+            timings.append(timed(fetch, view, request))
+    return timings, len(timings) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument(
+        '--writes', type=int, default=20,
+        help='Править один рецепт раз в столько проходов, 0 — не править'
+    )
+    args = parser.parse_args()
+    setup()
+    from django.core.cache import cache
+    from django.test.utils import override_settings
+    from rest_framework.test import APIRequestFactory
+
+    from foodgram.views import RecipeViewSet
+
+    view = RecipeViewSet.as_view({'get': 'list'})
+    factory = APIRequestFactory()
+    with test_database():
+        seed_recipes(args.recipes)
+        print(f'Рецептов: {args.recipes}, запросов за проход: {len(QUERIES)}')
+        for title, timeout in (('без кэша', 0), ('с кэшем', 60)):
+            cache.clear()
+            RecipeViewSet.response_cache.reset_stats()
+            with override_settings(RESPONSE_CACHE_TIMEOUT=timeout):
+                timings, throughput = run(
+                    view, factory, args.rounds, args.writes
+                )
+            report(f'{title}: {throughput:7.0f} запр/с', timings)
+            if timeout:
+                stats = RecipeViewSet.response_cache.stats()
+                print(
+                    f'попаданий {stats["hits"]}, промахов {stats["misses"]}'
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Запросы к базе и время аутентифицированного запроса с кэшем токенов и без.
+
+Пользователи по очереди запрашивают свой профиль. Без кэша каждый
+запрос ищет токен вместе с пользователем в базе, с кэшем — только
+первый запрос каждого токена до истечения таймаута.
+"""
+import argparse
+import time
+
+from benchmarks.utils import report, setup, test_database, timed
+
+
+def fetch(view, request):
+    view(request).render()
+
+
+def run(view, factory, tokens, rounds):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    timings = []
+    start = time.perf_counter()
+    with CaptureQueriesContext(connection) as context:
+        for _ in range(rounds):
+            for key in tokens:
+                request = factory.get(
+                    '/api/users/me/', HTTP_AUTHORIZATION=f'Token {key}'
+                )
+                timings.append(timed(fetch, view, request))
+    throughput = len(timings) / (time.perf_counter() - start)
+    return timings, throughput, len(context.captured_queries) / len(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=40)
+    args = parser.parse_args()
+    setup()
+    from django.core.cache import cache
+    from django.test.utils import override_settings
+    from rest_framework.authtoken.models import Token
+    from rest_framework.test import APIRequestFactory
+
+    from users.authentication import TOKEN_STATS
+    from users.models import User
+    from users.views import UserViewSet
+
+    view = UserViewSet.as_view({'get': 'me'})
+    factory = APIRequestFactory()
+    with test_database():
+        User.objects.bulk_create(
+            User(username=f'user{number}', email=f'user{number}@bench.test')
+            for number in range(args.users)
+        )
+        tokens = [
+            Token.objects.create(user=user).key
+            for user in User.objects.all()
+        ]
+        print(f'Пользователей: {args.users}, проходов: {args.rounds}')
+        for title, timeout in (('без кэша', 0), ('с кэшем', 300)):
+            cache.clear()
+            TOKEN_STATS.reset_stats()
+            with override_settings(TOKEN_CACHE_TIMEOUT=timeout):
+                timings, throughput, queries = run(
+                    view, factory, tokens, args.rounds
+                )
+            report(
+                f'{title}: {throughput:6.0f} запр/с, '
+                f'{queries:.2f} SQL', timings
+            )
+            if timeout:
+                stats = TOKEN_STATS.stats()
+                print(
+                    f'попаданий {stats["hits"]}, промахов {stats["misses"]}'
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Общие помощники для замеров производительности.
+
+Замеры запускаются из каталога backend как модули, например
+python -m benchmarks.ingredient_search, и работают на отдельной
+тестовой базе, которую создают и удаляют сами.
+"""
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings_test')
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """Создаёт тестовую базу на время замера."""
+    from django.test.utils import (setup_test_environment,
+                                   teardown_test_environment)
+    from django.db import connection
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def timed(func, *args, **kwargs):
+    """Время вызова в миллисекундах."""
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000
+
+
+def report(title, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) > 1 else (
+        timings[0]
+    )
+    print(
+        f'{title:<32} n={len(timings):<5} '
+        f'p50={statistics.median(timings):7.2f} мс '
+        f'p95={p95:7.2f} мс max={timings[-1]:7.2f} мс'
+    )
+
+
+def seed_recipes(recipes):
+    """Рецепты с тегами tag-0..tag-3, ингредиентами и авторами."""
+    from foodgram.models import (Ingredient, IngredientsRecipe, Recipe, Tag,
+                                 TagRecipe)
+    from users.models import User
+
+    tags = [
+        Tag.objects.create(
+            name=f'Тэг {number}', color=f'#00000{number}', slug=f'tag-{number}'
+        )
+        for number in range(4)
+    ]
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+        for number in range(50)
+    )
+    ingredients = list(Ingredient.objects.all())
+    User.objects.bulk_create(
+        User(username=f'author{number}', email=f'author{number}@bench.test')
+        for number in range(max(recipes // 10, 1))
+    )
+    authors = list(User.objects.all())
+    Recipe.objects.bulk_create(
+        Recipe(
+            author=authors[number % len(authors)],
+            name=f'Рецепт {number}',
+            text='Текст рецепта',
+            cooking_time=number % 60 + 1,
+            image=f'recipes/images/{number}.jpg'
+        )
+        for number in range(recipes)
+    )
+    created = list(Recipe.objects.all())
+    TagRecipe.objects.bulk_create(
+        TagRecipe(recipe=recipe, tag=tags[(number + shift) % len(tags)])
+        for number, recipe in enumerate(created)
+        for shift in (0, 1)
+    )
+    IngredientsRecipe.objects.bulk_create(
+        IngredientsRecipe(
+            recipe=recipe,
+            ingredient=ingredients[(number + shift) % len(ingredients)],
+            amount=10
+        )
+        for number, recipe in enumerate(created)
+        for shift in range(5)
+    )
+    return created
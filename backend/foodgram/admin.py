@@ -1,5 +1,7 @@
 from django.contrib import admin
-from foodgram.models import Ingredient, Recipe, Tag, Favorite, ShoppingList
+from foodgram.models import (Favorite, Ingredient, Recipe, ShoppingCartItem,
+                             ShoppingList, Tag)
+from foodgram.response_cache import invalidate_recipe
 
 
 class TagInline(admin.TabularInline):
@@ -34,7 +36,8 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = (
         'name',
         'author',
-        'count_favorite'
+        'favorites_count',
+        'in_carts_count'
     )
     list_filter = ('tags',)
     search_fields = (
@@ -48,8 +51,13 @@ class RecipeAdmin(admin.ModelAdmin):
         IngredientsInline
     )
 
-    def count_favorite(self, obj):
-        return obj.favorites.all().count()
+    def save_related(self, request, form, formsets, change):
+        """Теги из вставок пишутся после рецепта, ответы по ним сбросить."""
+        super().save_related(request, form, formsets, change)
+        recipe = form.instance
+        recipe.replaced_tags_mask = recipe.tags_mask
+        recipe.refresh_from_db(fields=('tags_mask',))
+        invalidate_recipe(recipe)
 
 
 class FavoriteAdmin(admin.ModelAdmin):
@@ -76,8 +84,27 @@ class ShoppingListAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+class ShoppingCartItemAdmin(admin.ModelAdmin):
+    list_display = (
+        'user',
+        'ingredient',
+        'total_amount',
+    )
+    search_fields = (
+        'user__username',
+        'user__email'
+    )
+    readonly_fields = (
+        'user',
+        'ingredient',
+        'total_amount',
+    )
+    empty_value_display = '-пусто-'
+
+
 admin.site.register(Favorite, FavoriteAdmin)
 admin.site.register(ShoppingList, ShoppingListAdmin)
+admin.site.register(ShoppingCartItem, ShoppingCartItemAdmin)
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(Tag, TagAdmin)
 admin.site.register(Ingredient, IngredientAdmin)
@@ -1,5 +1,22 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
+
+
+def install_triggers(sender, using, **kwargs):
+    """Восстанавливает триггеры SQLite после пересоздания таблиц."""
+    from foodgram import fulltext, tagmask, timestamps
+    from foodgram.triggers import execute
+
+    if connections[using].vendor != 'sqlite':
+        return
+    for module in (fulltext, tagmask, timestamps):
+        execute(module.SQLITE, using)
 
 
 class FoodgramConfig(AppConfig):
     name = 'foodgram'
+
+    def ready(self):
+        import foodgram.signals  # noqa: F401
+        post_migrate.connect(install_triggers, sender=self)
@@ -0,0 +1,115 @@
+"""Данные, которые строятся один раз на процесс и живут до смены версии.
+
+Версия хранится в кэше Django. При общем кэше (Redis, memcached) смену
+версии видят все процессы приложения, при локальном — только текущий.
+"""
+import hashlib
+import json
+from threading import Lock
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+
+
+class VersionedCache:
+
+    def __init__(self, name, build):
+        self.key = f'foodgram:{name}-version'
+        self.build = build
+        self.value = None
+        self.version = None
+        self.lock = Lock()
+
+    def get(self):
+        version = cache.get(self.key, 0)
+        value = self.value
+        if value is None or self.version != version:
+            with self.lock:
+                if self.value is None or self.version != version:
+                    self.value = self.build()
+                    self.version = version
+                value = self.value
+        return value
+
+    def bump(self):
+        self.value = None
+        try:
+            cache.incr(self.key)
+        except ValueError:
+            cache.set(self.key, 1, None)
+
+    def invalidate(self):
+        """Сбрасывает значение сразу и ещё раз после фиксации транзакции.
+
+        Повторный сброс не даёт закрепиться значению, которое другой
+        запрос успел построить из ещё не зафиксированных данных.
+        """
+        self.bump()
+        transaction.on_commit(self.bump)
+
+
+class HitCounter:
+    """Попадания и промахи кэша в счётчиках кэша Django.
+
+    При общем кэше счётчики суммируются по всем процессам приложения.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.counters = {
+            outcome: f'foodgram:stats:{name}:{outcome}'
+            for outcome in ('hits', 'misses')
+        }
+
+    def count(self, outcome):
+        key = self.counters[outcome]
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, None)
+
+    def stats(self):
+        values = cache.get_many(list(self.counters.values()))
+        return {
+            outcome: values.get(key, 0)
+            for outcome, key in self.counters.items()
+        }
+
+    def reset_stats(self):
+        cache.delete_many(list(self.counters.values()))
+
+
+def make_etag(data):
+    """Сильный ETag по содержимому ответа."""
+    content = json.dumps(data, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+class CatalogSnapshot:
+
+    def __init__(self, data):
+        self.data = data
+        self.etag = make_etag(data)
+        self.by_id = {item['id']: item for item in data}
+        self.etags = {item['id']: make_etag(item) for item in data}
+
+    def get_item(self, pk):
+        try:
+            return self.by_id[int(pk)]
+        except (KeyError, ValueError):
+            raise Http404
+
+
+class Catalog(VersionedCache):
+    """Весь справочник в том виде, в каком его отдаёт сериализатор."""
+
+    def __init__(self, name, queryset, serializer_class):
+        super().__init__(name, self.serialize)
+        self.queryset = queryset
+        self.serializer_class = serializer_class
+
+    def serialize(self):
+        return CatalogSnapshot(
+            self.serializer_class(self.queryset.all(), many=True).data
+        )
@@ -0,0 +1,92 @@
+"""Условные GET-запросы по версиям данных без сериализации ответа.
+
+Вьюсет описывает, от чего зависит ответ: времена изменения объектов,
+число и последний id связей просматривающего (избранное, покупки,
+подписки) и ETag справочников. Из этого одним-двумя запросами
+строится ETag, и при совпадении с If-None-Match сразу отдаётся 304.
+Связи только добавляются и удаляются, а id растут, поэтому пара
+«число, последний id» меняется при любой их правке.
+
+Списки по курсору версию не считают: она требует подсчёта строк,
+от которого такой постраничный вывод как раз избавляет.
+
+Last-Modified отдаётся только анониму и только для отдельного объекта:
+флаги просматривающего меняются без отметки времени, а удаление из
+списка не сдвигает наибольшее время изменения.
+"""
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from users.models import User
+
+from foodgram.cache import make_etag
+
+
+def relation_version(user, relations):
+    """Число и последний id связей user для пар (модель, поле владельца).
+
+    Все значения считаются одним запросом к таблице пользователей.
+    """
+    annotations = {}
+    for number, (model, field) in enumerate(relations):
+        rows = model.objects.filter(**{field: OuterRef('pk')}).order_by(
+        ).values(field)
+        annotations[f'count_{number}'] = Subquery(
+            rows.annotate(total=Count('pk')).values('total')
+        )
+        annotations[f'last_{number}'] = Subquery(
+            rows.annotate(last=Max('pk')).values('last')
+        )
+    row = User.objects.filter(pk=user.pk).annotate(**annotations).values(
+        *annotations
+    ).first()
+    return [row[name] for name in annotations] if row else None
+
+
+class ConditionalGetMixin:
+    """ETag, Last-Modified и 304 для list и retrieve.
+
+    Наследник определяет get_list_version и get_detail_version: они
+    возвращают пару (список значений версии, время изменения или None)
+    или None, если версию посчитать нельзя и ответ строится как обычно.
+    """
+
+    def get_list_version(self):
+        return None
+
+    def get_detail_version(self):
+        return None
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(
+            self.get_list_version(), super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(
+            self.get_detail_version(), super().retrieve,
+            request, *args, **kwargs
+        )
+
+    def conditional(self, version, view, request, *args, **kwargs):
+        if version is None:
+            return view(request, *args, **kwargs)
+        data, modified = version
+        etag = quote_etag(make_etag(
+            [request.user.pk, [str(value) for value in data]]
+        ))
+        last_modified = None
+        if request.user.is_anonymous and modified is not None:
+            last_modified = int(modified.timestamp())
+        response = get_conditional_response(
+            request._request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = view(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Authorization',))
+        return response
@@ -0,0 +1,138 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from drf_base64.fields import Base64ImageField
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
+
+from foodgram.uploads import too_large_error
+
+UNKNOWN_IDS_ERROR = 'Объекты с id {pk_values} не существуют'
+IMAGE_TOO_BIG = 'Изображение больше {pixels} мегапикселей'
+
+
+def to_pk(queryset, value):
+    """Значение первичного ключа или None, если value им быть не может."""
+    if isinstance(value, bool):
+        return None
+    try:
+        return queryset.model._meta.pk.to_python(value)
+    except (DjangoValidationError, TypeError, ValueError):
+        return None
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField, который загружает объекты пачкой.
+
+    С many=True все id списка загружаются одним запросом in_bulk.
+    Внутри BulkListSerializer объекты для всех элементов загружает
+    родительский список и кладёт в preloaded.
+    """
+    default_error_messages = {'does_not_exist_many': UNKNOWN_IDS_ERROR}
+    preloaded = None
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def to_internal_value(self, data):
+        if self.preloaded is None:
+            return super().to_internal_value(data)
+        pk = to_pk(self.get_queryset(), data)
+        if pk is None:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in self.preloaded:
+            self.fail('does_not_exist', pk_value=data)
+        return self.preloaded[pk]
+
+    def load(self, values):
+        """Объекты для values одним запросом, все неизвестные id — в ошибке."""
+        queryset = self.get_queryset()
+        pks = [to_pk(queryset, value) for value in values]
+        objects = queryset.in_bulk([pk for pk in pks if pk is not None])
+        missing = [
+            str(value) for pk, value in zip(pks, values)
+            if pk is not None and pk not in objects
+        ]
+        if missing:
+            self.fail('does_not_exist_many', pk_values=', '.join(missing))
+        return objects
+
+
+class BulkManyRelatedField(ManyRelatedField):
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        self.child_relation.preloaded = self.child_relation.load(data)
+        try:
+            return [
+                self.child_relation.to_internal_value(item) for item in data
+            ]
+        finally:
+            self.child_relation.preloaded = None
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """Список, в котором связанные объекты всех элементов грузятся пачкой."""
+
+    def to_internal_value(self, data):
+        fields = [
+            field for field in self.child.fields.values()
+            if isinstance(field, BulkPrimaryKeyRelatedField)
+        ]
+        if not isinstance(data, list) or not fields:
+            return super().to_internal_value(data)
+        for field in fields:
+            field.preloaded = field.load([
+                item[field.field_name] for item in data
+                if isinstance(item, dict) and field.field_name in item
+            ])
+        try:
+            return super().to_internal_value(data)
+        finally:
+            for field in fields:
+                field.preloaded = None
+
+
+class RecipeImageField(Base64ImageField):
+    """Изображение из base64 или из multipart с проверкой размеров.
+
+    Длина строки base64 проверяется до декодирования, а размеры в
+    пикселях — по заголовку файла, до разбора самого изображения.
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, str) and data.startswith('data:'):
+            encoded_size = len(data) - data.find(',') - 1
+            if encoded_size * 3 // 4 > settings.RECIPE_IMAGE_MAX_SIZE:
+                raise serializers.ValidationError(too_large_error())
+            try:
+                data = self._decode(data)
+            except ValueError:
+                self.fail('invalid_image')
+        if getattr(data, 'size', 0) > settings.RECIPE_IMAGE_MAX_SIZE:
+            raise serializers.ValidationError(too_large_error())
+        self.check_pixels(data)
+        return super().to_internal_value(data)
+
+    def check_pixels(self, data):
+        if not hasattr(data, 'seek'):
+            return
+        try:
+            width, height = Image.open(data).size
+        except Image.DecompressionBombError:
+            width = height = settings.RECIPE_IMAGE_MAX_PIXELS
+        except (OSError, ValueError):
+            self.fail('invalid_image')
+        finally:
+            data.seek(0)
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            raise serializers.ValidationError(IMAGE_TOO_BIG.format(
+                pixels=settings.RECIPE_IMAGE_MAX_PIXELS // 1000000
+            ))
@@ -1,8 +1,13 @@
 from django_filters import rest_framework as filter
-from rest_framework import filters
 
+from foodgram.fulltext import search_recipes
 from foodgram.models import Recipe, Tag
 
+TAGS_MODES = (
+    ('any', 'Любой из тегов'),
+    ('all', 'Все теги'),
+)
+
 
 class RecipeFilter(filter.FilterSet):
     author = filter.CharFilter()
@@ -10,7 +15,13 @@ class RecipeFilter(filter.FilterSet):
         field_name='tags__slug',
         queryset=Tag.objects.all(),
         label='Tags',
-        to_field_name='slug'
+        to_field_name='slug',
+        method='get_tags'
+    )
+    tags_mode = filter.ChoiceFilter(
+        choices=TAGS_MODES,
+        method='get_tags_mode',
+        label='Tags mode'
     )
     is_favorited = filter.BooleanFilter(
         method='get_favorite',
@@ -19,16 +30,31 @@ class RecipeFilter(filter.FilterSet):
     is_in_shopping_cart = filter.BooleanFilter(
         method='get_is_in_shopping_cart',
     )
+    search = filter.CharFilter(
+        method='get_search',
+        label='Search'
+    )
 
     class Meta:
         model = Recipe
         fields = (
             'author',
             'tags',
+            'tags_mode',
             'is_favorited',
-            'is_in_shopping_cart'
+            'is_in_shopping_cart',
+            'search'
         )
 
+    def get_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        match_all = self.form.cleaned_data.get('tags_mode') == 'all'
+        return queryset.with_tags(value, match_all)
+
+    def get_tags_mode(self, queryset, name, value):
+        return queryset
+
     def get_favorite(self, queryset, name, value):
         if value:
             return queryset.filter(favorites__user=self.request.user)
@@ -41,6 +67,5 @@ class RecipeFilter(filter.FilterSet):
             )
         return queryset
 
-
-class IngredientFilter(filters.SearchFilter):
-    search_param = 'name'
+    def get_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
@@ -0,0 +1,144 @@
+"""Полнотекстовый поиск рецептов по названию, описанию и ингредиентам.
+
+В PostgreSQL у рецепта есть столбец search_vector с GIN-индексом и
+русской конфигурацией, в SQLite — таблица FTS5 foodgram_recipe_fts.
+Обе структуры поддерживают триггеры базы данных, поэтому массовые
+вставки и правки из админки тоже попадают в поиск. Схему PostgreSQL
+создаёт миграция 0010_recipe_search, схему SQLite — foodgram.triggers.
+"""
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from foodgram.search import normalize_name
+
+TERM = re.compile(r'\w+')
+
+INGREDIENT_NAMES = (
+    "(SELECT {aggregate} FROM foodgram_ingredientsrecipe AS link "
+    "INNER JOIN foodgram_ingredient AS ingredient "
+    "ON ingredient.id = link.ingredient_id "
+    "WHERE link.recipe_id = {recipe})"
+)
+
+
+def fold(expression):
+    """«ё» в «е» на стороне SQLite: токенизатор FTS5 их не сводит."""
+    return f"replace(replace({expression}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def sqlite_ingredients(recipe):
+    return fold(f"coalesce({INGREDIENT_NAMES}, '')".format(
+        aggregate="group_concat(ingredient.name, ' ')", recipe=recipe
+    ))
+
+
+SQLITE_REFRESH_INGREDIENTS = (
+    'UPDATE foodgram_recipe_fts SET ingredients = {ingredients} '
+    'WHERE rowid IN ({recipes});'
+)
+
+SQLITE = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS foodgram_recipe_fts USING fts5('
+    "name, text, ingredients, tokenize = 'unicode61 remove_diacritics 2')",
+    'CREATE TRIGGER IF NOT EXISTS foodgram_recipe_fts_insert '
+    'AFTER INSERT ON foodgram_recipe BEGIN '
+    'INSERT INTO foodgram_recipe_fts (rowid, name, text, ingredients) '
+    f"VALUES (NEW.id, {fold('NEW.name')}, {fold('NEW.text')}, "
+    f"{sqlite_ingredients('NEW.id')}); END",
+    'CREATE TRIGGER IF NOT EXISTS foodgram_recipe_fts_update '
+    'AFTER UPDATE OF name, text ON foodgram_recipe BEGIN '
+    f"UPDATE foodgram_recipe_fts SET name = {fold('NEW.name')}, "
+    f"text = {fold('NEW.text')} WHERE rowid = NEW.id; END",
+    'CREATE TRIGGER IF NOT EXISTS foodgram_recipe_fts_delete '
+    'AFTER DELETE ON foodgram_recipe BEGIN '
+    'DELETE FROM foodgram_recipe_fts WHERE rowid = OLD.id; END',
+    'CREATE TRIGGER IF NOT EXISTS foodgram_recipe_fts_link_insert '
+    'AFTER INSERT ON foodgram_ingredientsrecipe BEGIN '
+    + SQLITE_REFRESH_INGREDIENTS.format(
+        ingredients=sqlite_ingredients('NEW.recipe_id'),
+        recipes='NEW.recipe_id'
+    ) + ' END',
+    'CREATE TRIGGER IF NOT EXISTS foodgram_recipe_fts_link_delete '
+    'AFTER DELETE ON foodgram_ingredientsrecipe BEGIN '
+    + SQLITE_REFRESH_INGREDIENTS.format(
+        ingredients=sqlite_ingredients('OLD.recipe_id'),
+        recipes='OLD.recipe_id'
+    ) + ' END',
+    'CREATE TRIGGER IF NOT EXISTS foodgram_recipe_fts_link_update '
+    'AFTER UPDATE OF recipe_id, ingredient_id '
+    'ON foodgram_ingredientsrecipe BEGIN '
+    + SQLITE_REFRESH_INGREDIENTS.format(
+        ingredients=sqlite_ingredients('foodgram_recipe_fts.rowid'),
+        recipes='OLD.recipe_id, NEW.recipe_id'
+    ) + ' END',
+    'CREATE TRIGGER IF NOT EXISTS foodgram_recipe_fts_ingredient '
+    'AFTER UPDATE OF name ON foodgram_ingredient BEGIN '
+    + SQLITE_REFRESH_INGREDIENTS.format(
+        ingredients=sqlite_ingredients('foodgram_recipe_fts.rowid'),
+        recipes='SELECT recipe_id FROM foodgram_ingredientsrecipe '
+                'WHERE ingredient_id = NEW.id'
+    ) + ' END',
+    'INSERT INTO foodgram_recipe_fts (rowid, name, text, ingredients) '
+    f"SELECT id, {fold('name')}, {fold('text')}, "
+    f"{sqlite_ingredients('foodgram_recipe.id')} FROM foodgram_recipe "
+    'WHERE id NOT IN (SELECT rowid FROM foodgram_recipe_fts)',
+)
+
+
+def search_terms(query):
+    terms = TERM.findall(normalize_name(query))
+    return terms[:settings.RECIPE_SEARCH_MAX_TERMS]
+
+
+def postgresql_search(terms):
+    tsquery = ' & '.join(f'{term}:*' for term in terms)
+    matched = (
+        "foodgram_recipe.search_vector @@ to_tsquery('russian', %s)"
+    )
+    rank = (
+        "-ts_rank(foodgram_recipe.search_vector, to_tsquery('russian', %s))"
+    )
+    return matched, rank, tsquery
+
+
+def sqlite_search(terms):
+    match = ' '.join(f'"{term}"*' for term in terms)
+    matched = (
+        'foodgram_recipe.id IN (SELECT rowid FROM foodgram_recipe_fts '
+        'WHERE foodgram_recipe_fts MATCH %s)'
+    )
+    rank = (
+        '(SELECT bm25(foodgram_recipe_fts, 10.0, 5.0, 2.0) '
+        'FROM foodgram_recipe_fts WHERE foodgram_recipe_fts MATCH %s '
+        'AND rowid = foodgram_recipe.id)'
+    )
+    return matched, rank, match
+
+
+SEARCHES = {'postgresql': postgresql_search, 'sqlite': sqlite_search}
+
+
+def search_recipes(queryset, query):
+    """Рецепты, где встречаются все слова query, от лучших совпадений.
+
+    Слова ищутся по началу, так что «борщ» находит и «борщевой».
+    Название весит больше описания, описание — больше ингредиентов.
+    При равной оценке сохраняется обычный порядок от новых к старым.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset
+    vendor = connections[queryset.db].vendor
+    if vendor not in SEARCHES:
+        for term in terms:
+            queryset = queryset.filter(name__icontains=term)
+        return queryset
+    matched, rank, param = SEARCHES[vendor](terms)
+    return queryset.annotate(
+        search_match=RawSQL(matched, (param,), output_field=BooleanField()),
+        search_rank=RawSQL(rank, (param,), output_field=FloatField())
+    ).filter(search_match=True).order_by('search_rank', '-pub_date', '-id')
@@ -0,0 +1,127 @@
+"""Нечёткий поиск ингредиентов для запросов с опечатками.
+
+Индекс триграмм строится в памяти процесса по всей таблице ингредиентов
+и перестраивается лениво после любого изменения ингредиентов.
+"""
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+from foodgram.cache import VersionedCache
+from foodgram.models import Ingredient
+from foodgram.search import normalize_name, search_ingredients
+
+# Латинские буквы, которые на письме не отличить от кириллических.
+HOMOGLYPHS = str.maketrans('aeopcxykmthb', 'аеорсхукмтнв')
+
+
+def fold(value):
+    """Нормализованное название с латинскими двойниками вместо кириллицы."""
+    return normalize_name(value).translate(HOMOGLYPHS)
+
+
+def trigrams(value):
+    return {value[start:start + 3] for start in range(len(value) - 2)}
+
+
+def distance(query, name, limit):
+    """Наименьшее число правок, чтобы query совпал с частью name.
+
+    Возвращает limit + 1, если правок нужно больше limit.
+    """
+    previous = [0] * (len(name) + 1)
+    for row, letter in enumerate(query, start=1):
+        current = [row]
+        for column, other in enumerate(name, start=1):
+            current.append(min(
+                previous[column] + 1,
+                current[column - 1] + 1,
+                previous[column - 1] + (letter != other)
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous)
+
+
+class TrigramIndex:
+
+    def __init__(self, rows):
+        self.entries = []
+        self.postings = defaultdict(list)
+        for pk, name, measurement_unit, search_name in rows:
+            position = len(self.entries)
+            folded = search_name.translate(HOMOGLYPHS)
+            self.entries.append(
+                (folded, pk, name, measurement_unit, search_name)
+            )
+            for trigram in trigrams(folded):
+                self.postings[trigram].append(position)
+
+    def search(self, query, limit, deadline):
+        """Ингредиенты, ближайшие к query, в порядке числа правок.
+
+        Кандидаты с большим числом общих триграмм проверяются первыми;
+        после deadline проверка прекращается.
+        """
+        query = fold(query)
+        max_distance = 1 if len(query) <= 4 else 2
+        shared = Counter()
+        for trigram in trigrams(query):
+            shared.update(self.postings.get(trigram, ()))
+        found = []
+        for position, _ in shared.most_common(
+                settings.INGREDIENT_FUZZY_CANDIDATES):
+            if time.perf_counter() > deadline:
+                break
+            entry = self.entries[position]
+            edits = distance(query, entry[0], max_distance)
+            if edits <= max_distance:
+                found.append((edits,) + entry)
+        found.sort()
+        return [
+            Ingredient(
+                id=pk,
+                name=name,
+                measurement_unit=measurement_unit,
+                search_name=search_name
+            )
+            for _, _, pk, name, measurement_unit, search_name in found[:limit]
+        ]
+
+
+def build_index():
+    return TrigramIndex(
+        Ingredient.objects.order_by('id').values_list(
+            'id', 'name', 'measurement_unit', 'search_name'
+        ).iterator()
+    )
+
+
+INGREDIENT_INDEX = VersionedCache('ingredient-index', build_index)
+
+
+def fuzzy_ingredients(query, limit):
+    """Подсказки с опечатками; короткие запросы не обрабатываются."""
+    if len(normalize_name(query)) < settings.INGREDIENT_FUZZY_MIN_LENGTH:
+        return []
+    deadline = time.perf_counter() + settings.INGREDIENT_FUZZY_TIME_BUDGET
+    return INGREDIENT_INDEX.get().search(query, limit, deadline)
+
+
+def suggest_ingredients(queryset, query, limit):
+    """Точные совпадения, а если их мало — ещё и нечёткие."""
+    found = search_ingredients(queryset, query, limit)
+    if len(found) >= min(limit, settings.INGREDIENT_FUZZY_MIN_RESULTS):
+        return found
+    seen = {
+        (ingredient.search_name, ingredient.measurement_unit)
+        for ingredient in found
+    }
+    for ingredient in fuzzy_ingredients(query, limit):
+        key = (ingredient.search_name, ingredient.measurement_unit)
+        if key not in seen and len(found) < limit:
+            seen.add(key)
+            found.append(ingredient)
+    return found
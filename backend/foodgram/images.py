@@ -0,0 +1,196 @@
+"""Уменьшенные копии изображений рецептов.
+
+Для каждого размера из RECIPE_IMAGE_VARIANTS сохраняются JPEG (PNG для
+картинок с прозрачностью) и WebP, а также крошечная размытая заглушка,
+которая встраивается прямо в ответ API. Имена файлов хранятся в
+Recipe.image_variants в виде JSON вместе с именем исходного файла,
+по которому видно, что копии устарели.
+"""
+import base64
+import json
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageFilter, ImageOps, features
+
+FORMATS = {
+    'JPEG': ('jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'PNG': ('png', {'optimize': True}),
+    'WEBP': ('webp', {'quality': 80, 'method': 4}),
+}
+MIME_TYPES = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'WEBP': 'image/webp'}
+
+
+def load_variants(recipe):
+    if not recipe.image_variants:
+        return {}
+    return json.loads(recipe.image_variants)
+
+
+def is_stale(recipe):
+    return load_variants(recipe).get('source') != (recipe.image.name or None)
+
+
+def resize(image, width, height, crop):
+    """Копия image не больше width x height; crop обрезает под пропорции."""
+    if not crop:
+        image = image.copy()
+        image.thumbnail((width, height), Image.LANCZOS)
+        return image
+    factor = min(image.width / width, image.height / height, 1)
+    size = (max(round(width * factor), 1), max(round(height * factor), 1))
+    return ImageOps.fit(image, size, Image.LANCZOS)
+
+
+def encode(image, image_format):
+    extension, options = FORMATS[image_format]
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return extension, buffer.getvalue()
+
+
+def placeholder(image):
+    size = settings.RECIPE_IMAGE_PLACEHOLDER_SIZE
+    if image.mode == 'RGBA':
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image)
+        image = background
+    else:
+        image = image.copy()
+    image.thumbnail((size, size), Image.LANCZOS)
+    image = image.filter(ImageFilter.GaussianBlur(1))
+    image_format = 'WEBP' if features.check('webp') else 'PNG'
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=40)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:{MIME_TYPES[image_format]};base64,{encoded}'
+
+
+def open_image(storage, name):
+    """Открывает изображение, не раскодируя JPEG крупнее нужного.
+
+    draft позволяет декодеру JPEG сразу уменьшить картинку в 2, 4 или 8
+    раз, но не меньше самой крупной копии.
+    """
+    sizes = settings.RECIPE_IMAGE_VARIANTS.values()
+    largest = (
+        max((width for width, _, _ in sizes), default=0),
+        max((height for _, height, _ in sizes), default=0)
+    )
+    with storage.open(name) as source:
+        image = Image.open(source)
+        image.draft('RGB', largest)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+    return image.convert('RGBA' if has_alpha else 'RGB'), has_alpha
+
+
+def build_variants(storage, name):
+    """Создаёт копии файла name и возвращает их описание."""
+    image, has_alpha = open_image(storage, name)
+    stem = os.path.splitext(os.path.basename(name))[0]
+    formats = ['PNG' if has_alpha else 'JPEG']
+    if features.check('webp'):
+        formats.append('WEBP')
+    variants = {'source': name, 'placeholder': placeholder(image)}
+    for variant, (width, height, crop) in (
+            settings.RECIPE_IMAGE_VARIANTS.items()):
+        resized = resize(image, width, height, crop)
+        files = {}
+        for image_format in formats:
+            extension, content = encode(resized, image_format)
+            files[MIME_TYPES[image_format]] = storage.save(
+                f'{settings.RECIPE_IMAGE_VARIANTS_DIR}/'
+                f'{stem}-{variant}.{extension}',
+                ContentFile(content)
+            )
+        variants[variant] = {
+            'width': resized.width,
+            'height': resized.height,
+            'files': files,
+        }
+    return variants
+
+
+def variant_files(variants):
+    for variant in variants.values():
+        if isinstance(variant, dict):
+            yield from variant['files'].values()
+
+
+def delete_variants(storage, variants):
+    for name in variant_files(variants):
+        storage.delete(name)
+
+
+def update_variants(recipe, force=False):
+    """Пересоздаёт копии, если изображение рецепта сменилось.
+
+    Повреждённое изображение отмечается как обработанное без копий,
+    чтобы не пытаться разобрать его снова при каждом сохранении.
+    """
+    if not force and not is_stale(recipe):
+        return False
+    storage = recipe.image.storage
+    old = load_variants(recipe)
+    variants = {'source': recipe.image.name or None}
+    if recipe.image:
+        try:
+            variants = build_variants(storage, recipe.image.name)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            pass
+    transaction.on_commit(lambda: delete_variants(storage, old))
+    recipe.image_variants = json.dumps(variants)
+    recipe.updated_at = timezone.now()
+    type(recipe).objects.filter(pk=recipe.pk).update(
+        image_variants=recipe.image_variants, updated_at=recipe.updated_at
+    )
+    return True
+
+
+def represent_variants(recipe, request):
+    """Описание копий для API: размеры, ссылки и srcset по форматам."""
+    return describe_variants(
+        load_variants(recipe), recipe.image.storage, request
+    )
+
+
+def describe_variants(variants, storage, request):
+    if 'placeholder' not in variants:
+        return None
+
+    def url(name):
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request else url
+
+    result = {'placeholder': variants['placeholder']}
+    srcset = {}
+    for variant in settings.RECIPE_IMAGE_VARIANTS:
+        if variant not in variants:
+            continue
+        files = {
+            mime: url(name)
+            for mime, name in variants[variant]['files'].items()
+        }
+        result[variant] = {
+            'width': variants[variant]['width'],
+            'height': variants[variant]['height'],
+            'files': files,
+        }
+        for mime, link in files.items():
+            srcset.setdefault(mime, []).append(
+                f'{link} {variants[variant]["width"]}w'
+            )
+    result['srcset'] = {
+        mime: ', '.join(links) for mime, links in srcset.items()
+    }
+    return result
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from foodgram.images import is_stale, update_variants
+from foodgram.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии изображений рецептов, где их нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сообщить, сколько рецептов без копий'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать копии для всех рецептов'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            help='Сколько рецептов загружать за один проход'
+        )
+
+    def handle(self, *args, **options):
+        stale = 0
+        last_pk = 0
+        while True:
+            recipes = list(
+                Recipe.objects.filter(pk__gt=last_pk).order_by('pk').only(
+                    'pk', 'image', 'image_variants'
+                )[:options['chunk_size']]
+            )
+            if not recipes:
+                break
+            last_pk = recipes[-1].pk
+            for recipe in recipes:
+                if not options['force'] and not is_stale(recipe):
+                    continue
+                stale += 1
+                if not options['check']:
+                    update_variants(recipe, force=True)
+                    self.stdout.write(f'Рецепт #{recipe.pk}: {recipe.image}')
+        if stale and options['check']:
+            self.stdout.write(self.style.WARNING(
+                f'Рецептов без копий: {stale}'
+            ))
+        elif stale:
+            self.stdout.write(self.style.SUCCESS(
+                f'Копии созданы для рецептов: {stale}'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('Копии в порядке'))
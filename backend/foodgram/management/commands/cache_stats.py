@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from foodgram.views import RecipeViewSet, TagViewSet
+from users.authentication import TOKEN_STATS
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает попадания и промахи кэша ответов для анонимов и '
+        'кэша токенов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Обнулить счётчики после вывода'
+        )
+
+    def handle(self, *args, **options):
+        for counter in (
+            RecipeViewSet.response_cache, TagViewSet.response_cache,
+            TOKEN_STATS,
+        ):
+            stats = counter.stats()
+            total = stats['hits'] + stats['misses']
+            share = stats['hits'] / total if total else 0
+            self.stdout.write(
+                f'{counter.name}: попаданий {stats["hits"]}, '
+                f'промахов {stats["misses"]} ({share:.0%})'
+            )
+            if options['reset']:
+                counter.reset_stats()
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from foodgram.models import Favorite, Recipe, ShoppingList, TagRecipe
+from users.models import Subscriptions, User
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe', Count('pk')),
+    (Recipe, 'in_carts_count', ShoppingList, 'recipe', Count('pk')),
+    (Recipe, 'tags_mask', TagRecipe, 'recipe', Sum('tag__flag')),
+    (User, 'recipes_count', Recipe, 'author', Count('pk')),
+    (User, 'followers_count', Subscriptions, 'author', Count('pk')),
+)
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает и проверяет счётчики рецептов и пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сообщить о расхождениях, ничего не исправляя'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Сколько строк обрабатывать за один проход'
+        )
+
+    def handle(self, *args, **options):
+        drift = 0
+        for model, field, related, key, aggregate in COUNTERS:
+            drift += self.rebuild(
+                model, field, related, key, aggregate,
+                options['chunk_size'], options['check']
+            )
+        if drift:
+            self.stdout.write(self.style.WARNING(
+                f'Расхождений найдено: {drift}'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('Счётчики в порядке'))
+
+    def rebuild(self, model, field, related, key, aggregate, chunk_size,
+                check):
+        totals = related.objects.filter(
+            **{key: OuterRef('pk')}
+        ).order_by().values(key).annotate(total=aggregate).values('total')
+        drift = 0
+        last_pk = 0
+        while True:
+            rows = list(
+                model.objects.filter(pk__gt=last_pk).order_by('pk').annotate(
+                    actual=Coalesce(Subquery(totals), 0)
+                ).values_list('pk', field, 'actual')[:chunk_size]
+            )
+            if not rows:
+                return drift
+            last_pk = rows[-1][0]
+            wrong = [row for row in rows if row[1] != row[2]]
+            for pk, stored, actual in wrong:
+                self.stdout.write(
+                    f'{model._meta.label}#{pk}.{field}: '
+                    f'{stored} вместо {actual}'
+                )
+            drift += len(wrong)
+            if wrong and not check:
+                model.objects.filter(
+                    pk__in=[pk for pk, _, _ in wrong]
+                ).update(**{field: Coalesce(Subquery(totals), 0)})
@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from foodgram.models import IngredientsRecipe, ShoppingCartItem, ShoppingList
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает сводные списки покупок и сообщает о расхождениях'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сообщить о расхождениях, ничего не исправляя'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Сколько пользователей обрабатывать за один проход'
+        )
+
+    def handle(self, *args, **options):
+        users = sorted(
+            set(ShoppingList.objects.values_list('user_id', flat=True))
+            | set(ShoppingCartItem.objects.values_list('user_id', flat=True))
+        )
+        drift = 0
+        chunk_size = options['chunk_size']
+        for start in range(0, len(users), chunk_size):
+            drift += self.rebuild(
+                users[start:start + chunk_size], options['check']
+            )
+        if drift:
+            self.stdout.write(self.style.WARNING(
+                f'Расхождений найдено: {drift}'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('Списки покупок в порядке'))
+
+    def rebuild(self, users, check):
+        expected = {
+            (row['recipe__shopping_list__user'], row['ingredient']):
+                row['total']
+            for row in IngredientsRecipe.objects.filter(
+                recipe__shopping_list__user__in=users
+            ).values(
+                'recipe__shopping_list__user', 'ingredient'
+            ).annotate(total=Sum('amount')).order_by()
+        }
+        stored = {
+            (user, ingredient): total
+            for user, ingredient, total in ShoppingCartItem.objects.filter(
+                user__in=users
+            ).values_list('user_id', 'ingredient_id', 'total_amount')
+        }
+        wrong = sorted(
+            key for key in expected.keys() | stored.keys()
+            if expected.get(key) != stored.get(key)
+        )
+        for user, ingredient in wrong:
+            self.stdout.write(
+                f'Пользователь #{user}, ингредиент #{ingredient}: '
+                f'{stored.get((user, ingredient), 0)} вместо '
+                f'{expected.get((user, ingredient), 0)}'
+            )
+        if wrong and not check:
+            drifted = {user for user, _ in wrong}
+            with transaction.atomic():
+                ShoppingCartItem.objects.filter(user__in=drifted).delete()
+                ShoppingCartItem.objects.bulk_create(
+                    ShoppingCartItem(
+                        user_id=user,
+                        ingredient_id=ingredient,
+                        total_amount=total
+                    )
+                    for (user, ingredient), total in expected.items()
+                    if user in drifted
+                )
+        return len(wrong)
@@ -0,0 +1,160 @@
+import json
+import os
+from collections import Counter
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from foodgram.images import load_variants, variant_files
+from foodgram.models import Recipe, StoredFile
+from foodgram.storage import is_hashed
+
+
+class Command(BaseCommand):
+    help = (
+        'Переименовывает изображения рецептов по хешу содержимого и '
+        'пересчитывает ссылки на файлы'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сообщить о расхождениях, ничего не исправляя'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            help='Сколько рецептов загружать за один проход'
+        )
+
+    def handle(self, *args, **options):
+        self.only_check = options['check']
+        renamed = self.rehash(options['chunk_size'])
+        drift = self.recount(options['chunk_size'])
+        orphans = self.remove_orphans()
+        if self.only_check and (renamed or drift or orphans):
+            self.stdout.write(self.style.WARNING(
+                f'Файлов со старыми именами: {renamed}, '
+                f'расхождений в ссылках: {drift}, '
+                f'файлов без ссылок: {orphans}'
+            ))
+        elif renamed or drift or orphans:
+            self.stdout.write(self.style.SUCCESS(
+                f'Переименовано файлов: {renamed}, '
+                f'исправлено ссылок: {drift}, '
+                f'удалено файлов без ссылок: {orphans}'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('Медиафайлы в порядке'))
+
+    def recipes(self, chunk_size):
+        last_pk = 0
+        while True:
+            recipes = list(
+                Recipe.objects.filter(pk__gt=last_pk).order_by('pk').only(
+                    'pk', 'image', 'image_variants'
+                )[:chunk_size]
+            )
+            if not recipes:
+                return
+            last_pk = recipes[-1].pk
+            yield from recipes
+
+    def rehash_file(self, name):
+        """Сохраняет файл под именем по хешу и удаляет старый файл."""
+        with default_storage.open(name) as content:
+            hashed = default_storage.save(name, content)
+        default_storage.delete(name)
+        return hashed
+
+    def rehash(self, chunk_size):
+        renamed = 0
+        for recipe in self.recipes(chunk_size):
+            variants = load_variants(recipe)
+            names = []
+            for name in (recipe.image.name, *variant_files(variants)):
+                if not name or is_hashed(name):
+                    continue
+                if default_storage.exists(name):
+                    names.append(name)
+                else:
+                    self.stdout.write(f'Рецепт #{recipe.pk}: нет файла {name}')
+            renamed += len(names)
+            if self.only_check or not names:
+                continue
+            hashed = {name: self.rehash_file(name) for name in names}
+            image = hashed.get(recipe.image.name, recipe.image.name)
+            if variants:
+                variants['source'] = image
+                for variant in variants.values():
+                    if isinstance(variant, dict):
+                        variant['files'] = {
+                            mime: hashed.get(name, name)
+                            for mime, name in variant['files'].items()
+                        }
+            Recipe.objects.filter(pk=recipe.pk).update(
+                image=image,
+                image_variants=json.dumps(variants) if variants else ''
+            )
+            self.stdout.write(f'Рецепт #{recipe.pk}: {image}')
+        return renamed
+
+    def recount(self, chunk_size):
+        """Сверяет StoredFile с числом ссылок из рецептов."""
+        expected = Counter()
+        for recipe in self.recipes(chunk_size):
+            expected.update(
+                name for name in (
+                    recipe.image.name, *variant_files(load_variants(recipe))
+                )
+                if name and is_hashed(name)
+            )
+        stored = dict(StoredFile.objects.values_list('name', 'references'))
+        drift = 0
+        for name in set(expected) | set(stored):
+            actual = expected.get(name, 0)
+            if stored.get(name, 0) == actual:
+                continue
+            drift += 1
+            self.stdout.write(
+                f'{name}: {stored.get(name, 0)} ссылок вместо {actual}'
+            )
+            if self.only_check:
+                continue
+            if not actual:
+                StoredFile.objects.filter(name=name).delete()
+            elif name in stored:
+                StoredFile.objects.filter(name=name).update(references=actual)
+            else:
+                StoredFile.objects.create(
+                    name=name,
+                    size=default_storage.size(name)
+                    if default_storage.exists(name) else 0,
+                    references=actual
+                )
+        return drift
+
+    def remove_orphans(self):
+        """Удаляет файлы хранилища, о которых нет записи в StoredFile.
+
+        Такие файлы остаются, если транзакция с загрузкой откатилась.
+        Файл, который загружается прямо сейчас, тоже ещё не записан в базу,
+        поэтому без --check команду запускают, когда загрузки остановлены.
+        """
+        root = default_storage.path(settings.MEDIA_HASHED_DIR)
+        known = set(StoredFile.objects.values_list('name', flat=True))
+        orphans = 0
+        for directory, _, files in os.walk(root):
+            for file in files:
+                name = os.path.relpath(
+                    os.path.join(directory, file), default_storage.location
+                ).replace(os.sep, '/')
+                if name in known:
+                    continue
+                orphans += 1
+                self.stdout.write(f'Файл без ссылок: {name}')
+                if not self.only_check:
+                    os.remove(os.path.join(directory, file))
+        return orphans
@@ -0,0 +1,18 @@
+class RateLimitHeadersMiddleware:
+    """Сообщает клиенту остаток самого строгого ограничения частоты.
+
+    X-RateLimit-Reset — через сколько секунд корзина наполнится целиком.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        rate_limit = getattr(request, 'rate_limit', None)
+        if rate_limit is not None:
+            limit, remaining, reset = rate_limit
+            response['X-RateLimit-Limit'] = limit
+            response['X-RateLimit-Remaining'] = remaining
+            response['X-RateLimit-Reset'] = reset
+        return response
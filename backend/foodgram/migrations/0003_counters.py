@@ -0,0 +1,45 @@
+# Generated by Django 2.2.16 on 2026-10-18 07:45
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('foodgram', 'Recipe', 'favorites_count', 'foodgram', 'Favorite', 'recipe'),
+    ('foodgram', 'Recipe', 'in_carts_count', 'foodgram', 'ShoppingList', 'recipe'),
+    ('users', 'User', 'recipes_count', 'foodgram', 'Recipe', 'author'),
+    ('users', 'User', 'followers_count', 'users', 'Subscriptions', 'author'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for app, model, field, related_app, related, key in COUNTERS:
+        related = apps.get_model(related_app, related)
+        totals = related.objects.filter(
+            **{key: OuterRef('pk')}
+        ).order_by().values(key).annotate(total=Count('pk')).values('total')
+        apps.get_model(app, model).objects.update(
+            **{field: Coalesce(Subquery(totals), 0)}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0002_recipe_keyset'),
+        ('users', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Сколько раз рецепт добавлен в избранное', verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Сколько раз рецепт добавлен в список покупок', verbose_name='В списках покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 2.2.16 on 2026-10-18 07:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum
+
+
+def fill_shopping_cart_items(apps, schema_editor):
+    IngredientsRecipe = apps.get_model('foodgram', 'IngredientsRecipe')
+    ShoppingCartItem = apps.get_model('foodgram', 'ShoppingCartItem')
+    totals = IngredientsRecipe.objects.filter(
+        recipe__shopping_list__isnull=False
+    ).values('recipe__shopping_list__user', 'ingredient').annotate(
+        total=Sum('amount')
+    ).order_by().iterator()
+    ShoppingCartItem.objects.bulk_create(
+        (
+            ShoppingCartItem(
+                user_id=row['recipe__shopping_list__user'],
+                ingredient_id=row['ingredient'],
+                total_amount=row['total']
+            )
+            for row in totals
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('foodgram', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingCartItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_amount', models.IntegerField(help_text='Суммарное количество ингредиента во всех рецептах', verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(help_text='Ингредиент из рецептов в списке покупок', on_delete=django.db.models.deletion.CASCADE, related_name='shopping_cart_items', to='foodgram.Ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(help_text='Владелец списка покупок', on_delete=django.db.models.deletion.CASCADE, related_name='shopping_cart_items', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Позиция списка покупок',
+                'verbose_name_plural': 'Позиции списков покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcartitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_cart_item'),
+        ),
+        migrations.RunPython(
+            fill_shopping_cart_items, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-18 07:55
+
+from django.db import migrations, models
+
+from foodgram.search import normalize_name
+
+
+def fill_search_name(apps, schema_editor):
+    Ingredient = apps.get_model('foodgram', 'Ingredient')
+    ingredients = list(Ingredient.objects.only('id', 'name'))
+    for ingredient in ingredients:
+        ingredient.search_name = normalize_name(ingredient.name)
+    Ingredient.objects.bulk_update(
+        ingredients, ('search_name',), batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0004_shopping_cart_item'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='search_name',
+            field=models.CharField(db_index=True, default='', editable=False, help_text='Название в нижнем регистре и с «е» вместо «ё»', max_length=200, verbose_name='Название для поиска'),
+        ),
+        migrations.RunPython(fill_search_name, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 08:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0005_ingredient_search_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants',
+            field=models.TextField(default='', editable=False, help_text='Описание копий изображения в формате JSON', verbose_name='Уменьшенные копии изображения'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-18 08:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0006_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Путь к файлу в хранилище, производный от его содержимого', max_length=255, unique=True, verbose_name='Имя файла')),
+                ('size', models.PositiveIntegerField(default=0, help_text='Размер файла в байтах', verbose_name='Размер')),
+                ('references', models.PositiveIntegerField(default=0, help_text='Сколько раз файл сохранён и ещё не удалён', verbose_name='Ссылки')),
+            ],
+            options={
+                'verbose_name': 'Файл в хранилище',
+                'verbose_name_plural': 'Файлы в хранилище',
+            },
+        ),
+    ]
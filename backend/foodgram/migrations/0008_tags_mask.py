@@ -0,0 +1,48 @@
+# Generated by Django 2.2.16 on 2026-10-18 08:27
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+TAG_MASK_BITS = 63
+
+
+def fill_tags_mask(apps, schema_editor):
+    Tag = apps.get_model('foodgram', 'Tag')
+    Recipe = apps.get_model('foodgram', 'Recipe')
+    TagRecipe = apps.get_model('foodgram', 'TagRecipe')
+    tags = list(Tag.objects.order_by('id')[:TAG_MASK_BITS])
+    for bit, tag in enumerate(tags):
+        tag.flag = 1 << bit
+    Tag.objects.bulk_update(tags, ('flag',))
+    flags = TagRecipe.objects.filter(
+        recipe=OuterRef('pk')
+    ).order_by().values('recipe').annotate(
+        mask=Sum('tag__flag')
+    ).values('mask')
+    Recipe.objects.update(tags_mask=Coalesce(Subquery(flags), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0007_stored_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='tags_mask',
+            field=models.BigIntegerField(default=0, editable=False, help_text='Сумма Tag.flag тегов рецепта', verbose_name='Маска тегов'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='flag',
+            field=models.BigIntegerField(default=0, editable=False, help_text='Бит тега в Recipe.tags_mask; 0, если битов не хватило', verbose_name='Бит в маске'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(condition=models.Q(_negated=True, flag=0), fields=('flag',), name='unique_tag_flag'),
+        ),
+        migrations.RunPython(fill_tags_mask, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.2.16 on 2026-10-18 09:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0008_tags_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, help_text='Меняется при правке рецепта, его тегов и ингредиентов', verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,94 @@
+from django.db import migrations
+
+from foodgram.triggers import PostgreSQLRunSQL
+
+# SQL скопирован сюда, чтобы правки foodgram.fulltext не меняли миграцию.
+FORWARD = [
+    'ALTER TABLE foodgram_recipe ADD COLUMN IF NOT EXISTS search_vector tsvector',
+    'CREATE INDEX IF NOT EXISTS foodgram_recipe_search_idx ON foodgram_recipe USING gin (search_vector)',
+    """
+    CREATE OR REPLACE FUNCTION foodgram_recipe_search_vector(
+        integer, text, text
+    ) RETURNS tsvector AS $$
+        SELECT setweight(
+                to_tsvector('russian', translate($2, 'ёЁ', 'еЕ')), 'A'
+            ) || setweight(
+                to_tsvector('russian', translate($3, 'ёЁ', 'еЕ')), 'B'
+            ) || setweight(to_tsvector('russian', translate(
+                coalesce((
+                    SELECT string_agg(ingredient.name, ' ')
+                    FROM foodgram_ingredientsrecipe AS link
+                    INNER JOIN foodgram_ingredient AS ingredient
+                    ON ingredient.id = link.ingredient_id
+                    WHERE link.recipe_id = $1
+                ), ''), 'ёЁ', 'еЕ'
+            )), 'C')
+    $$ LANGUAGE sql STABLE
+    """,
+    """
+    CREATE OR REPLACE FUNCTION foodgram_recipe_search_row() RETURNS trigger
+    AS $$
+    BEGIN
+        NEW.search_vector := foodgram_recipe_search_vector(
+            NEW.id, NEW.name, NEW.text
+        );
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION foodgram_recipe_search_links() RETURNS trigger
+    AS $$
+    BEGIN
+        UPDATE foodgram_recipe
+        SET search_vector = foodgram_recipe_search_vector(id, name, text)
+        WHERE id IN (OLD.recipe_id, NEW.recipe_id);
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION foodgram_recipe_search_ingredient()
+    RETURNS trigger AS $$
+    BEGIN
+        UPDATE foodgram_recipe
+        SET search_vector = foodgram_recipe_search_vector(id, name, text)
+        WHERE id IN (
+            SELECT recipe_id FROM foodgram_ingredientsrecipe
+            WHERE ingredient_id = NEW.id
+        );
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    'DROP TRIGGER IF EXISTS foodgram_recipe_search ON foodgram_recipe',
+    'CREATE TRIGGER foodgram_recipe_search BEFORE INSERT OR UPDATE OF name, text ON foodgram_recipe FOR EACH ROW EXECUTE PROCEDURE foodgram_recipe_search_row()',
+    'DROP TRIGGER IF EXISTS foodgram_recipe_search_links ON foodgram_ingredientsrecipe',
+    'CREATE TRIGGER foodgram_recipe_search_links AFTER INSERT OR DELETE OR UPDATE OF recipe_id, ingredient_id ON foodgram_ingredientsrecipe FOR EACH ROW EXECUTE PROCEDURE foodgram_recipe_search_links()',
+    'DROP TRIGGER IF EXISTS foodgram_recipe_search_ingredient ON foodgram_ingredient',
+    'CREATE TRIGGER foodgram_recipe_search_ingredient AFTER UPDATE OF name ON foodgram_ingredient FOR EACH ROW EXECUTE PROCEDURE foodgram_recipe_search_ingredient()',
+    'UPDATE foodgram_recipe SET search_vector = foodgram_recipe_search_vector(id, name, text) WHERE search_vector IS NULL',
+]
+
+REVERSE = [
+    'DROP TRIGGER IF EXISTS foodgram_recipe_search_ingredient ON foodgram_ingredient',
+    'DROP TRIGGER IF EXISTS foodgram_recipe_search_links ON foodgram_ingredientsrecipe',
+    'DROP TRIGGER IF EXISTS foodgram_recipe_search ON foodgram_recipe',
+    'DROP FUNCTION IF EXISTS foodgram_recipe_search_ingredient()',
+    'DROP FUNCTION IF EXISTS foodgram_recipe_search_links()',
+    'DROP FUNCTION IF EXISTS foodgram_recipe_search_row()',
+    'DROP FUNCTION IF EXISTS foodgram_recipe_search_vector(integer, text, text)',
+    'DROP INDEX IF EXISTS foodgram_recipe_search_idx',
+    'ALTER TABLE foodgram_recipe DROP COLUMN IF EXISTS search_vector',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0009_recipe_updated_at'),
+    ]
+
+    operations = [
+        PostgreSQLRunSQL(FORWARD, REVERSE),
+    ]
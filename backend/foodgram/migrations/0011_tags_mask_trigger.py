@@ -0,0 +1,46 @@
+from django.db import migrations
+
+from foodgram.triggers import PostgreSQLRunSQL
+
+# SQL скопирован сюда, чтобы правки foodgram.tagmask не меняли миграцию.
+FORWARD = [
+    """
+    CREATE OR REPLACE FUNCTION foodgram_recipe_tags_mask() RETURNS trigger
+    AS $$
+    BEGIN
+        IF TG_OP IN ('DELETE', 'UPDATE') THEN
+            UPDATE foodgram_recipe SET tags_mask = tags_mask & ~coalesce(
+                (SELECT flag FROM foodgram_tag WHERE id = OLD.tag_id), 0
+            ) WHERE id = OLD.recipe_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            UPDATE foodgram_recipe SET tags_mask = tags_mask | coalesce(
+                (SELECT flag FROM foodgram_tag WHERE id = NEW.tag_id), 0
+            ) WHERE id = NEW.recipe_id;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    'DROP TRIGGER IF EXISTS foodgram_recipe_tags_mask ON foodgram_tagrecipe',
+    'CREATE TRIGGER foodgram_recipe_tags_mask '
+    'AFTER INSERT OR DELETE OR UPDATE OF recipe_id, tag_id '
+    'ON foodgram_tagrecipe '
+    'FOR EACH ROW EXECUTE PROCEDURE foodgram_recipe_tags_mask()',
+]
+
+REVERSE = [
+    'DROP TRIGGER IF EXISTS foodgram_recipe_tags_mask ON foodgram_tagrecipe',
+    'DROP FUNCTION IF EXISTS foodgram_recipe_tags_mask()',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0010_recipe_search'),
+    ]
+
+    operations = [
+        PostgreSQLRunSQL(FORWARD, REVERSE),
+    ]
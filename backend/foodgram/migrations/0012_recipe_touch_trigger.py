@@ -0,0 +1,44 @@
+from django.db import migrations
+
+from foodgram.triggers import PostgreSQLRunSQL
+
+# SQL скопирован сюда, чтобы правки foodgram.timestamps не меняли миграцию.
+FORWARD = [
+    """
+    CREATE OR REPLACE FUNCTION foodgram_recipe_touch() RETURNS trigger
+    AS $$
+    BEGIN
+        UPDATE foodgram_recipe SET updated_at = now()
+        WHERE id IN (OLD.recipe_id, NEW.recipe_id);
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    'DROP TRIGGER IF EXISTS foodgram_recipe_touch '
+    'ON foodgram_ingredientsrecipe',
+    'CREATE TRIGGER foodgram_recipe_touch '
+    'AFTER INSERT OR DELETE OR UPDATE ON foodgram_ingredientsrecipe '
+    'FOR EACH ROW EXECUTE PROCEDURE foodgram_recipe_touch()',
+    'DROP TRIGGER IF EXISTS foodgram_recipe_touch ON foodgram_tagrecipe',
+    'CREATE TRIGGER foodgram_recipe_touch '
+    'AFTER INSERT OR DELETE OR UPDATE ON foodgram_tagrecipe '
+    'FOR EACH ROW EXECUTE PROCEDURE foodgram_recipe_touch()',
+]
+
+REVERSE = [
+    'DROP TRIGGER IF EXISTS foodgram_recipe_touch '
+    'ON foodgram_ingredientsrecipe',
+    'DROP TRIGGER IF EXISTS foodgram_recipe_touch ON foodgram_tagrecipe',
+    'DROP FUNCTION IF EXISTS foodgram_recipe_touch()',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0011_tags_mask_trigger'),
+    ]
+
+    operations = [
+        PostgreSQLRunSQL(FORWARD, REVERSE),
+    ]
@@ -1,9 +1,16 @@
+from backend.core import MaintainedFieldsMixin
 
 from django.db import models
-from users.models import User
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Value, Window)
+from django.db.models.functions import RowNumber
+from users.models import User, annotate_is_subscribed
+
+from foodgram.search import normalize_name
 from django.core.validators import MinValueValidator
 
 COOKING_TIME_ERROR = 'Время приготовления должно быть больше 0'
+TAG_MASK_BITS = 63
 AMOUNT_VALIDATE_ERROR = 'Количество ингредиента должно быть больше 0!'
 
 
@@ -26,16 +33,142 @@ class Tag(models.Model):
         max_length=200,
         help_text='Задайте уникальный слаг'
     )
+    flag = models.BigIntegerField(
+        'Бит в маске',
+        default=0,
+        editable=False,
+        help_text='Бит тега в Recipe.tags_mask; 0, если битов не хватило'
+    )
 
     class Meta:
         verbose_name = 'Тэг'
         verbose_name_plural = 'Tэги'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('flag',),
+                condition=~models.Q(flag=0),
+                name='unique_tag_flag'
+            ),
+        )
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        assigned = not self.flag
+        if assigned:
+            self.flag = free_tag_flag()
+        super().save(*args, **kwargs)
+        if assigned and self.flag:
+            Recipe.objects.filter(tagrecipe__tag=self).update(
+                tags_mask=F('tags_mask').bitor(self.flag)
+            )
+
+
+def free_tag_flag():
+    """Младший бит маски, не занятый другими тегами, или 0."""
+    used = set(Tag.objects.exclude(flag=0).values_list('flag', flat=True))
+    for bit in range(TAG_MASK_BITS):
+        if 1 << bit not in used:
+            return 1 << bit
+    return 0
+
+
+CARD_FIELDS = (
+    'id', 'author_id', 'name', 'image', 'image_variants', 'text',
+    'cooking_time', 'pub_date', 'is_favorited', 'is_in_shopping_cart',
+)
+
+
+class RecipeQuerySet(models.QuerySet):
+
+    def with_related(self, user):
+        """Рецепты со всеми связанными объектами для сериализации.
+
+        Теги и ингредиенты идут по id, как в карточках из as_cards.
+        """
+        return self.prefetch_related(
+            Prefetch('author', queryset=annotate_is_subscribed(
+                User.objects.all(), user
+            )),
+            Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            Prefetch(
+                'ingredients_recipe',
+                queryset=IngredientsRecipe.objects.select_related(
+                    'ingredient'
+                ).order_by('id')
+            ),
+        ).with_user_flags(user)
+
+    def as_cards(self, user):
+        """Строки рецептов для RecipeCardListSerializer без моделей."""
+        return self.with_user_flags(user).values(*CARD_FIELDS)
+
+    def with_user_flags(self, user):
+        """Аннотирует рецепты флагами избранного и списка покупок."""
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField())
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingList.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            ))
+        )
+
+    def with_tags(self, tags, match_all=False):
+        """Рецепты с любым (или со всеми) из тегов tags.
+
+        Если у всех тегов есть бит, условие проверяется по маске в строке
+        рецепта, иначе — подзапросами EXISTS. Соединения с тегами нет,
+        поэтому рецепт не повторяется и DISTINCT не нужен.
+        """
+        flags = [tag.flag for tag in tags]
+        if flags and all(flags):
+            mask = sum(set(flags))
+            matched = self.annotate(tags_matched=F('tags_mask').bitand(mask))
+            if match_all:
+                return matched.filter(tags_matched=mask)
+            return matched.filter(tags_matched__gt=0)
+        links = TagRecipe.objects.filter(recipe=OuterRef('pk'))
+        if not match_all:
+            return self.annotate(
+                has_tags=Exists(links.filter(tag__in=tags))
+            ).filter(has_tags=True)
+        for tag in tags:
+            self = self.annotate(
+                **{f'has_tag_{tag.pk}': Exists(links.filter(tag=tag))}
+            ).filter(**{f'has_tag_{tag.pk}': True})
+        return self
+
+    def latest_by_author(self, author_ids, limit):
+        """Последние limit рецептов каждого автора одним запросом.
+
+        Возвращает словарь {id автора: [рецепты от новых к старым]}.
+        """
+        ranked = self.filter(author_id__in=author_ids).annotate(
+            author_rank=Window(
+                expression=RowNumber(),
+                partition_by=F('author_id'),
+                order_by=(F('pub_date').desc(), F('id').desc())
+            )
+        ).order_by()
+        sql, params = ranked.query.sql_with_params()
+        recipes = {author_id: [] for author_id in author_ids}
+        for recipe in self.raw(
+            f'SELECT * FROM ({sql}) ranked '
+            'WHERE ranked.author_rank <= %s ORDER BY ranked.author_rank',
+            params + (limit,)
+        ):
+            recipes[recipe.author_id].append(recipe)
+        return recipes
+
 
-class Recipe(models.Model):
+class Recipe(MaintainedFieldsMixin, models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -53,6 +186,12 @@ class Recipe(models.Model):
         upload_to='recipes/images/',
         help_text='Загрузите изображение рецепта'
     )
+    image_variants = models.TextField(
+        'Уменьшенные копии изображения',
+        default='',
+        editable=False,
+        help_text='Описание копий изображения в формате JSON'
+    )
     text = models.CharField(
         'Описание',
         max_length=255,
@@ -78,9 +217,43 @@ class Recipe(models.Model):
         auto_now_add=True,
         db_index=True,
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+        db_index=True,
+        help_text='Меняется при правке рецепта, его тегов и ингредиентов'
+    )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False,
+        help_text='Сколько раз рецепт добавлен в избранное'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'В списках покупок',
+        default=0,
+        editable=False,
+        help_text='Сколько раз рецепт добавлен в список покупок'
+    )
+    tags_mask = models.BigIntegerField(
+        'Маска тегов',
+        default=0,
+        editable=False,
+        help_text='Сумма Tag.flag тегов рецепта'
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    maintained_fields = ('favorites_count', 'in_carts_count', 'tags_mask')
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_id_idx'
+            ),
+        )
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -99,6 +272,14 @@ class Ingredient(models.Model):
         max_length=20,
         help_text='Задайте единицу измерения'
     )
+    search_name = models.CharField(
+        'Название для поиска',
+        max_length=200,
+        db_index=True,
+        default='',
+        editable=False,
+        help_text='Название в нижнем регистре и с «е» вместо «ё»'
+    )
 
     class Meta:
         verbose_name = 'Ингредиент',
@@ -107,6 +288,10 @@ class Ingredient(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.search_name = normalize_name(self.name)
+        super().save(*args, **kwargs)
+
 
 class TagRecipe(models.Model):
     tag = models.ForeignKey(
@@ -225,3 +410,63 @@ class ShoppingList(models.Model):
                 name='unique_shopping_list',
             ),
         )
+
+
+class ShoppingCartItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_items',
+        verbose_name='Пользователь',
+        help_text='Владелец списка покупок'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_items',
+        verbose_name='Ингредиент',
+        help_text='Ингредиент из рецептов в списке покупок'
+    )
+    total_amount = models.IntegerField(
+        'Количество',
+        help_text='Суммарное количество ингредиента во всех рецептах'
+    )
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списков покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_cart_item'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.ingredient} - {self.total_amount}'
+
+
+class StoredFile(models.Model):
+    name = models.CharField(
+        'Имя файла',
+        max_length=255,
+        unique=True,
+        help_text='Путь к файлу в хранилище, производный от его содержимого'
+    )
+    size = models.PositiveIntegerField(
+        'Размер',
+        default=0,
+        help_text='Размер файла в байтах'
+    )
+    references = models.PositiveIntegerField(
+        'Ссылки',
+        default=0,
+        help_text='Сколько раз файл сохранён и ещё не удалён'
+    )
+
+    class Meta:
+        verbose_name = 'Файл в хранилище'
+        verbose_name_plural = 'Файлы в хранилище'
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
@@ -1,5 +1,183 @@
-from rest_framework.pagination import PageNumberPagination
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+INVALID_CURSOR = 'Неверный курсор'
+CURSOR_CONFLICT = 'Параметр нельзя передавать вместе с cursor'
 
 
 class RecipeLimitPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+    @property
+    def max_page_size(self):
+        return settings.PAGE_MAX_SIZE
+
+
+class KeysetPagination(BasePagination):
+    """Постраничный вывод по ключу вместо OFFSET и без подсчёта строк.
+
+    Позиция хранится в непрозрачном курсоре со значениями полей ordering
+    последнего (или первого при движении назад) объекта страницы.
+    Последнее поле ordering должно быть уникальным. Порядок задаёт
+    только ordering пагинатора, поэтому параметры из conflicting_params,
+    меняющие порядок (?ordering=, ранжирование поиска), вместе с cursor
+    отклоняются ответом 400. Размер страницы ограничен PAGE_MAX_SIZE.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = 6
+    ordering = ('-id',)
+    conflicting_params = ('ordering',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        conflicts = [
+            param for param in self.conflicting_params
+            if param in request.query_params
+        ]
+        if conflicts:
+            raise ValidationError({
+                param: [CURSOR_CONFLICT] for param in conflicts
+            })
+        self.request = request
+        self.model = queryset.model
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        values, reverse = self.decode_cursor(request)
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(self.invert(field) for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self.after(ordering, values))
+        page = list(queryset[:self.page_size + 1])
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        if reverse:
+            page.reverse()
+            self.has_next = values is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = values is not None
+        self.page = page
+        return page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, settings.PAGE_MAX_SIZE)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict((
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        )))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, obj, reverse):
+        values = [
+            self.field_value(obj, field) for field in self.ordering
+        ]
+        cursor = json.dumps({'v': values, 'r': int(reverse)})
+        encoded = urlsafe_b64encode(cursor.encode()).decode().rstrip('=')
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            padding = '=' * (-len(encoded) % 4)
+            cursor = json.loads(urlsafe_b64decode(encoded + padding))
+            values = cursor['v']
+            reverse = bool(cursor['r'])
+        except (TypeError, KeyError, ValueError, binascii.Error):
+            raise NotFound(INVALID_CURSOR)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(INVALID_CURSOR)
+        return values, reverse
+
+    def field_value(self, obj, field):
+        """Значение поля ordering у модели или у строки из values()."""
+        model_field = self.model._meta.get_field(field.lstrip('-'))
+        if isinstance(obj, dict):
+            obj = self.model(**{model_field.attname: obj[model_field.attname]})
+        return model_field.value_to_string(obj)
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def after(ordering, values):
+        """Условие «строго после позиции» для составного ключа."""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+
+class RecipeCursorPagination(KeysetPagination):
+    ordering = ('-pub_date', '-id')
+    conflicting_params = ('ordering', 'search')
+
+
+class CursorPaginationMixin:
+    """Включает постраничный вывод по курсору, если передан cursor.
+
+    Для первой страницы достаточно пустого параметра: ?cursor=&limit=6.
+    Без него используется pagination_class.
+    """
+    cursor_pagination_class = None
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            pagination_class = self.pagination_class
+            cursor_class = self.cursor_pagination_class
+            if (cursor_class is not None and cursor_class.cursor_query_param
+                    in self.request.query_params):
+                pagination_class = cursor_class
+            self._paginator = (
+                pagination_class() if pagination_class is not None else None
+            )
+        return self._paginator
@@ -0,0 +1,32 @@
+import codecs
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from foodgram.renderers import FastJSONRenderer, orjson
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser на orjson, если он установлен.
+
+    orjson читает только UTF-8 и, как строгий режим DRF, не принимает
+    NaN и Infinity. Тела в других кодировках разбирает стандартный json.
+    """
+    renderer_class = FastJSONRenderer
+
+    def uses_orjson(self, parser_context):
+        encoding = (parser_context or {}).get(
+            'encoding', settings.DEFAULT_CHARSET
+        )
+        return orjson is not None and self.strict and (
+            codecs.lookup(encoding).name == 'utf-8'
+        )
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if not self.uses_orjson(parser_context):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,406 @@
+"""Потоковая запись простых текстовых PDF без внешних зависимостей.
+
+Кириллица в стандартных шрифтах PDF отсутствует, поэтому в документ
+встраивается TrueType-шрифт. Из него оставляются только глифы, которые
+действительно встретились в тексте.
+"""
+import struct
+import zlib
+from functools import lru_cache
+
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 50
+FONT_SIZE = 11
+LEADING = 16
+
+ARG_1_AND_2_ARE_WORDS = 0x0001
+WE_HAVE_A_SCALE = 0x0008
+MORE_COMPONENTS = 0x0020
+WE_HAVE_AN_X_AND_Y_SCALE = 0x0040
+WE_HAVE_A_TWO_BY_TWO = 0x0080
+SUBSET_TABLES = (
+    b'cvt ', b'fpgm', b'glyf', b'head', b'hhea', b'hmtx', b'loca', b'maxp',
+    b'prep',
+)
+
+
+class TrueTypeFont:
+    """Метрики и подмножество глифов TrueType-шрифта."""
+
+    def __init__(self, data):
+        self.data = data
+        num_tables = struct.unpack_from('>H', data, 4)[0]
+        self.tables = {}
+        for number in range(num_tables):
+            tag, _, offset, length = struct.unpack_from(
+                '>4sIII', data, 12 + number * 16
+            )
+            self.tables[tag] = (offset, length)
+        head = self.table(b'head')
+        self.units_per_em = struct.unpack_from('>H', head, 18)[0]
+        self.bbox = struct.unpack_from('>4h', head, 36)
+        self.long_loca = struct.unpack_from('>h', head, 50)[0] == 1
+        hhea = self.table(b'hhea')
+        self.ascent, self.descent = struct.unpack_from('>2h', hhea, 4)
+        metrics_count = struct.unpack_from('>H', hhea, 34)[0]
+        self.num_glyphs = struct.unpack_from('>H', self.table(b'maxp'), 4)[0]
+        hmtx = self.table(b'hmtx')
+        advances = struct.unpack_from('>' + 'Hh' * metrics_count, hmtx)[::2]
+        self.advances = advances + (advances[-1],) * (
+            self.num_glyphs - metrics_count
+        )
+        self.cmap = self.read_cmap()
+        loca = self.table(b'loca')
+        if self.long_loca:
+            self.loca = struct.unpack_from(f'>{self.num_glyphs + 1}I', loca)
+        else:
+            self.loca = tuple(
+                offset * 2 for offset in struct.unpack_from(
+                    f'>{self.num_glyphs + 1}H', loca
+                )
+            )
+
+    @classmethod
+    @lru_cache(maxsize=4)
+    def load(cls, path):
+        with open(path, 'rb') as font_file:
+            return cls(font_file.read())
+
+    def table(self, tag):
+        offset, length = self.tables[tag]
+        return self.data[offset:offset + length]
+
+    def read_cmap(self):
+        cmap = self.table(b'cmap')
+        count = struct.unpack_from('>H', cmap, 2)[0]
+        subtables = {}
+        for number in range(count):
+            platform, encoding, offset = struct.unpack_from(
+                '>HHI', cmap, 4 + number * 8
+            )
+            subtables[(platform, encoding)] = offset
+        if (3, 10) in subtables:
+            return self.read_cmap_12(cmap, subtables[(3, 10)])
+        return self.read_cmap_4(cmap, subtables[(3, 1)])
+
+    @staticmethod
+    def read_cmap_4(cmap, offset):
+        segments = struct.unpack_from('>H', cmap, offset + 6)[0] // 2
+        ends_at = offset + 14
+        starts_at = ends_at + segments * 2 + 2
+        deltas_at = starts_at + segments * 2
+        ranges_at = deltas_at + segments * 2
+        mapping = {}
+        for segment in range(segments):
+            end, = struct.unpack_from('>H', cmap, ends_at + segment * 2)
+            start, = struct.unpack_from('>H', cmap, starts_at + segment * 2)
+            delta, = struct.unpack_from('>h', cmap, deltas_at + segment * 2)
+            range_offset_at = ranges_at + segment * 2
+            range_offset, = struct.unpack_from('>H', cmap, range_offset_at)
+            for code in range(start, min(end, 0xFFFE) + 1):
+                if range_offset:
+                    glyph, = struct.unpack_from(
+                        '>H', cmap,
+                        range_offset_at + range_offset + (code - start) * 2
+                    )
+                    if glyph:
+                        glyph = (glyph + delta) & 0xFFFF
+                else:
+                    glyph = (code + delta) & 0xFFFF
+                if glyph:
+                    mapping[code] = glyph
+        return mapping
+
+    @staticmethod
+    def read_cmap_12(cmap, offset):
+        groups = struct.unpack_from('>I', cmap, offset + 12)[0]
+        mapping = {}
+        for group in range(groups):
+            start, end, glyph = struct.unpack_from(
+                '>3I', cmap, offset + 16 + group * 12
+            )
+            for code in range(start, end + 1):
+                mapping[code] = glyph + code - start
+        return mapping
+
+    def glyph(self, char):
+        return self.cmap.get(ord(char), 0)
+
+    def width(self, glyph):
+        """Ширина глифа в тысячных долях кегля."""
+        return self.advances[glyph] * 1000 // self.units_per_em
+
+    def text_width(self, text, size):
+        return sum(self.width(self.glyph(char)) for char in text) * size / 1000
+
+    def components(self, glyph):
+        """Глифы, из которых собран составной глиф."""
+        glyf_offset = self.tables[b'glyf'][0]
+        start, end = self.loca[glyph], self.loca[glyph + 1]
+        if end <= start:
+            return []
+        data = self.data[glyf_offset + start:glyf_offset + end]
+        if struct.unpack_from('>h', data, 0)[0] >= 0:
+            return []
+        components = []
+        position = 10
+        while True:
+            flags, component = struct.unpack_from('>HH', data, position)
+            components.append(component)
+            position += 4
+            position += 4 if flags & ARG_1_AND_2_ARE_WORDS else 2
+            if flags & WE_HAVE_A_SCALE:
+                position += 2
+            elif flags & WE_HAVE_AN_X_AND_Y_SCALE:
+                position += 4
+            elif flags & WE_HAVE_A_TWO_BY_TWO:
+                position += 8
+            if not flags & MORE_COMPONENTS:
+                return components
+
+    def subset(self, glyphs):
+        """Шрифт, в котором сохранены только указанные глифы.
+
+        Номера глифов не меняются, поэтому остальные глифы остаются
+        пустыми, а таблица loca всегда записывается в длинном формате.
+        """
+        keep = {0}
+        pending = list(glyphs)
+        while pending:
+            glyph = pending.pop()
+            if glyph not in keep:
+                keep.add(glyph)
+                pending.extend(self.components(glyph))
+        glyf_offset = self.tables[b'glyf'][0]
+        glyf = bytearray()
+        loca = []
+        for glyph in range(self.num_glyphs):
+            loca.append(len(glyf))
+            if glyph in keep:
+                start, end = self.loca[glyph], self.loca[glyph + 1]
+                glyf += self.data[glyf_offset + start:glyf_offset + end]
+                glyf += b'\0' * (-len(glyf) % 4)
+        loca.append(len(glyf))
+        head = bytearray(self.table(b'head'))
+        struct.pack_into('>I', head, 8, 0)
+        struct.pack_into('>h', head, 50, 1)
+        tables = {
+            tag: self.table(tag) for tag in SUBSET_TABLES
+            if tag in self.tables
+        }
+        tables.update({
+            b'glyf': bytes(glyf),
+            b'head': bytes(head),
+            b'loca': struct.pack(f'>{len(loca)}I', *loca),
+        })
+        return build_font(tables)
+
+
+def table_checksum(data):
+    data += b'\0' * (-len(data) % 4)
+    return sum(struct.unpack(f'>{len(data) // 4}I', data)) & 0xFFFFFFFF
+
+
+def build_font(tables):
+    count = len(tables)
+    power = 1
+    while power * 2 <= count:
+        power *= 2
+    entry_selector = power.bit_length() - 1
+    header = struct.pack(
+        '>IHHHH', 0x00010000, count, power * 16, entry_selector,
+        count * 16 - power * 16
+    )
+    offset = 12 + count * 16
+    directory = b''
+    body = b''
+    for tag in sorted(tables):
+        data = tables[tag]
+        directory += struct.pack(
+            '>4sIII', tag, table_checksum(data), offset + len(body), len(data)
+        )
+        body += data + b'\0' * (-len(data) % 4)
+    return header + directory + body
+
+
+class PdfDocument:
+    """Записывает строки текста в PDF, отдавая его по частям.
+
+    Страницы выводятся по мере заполнения, поэтому в памяти держится
+    только текущая страница и множество использованных глифов.
+    """
+    catalog_id = 1
+    pages_id = 2
+    font_id = 3
+    cid_font_id = 4
+    descriptor_id = 5
+    font_file_id = 6
+    to_unicode_id = 7
+
+    def __init__(self, font_path, font_size=FONT_SIZE, leading=LEADING):
+        self.font = TrueTypeFont.load(font_path)
+        self.font_size = font_size
+        self.leading = leading
+        self.lines_per_page = (PAGE_HEIGHT - 2 * MARGIN) // leading
+        self.max_width = PAGE_WIDTH - 2 * MARGIN
+
+    def render(self, lines):
+        self.offsets = {}
+        self.position = 0
+        self.next_id = self.to_unicode_id + 1
+        self.page_ids = []
+        self.used = {}
+        yield self.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        page = []
+        for line in lines:
+            for part in self.wrap(line):
+                page.append(part)
+                if len(page) == self.lines_per_page:
+                    yield self.write_page(page)
+                    page = []
+        if page or not self.page_ids:
+            yield self.write_page(page)
+        yield self.write_font()
+        yield self.write_object(self.pages_id, (
+            '<< /Type /Pages /Kids [{}] /Count {} >>'.format(
+                ' '.join(f'{page_id} 0 R' for page_id in self.page_ids),
+                len(self.page_ids)
+            )
+        ).encode())
+        yield self.write_object(
+            self.catalog_id,
+            f'<< /Type /Catalog /Pages {self.pages_id} 0 R >>'.encode()
+        )
+        yield self.write_trailer()
+
+    def wrap(self, line):
+        words = line.split(' ')
+        current = ''
+        for word in words:
+            candidate = f'{current} {word}' if current else word
+            if (current and self.font.text_width(
+                    candidate, self.font_size) > self.max_width):
+                yield current
+                current = word
+            else:
+                current = candidate
+        yield current
+
+    def write(self, data):
+        self.position += len(data)
+        return data
+
+    def write_object(self, object_id, body):
+        self.offsets[object_id] = self.position
+        return self.write(
+            f'{object_id} 0 obj\n'.encode() + body + b'\nendobj\n'
+        )
+
+    def write_stream(self, object_id, data, extra=''):
+        data = zlib.compress(data)
+        return self.write_object(
+            object_id,
+            f'<< /Length {len(data)} /Filter /FlateDecode{extra} >>\n'
+            'stream\n'.encode() + data + b'\nendstream'
+        )
+
+    def encode(self, text):
+        glyphs = []
+        for char in text:
+            glyph = self.font.glyph(char)
+            self.used.setdefault(glyph, char)
+            glyphs.append(f'{glyph:04X}')
+        return ''.join(glyphs)
+
+    def write_page(self, lines):
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self.page_ids.append(page_id)
+        text = ''.join(f'<{self.encode(line)}> Tj T*\n' for line in lines)
+        content = (
+            f'BT /F1 {self.font_size} Tf {self.leading} TL '
+            f'{MARGIN} {PAGE_HEIGHT - MARGIN} Td\n{text}ET'
+        ).encode()
+        return self.write_stream(content_id, content) + self.write_object(
+            page_id,
+            f'<< /Type /Page /Parent {self.pages_id} 0 R '
+            f'/MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] '
+            f'/Resources << /Font << /F1 {self.font_id} 0 R >> >> '
+            f'/Contents {content_id} 0 R >>'.encode()
+        )
+
+    def write_font(self):
+        font = self.font
+        scale = 1000 / font.units_per_em
+        bbox = ' '.join(str(int(value * scale)) for value in font.bbox)
+        widths = ' '.join(
+            f'{glyph} [{font.width(glyph)}]' for glyph in sorted(self.used)
+        )
+        name = 'FGSUBS+DejaVuSans'
+        font_file = font.subset(self.used)
+        return b''.join((
+            self.write_object(self.font_id, (
+                f'<< /Type /Font /Subtype /Type0 /BaseFont /{name} '
+                f'/Encoding /Identity-H '
+                f'/DescendantFonts [{self.cid_font_id} 0 R] '
+                f'/ToUnicode {self.to_unicode_id} 0 R >>'
+            ).encode()),
+            self.write_object(self.cid_font_id, (
+                f'<< /Type /Font /Subtype /CIDFontType2 /BaseFont /{name} '
+                '/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) '
+                '/Supplement 0 >> '
+                f'/FontDescriptor {self.descriptor_id} 0 R '
+                f'/CIDToGIDMap /Identity /W [{widths}] >>'
+            ).encode()),
+            self.write_object(self.descriptor_id, (
+                f'<< /Type /FontDescriptor /FontName /{name} /Flags 32 '
+                f'/FontBBox [{bbox}] /ItalicAngle 0 '
+                f'/Ascent {int(font.ascent * scale)} '
+                f'/Descent {int(font.descent * scale)} '
+                f'/CapHeight {int(font.ascent * scale)} /StemV 80 '
+                f'/FontFile2 {self.font_file_id} 0 R >>'
+            ).encode()),
+            self.write_stream(
+                self.font_file_id, font_file, f' /Length1 {len(font_file)}'
+            ),
+            self.write_stream(self.to_unicode_id, self.to_unicode()),
+        ))
+
+    def to_unicode(self):
+        glyphs = sorted(self.used.items())
+        blocks = []
+        for start in range(0, len(glyphs), 100):
+            chunk = glyphs[start:start + 100]
+            entries = '\n'.join(
+                '<{:04X}> <{}>'.format(
+                    glyph, char.encode('utf-16-be').hex().upper()
+                )
+                for glyph, char in chunk
+            )
+            blocks.append(
+                f'{len(chunk)} beginbfchar\n{entries}\nendbfchar'
+            )
+        return (
+            '/CIDInit /ProcSet findresource begin\n'
+            '12 dict begin\nbegincmap\n'
+            '/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) '
+            '/Supplement 0 >> def\n'
+            '/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n'
+            '1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n'
+            + '\n'.join(blocks)
+            + '\nendcmap\nCMapName currentdict /CMap defineresource pop\n'
+            'end\nend'
+        ).encode()
+
+    def write_trailer(self):
+        size = self.next_id
+        xref_position = self.position
+        entries = ['0000000000 65535 f ']
+        for object_id in range(1, size):
+            entries.append(f'{self.offsets[object_id]:010d} 00000 n ')
+        return self.write((
+            f'xref\n0 {size}\n' + '\n'.join(entries) + '\n'
+            f'trailer\n<< /Size {size} /Root {self.catalog_id} 0 R >>\n'
+            f'startxref\n{xref_position}\n%%EOF\n'
+        ).encode())
@@ -0,0 +1,109 @@
+"""Идемпотентные добавление и удаление связей пользователя.
+
+Избранное, список покупок и подписки пишутся одним вставляющим
+запросом, пропускающим уже существующие пары по уникальному
+ограничению, или одним удаляющим запросом. Перед записью блокируется
+строка пользователя, а у подписок и строки авторов, все в порядке id,
+поэтому одновременные запросы одного пользователя выполняются по
+очереди и точно знают, какие связи добавили или удалили, а встречные
+подписки двух пользователей не ждут друг друга по кругу. Счётчики и
+список покупок меняются после этого одним запросом на всю пачку:
+сигналы удаления внутри batch() только собирают id.
+"""
+from contextlib import contextmanager
+from threading import local
+
+from django.db import transaction
+from django.db.models import F
+from users.models import Subscriptions, User
+
+from foodgram.models import Favorite, Recipe, ShoppingList
+from foodgram.response_cache import COUNTERS, invalidate
+from foodgram.shopping_list import change_cart_recipes
+
+# Связь -> (поле с id объекта, модель объекта, её счётчик связей).
+RELATIONS = {
+    Favorite: ('recipe_id', Recipe, 'favorites_count'),
+    ShoppingList: ('recipe_id', Recipe, 'in_carts_count'),
+    Subscriptions: ('author_id', User, 'followers_count'),
+}
+
+BATCH = local()
+
+
+def relations_changed(model, user_id, ids, sign):
+    """Переносит добавление (sign=1) или удаление (sign=-1) связей."""
+    _, target, counter = RELATIONS[model]
+    target.objects.filter(pk__in=ids).update(**{counter: F(counter) + sign})
+    if model is ShoppingList:
+        change_cart_recipes(user_id, ids, sign)
+    if model is not Subscriptions:
+        invalidate(COUNTERS)
+
+
+@contextmanager
+def batch():
+    """Собирает id объектов связей, о которых сообщают сигналы в блоке.
+
+    Счётчики по ним меняет вызывающий, одним запросом на всю пачку.
+    """
+    BATCH.ids = ids = []
+    try:
+        yield ids
+    finally:
+        BATCH.ids = None
+
+
+def relation_changed(model, user_id, pk, sign):
+    """Учитывает связь из сигнала или откладывает её до конца пачки."""
+    ids = getattr(BATCH, 'ids', None)
+    if ids is None:
+        relations_changed(model, user_id, [pk], sign)
+    else:
+        ids.append(pk)
+
+
+def lock_user(user, ids=()):
+    """Блокирует пользователя, а для подписок и авторов, в порядке id.
+
+    Подписка меняет счётчик автора, поэтому без общего порядка двое,
+    подписывающиеся друг на друга, заблокировали бы каждый себя и по
+    кругу ждали бы строку другого.
+    """
+    list(User.objects.select_for_update().filter(
+        pk__in=sorted({user.pk, *ids})
+    ).order_by('pk').values_list('pk', flat=True))
+
+
+def lock(model, user, ids):
+    lock_user(user, ids if RELATIONS[model][1] is User else ())
+
+
+@transaction.atomic
+def add_relations(model, user, ids):
+    """Связывает user с объектами ids и возвращает id новых связей."""
+    field = RELATIONS[model][0]
+    lock(model, user, ids)
+    existing = set(model.objects.filter(
+        user=user, **{f'{field}__in': ids}
+    ).values_list(field, flat=True))
+    added = [pk for pk in dict.fromkeys(ids) if pk not in existing]
+    if added:
+        model.objects.bulk_create(
+            (model(user=user, **{field: pk}) for pk in added),
+            ignore_conflicts=True
+        )
+        relations_changed(model, user.pk, added, 1)
+    return added
+
+
+@transaction.atomic
+def remove_relations(model, user, ids):
+    """Удаляет связи user с объектами ids и возвращает id удалённых."""
+    field = RELATIONS[model][0]
+    lock(model, user, ids)
+    with batch() as removed:
+        model.objects.filter(user=user, **{f'{field}__in': ids}).delete()
+    if removed:
+        relations_changed(model, user.pk, removed, -1)
+    return removed
@@ -0,0 +1,79 @@
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    if orjson else 0
+)
+LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson, если он установлен.
+
+    ReturnDict и ReturnList orjson кодирует сам как dict и list, а
+    ленивые строки, Decimal, даты и всё остальное отдаёт default из
+    JSONEncoder DRF, поэтому вывод совпадает с обычным рендерером.
+    Отступы, пробелы после разделителей и экранирование не-ASCII
+    orjson не умеет, такие ответы строит стандартный json.
+    """
+    encoder = JSONEncoder()
+
+    def uses_orjson(self, accepted_media_type, renderer_context):
+        return orjson is not None and self.compact and not (
+            self.ensure_ascii
+        ) and self.get_indent(
+            accepted_media_type, renderer_context or {}
+        ) is None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or not self.uses_orjson(
+                accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        content = orjson.dumps(
+            data, default=self.encoder.default, option=ORJSON_OPTIONS
+        )
+        for separator, escaped in LINE_SEPARATORS:
+            if separator in content:
+                content = content.replace(separator, escaped)
+        return content
+
+
+class ExportRenderer(BaseRenderer):
+    """Рендерер формата выгрузки.
+
+    Сама выгрузка отдаётся потоком в обход рендерера, а он сам нужен для
+    выбора формата по ?format= или Accept и для вывода ошибок.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode()
+
+
+class PlainTextRenderer(ExportRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class PDFRenderer(ExportRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
@@ -0,0 +1,188 @@
+"""Готовые ответы для анонимных GET-запросов в кэше Django.
+
+Аноним видит одно и то же: флаги избранного, покупок и подписок у него
+всегда ложны. Ключ ответа строится из адреса, нормализованных
+параметров запроса, формата и поколений данных, от которых ответ
+зависит. Запись рецепта сменяет только свои поколения: карточку этого
+рецепта, списки без фильтра по тегам и списки по его тегам. Старые
+записи не удаляются, а перестают находиться и истекают по таймауту.
+
+Поколение — случайная строка, а не счётчик: если кэш вытеснит ключ
+поколения, новое значение не совпадёт ни с одним прежним.
+"""
+import hashlib
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from foodgram.cache import HitCounter, VersionedCache
+
+EVERYTHING = 'all'
+RECIPES = 'recipes'
+COUNTERS = 'counters'
+COUNTER_ORDERINGS = ('favorites_count', 'in_carts_count')
+STORED_HEADERS = ('ETag', 'Last-Modified', 'Vary')
+
+
+def tag_flags():
+    from foodgram.models import Tag
+
+    return dict(Tag.objects.values_list('slug', 'flag'))
+
+
+TAG_FLAGS = VersionedCache('tag-flags', tag_flags)
+
+
+def recipe_generation(pk):
+    return f'recipe:{pk}'
+
+
+def tag_generation(flag):
+    return f'tag:{flag}'
+
+
+def mask_generations(mask):
+    """Поколения тегов, биты которых стоят в маске рецепта."""
+    return [
+        tag_generation(1 << bit) for bit in range(mask.bit_length())
+        if mask >> bit & 1
+    ]
+
+
+def normalize_query(query_params):
+    """Параметры запроса без зависимости от их порядка."""
+    return sorted(
+        (key, sorted(values)) for key, values in query_params.lists()
+    )
+
+
+class ResponseCache(HitCounter):
+
+    def __init__(self, name):
+        super().__init__(f'responses-{name}')
+        self.prefix = f'foodgram:response:{name}'
+
+    def enabled(self):
+        return settings.RESPONSE_CACHE_TIMEOUT > 0
+
+    def generations(self, names):
+        keys = [f'foodgram:response-generation:{name}' for name in names]
+        values = cache.get_many(keys)
+        for key in keys:
+            if key not in values:
+                cache.add(key, uuid4().hex, None)
+                values[key] = cache.get(key)
+        return [values[key] for key in keys]
+
+    def key(self, request, dependencies):
+        content = repr((
+            request.build_absolute_uri(request.path),
+            normalize_query(request.query_params),
+            request.accepted_renderer.format,
+            self.generations(sorted(set(dependencies))),
+        ))
+        return f'{self.prefix}:{hashlib.sha1(content.encode()).hexdigest()}'
+
+    def load(self, request, key):
+        stored = cache.get(key)
+        if stored is None:
+            return None
+        content, headers = stored
+        response = HttpResponse(content, content_type=headers['Content-Type'])
+        for header, value in headers.items():
+            response[header] = value
+        response['X-Cache'] = 'HIT'
+        return get_conditional_response(
+            request._request,
+            etag=headers.get('ETag'),
+            last_modified=parse_http_date_safe(headers.get('Last-Modified')),
+            response=response
+        )
+
+    def store(self, key, response):
+        response.render()
+        headers = {
+            header: response[header]
+            for header in ('Content-Type', *STORED_HEADERS)
+            if header in response
+        }
+        cache.set(
+            key, (response.content, headers),
+            settings.RESPONSE_CACHE_TIMEOUT
+        )
+        response['X-Cache'] = 'MISS'
+
+
+def bump_generations(*names):
+    for name in names:
+        cache.set(
+            f'foodgram:response-generation:{name}', uuid4().hex, None
+        )
+
+
+def invalidate(*names):
+    """Сменяет поколения сразу и ещё раз после фиксации транзакции.
+
+    Как и у VersionedCache, повторная смена не даёт закрепиться ответу,
+    построенному по ещё не зафиксированным данным.
+    """
+    bump_generations(*names)
+    transaction.on_commit(lambda: bump_generations(*names))
+
+
+def invalidate_recipe(recipe):
+    """Ответы, в которые рецепт попадает до и после записи."""
+    mask = recipe.tags_mask | getattr(recipe, 'replaced_tags_mask', 0)
+    invalidate(
+        recipe_generation(recipe.pk), RECIPES, *mask_generations(mask)
+    )
+
+
+class ResponseCacheMixin:
+    """Кэш list и retrieve для анонимов.
+
+    Наследник задаёт response_cache и перечисляет поколения ответа в
+    get_list_dependencies и get_detail_dependencies.
+    """
+    response_cache = None
+
+    def get_list_dependencies(self):
+        return [EVERYTHING]
+
+    def get_detail_dependencies(self):
+        return [EVERYTHING]
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(
+            self.get_list_dependencies, super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(
+            self.get_detail_dependencies, super().retrieve,
+            request, *args, **kwargs
+        )
+
+    def cached(self, dependencies, view, request, *args, **kwargs):
+        if (request.method != 'GET' or not request.user.is_anonymous
+                or not self.response_cache.enabled()):
+            return view(request, *args, **kwargs)
+        key = self.response_cache.key(request, dependencies())
+        response = self.response_cache.load(request, key)
+        if response is not None:
+            self.response_cache.count('hits')
+            return response
+        self.response_cache.count('misses')
+        response = view(request, *args, **kwargs)
+        if isinstance(response, Response) and response.status_code == 200:
+            response = self.finalize_response(
+                request, response, *args, **kwargs
+            )
+            self.response_cache.store(key, response)
+        return response
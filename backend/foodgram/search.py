@@ -0,0 +1,66 @@
+import re
+
+from django.conf import settings
+
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_name(value):
+    """Приводит название к виду для поиска: регистр, «ё» и пробелы."""
+    return WHITESPACE.sub(' ', value.casefold().replace('ё', 'е')).strip()
+
+
+def get_search_limit(request):
+    """Число подсказок из limit в пределах настроек."""
+    try:
+        limit = int(request.query_params['limit'])
+    except (KeyError, ValueError):
+        return settings.INGREDIENT_SEARCH_LIMIT
+    if limit <= 0:
+        return settings.INGREDIENT_SEARCH_LIMIT
+    return min(limit, settings.INGREDIENT_SEARCH_MAX_LIMIT)
+
+
+def unique_matches(matches, limit, found, seen):
+    """Дополняет found до limit ингредиентами matches без повторов.
+
+    Строки читаются пачками по limit: повторы редки, и обычно хватает
+    одного запроса.
+    """
+    offset = 0
+    while len(found) < limit:
+        batch = list(matches[offset:offset + limit])
+        for ingredient in batch:
+            key = (ingredient.search_name, ingredient.measurement_unit)
+            if key not in seen and len(found) < limit:
+                seen.add(key)
+                found.append(ingredient)
+        if len(batch) < limit:
+            break
+        offset += limit
+
+
+def search_ingredients(queryset, query, limit):
+    """Ингредиенты, в названии которых есть query.
+
+    Сначала идут совпадения с начала названия, затем остальные, внутри
+    групп — по алфавиту. Совпадения с начала ищутся по индексу
+    search_name, а поиск подстроки по всей таблице выполняется, только
+    если их меньше limit. Ингредиенты с одинаковыми названием и единицей
+    измерения выводятся один раз.
+    """
+    query = normalize_name(query)
+    found = []
+    seen = set()
+    prefixed = queryset.filter(search_name__startswith=query)
+    unique_matches(
+        prefixed.order_by('search_name', 'id'), limit, found, seen
+    )
+    if len(found) < limit:
+        unique_matches(
+            queryset.filter(search_name__contains=query).exclude(
+                search_name__startswith=query
+            ).order_by('search_name', 'id'),
+            limit, found, seen
+        )
+    return found
@@ -1,11 +1,25 @@
-from django.shortcuts import get_object_or_404
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
+from django.db.models import Manager
 from drf_base64.fields import Base64ImageField
 from rest_framework import serializers
-from users.models import User
-from users.serializers import RecipeUserSerializer, UserGetSerializer
-
-from foodgram.models import (Favorite, Ingredient, IngredientsRecipe, Recipe,
-                             ShoppingList, Tag)
+from rest_framework.utils import html
+from users.models import User, annotate_is_subscribed
+from users.serializers import UserGetSerializer
+
+from foodgram.cache import Catalog
+from foodgram.fields import (BulkListSerializer, BulkPrimaryKeyRelatedField,
+                             RecipeImageField)
+from foodgram.images import describe_variants, represent_variants
+from foodgram.models import (Ingredient, IngredientsRecipe, Recipe, Tag,
+                             TagRecipe)
+from foodgram.shopping_list import change_recipe_ingredients
+from foodgram.viewer import (CART, FAVORITES, SUBSCRIPTIONS,
+                             ViewerListSerializer, viewer_flag)
 from rest_framework.validators import UniqueValidator, UniqueTogetherValidator
 
 TAG_VALIDATION_ERROR = 'Теги обязательны для заполнения'
@@ -13,8 +27,7 @@ INGREDIENT_VALIDATE_ERROR = 'Добавьте ингредиенты'
 INGREDIENT_UNIQUE_ERROR = 'Ингредиенты должны быть разными'
 AMOUNT_VALIDATE_ERROR = 'Количество ингредиента должно быть больше 0!'
 COOKING_TIME_ERROR = 'Время приготовления должно быть больше 0'
-RECIPE_ADD_UNVALIDATED = 'Рецепт уже добавлен в избранное'
-SHOPLIST_ADD_UNVALIDATED = 'Рецепт уже добавлен в покупки'
+INVALID_JSON_FIELD = 'Ожидается список в формате JSON'
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -38,6 +51,9 @@ class TagSerializer(serializers.ModelSerializer):
         )
 
 
+TAG_CATALOG = Catalog('tags', Tag.objects, TagSerializer)
+
+
 class IngredientSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -49,6 +65,11 @@ class IngredientSerializer(serializers.ModelSerializer):
         )
 
 
+INGREDIENT_CATALOG = Catalog(
+    'ingredients', Ingredient.objects, IngredientSerializer
+)
+
+
 class RecipeIngredientGetSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(read_only=True, source='ingredient.id')
     name = serializers.CharField(read_only=True, source='ingredient.name')
@@ -68,7 +89,7 @@ class RecipeIngredientGetSerializer(serializers.ModelSerializer):
 
 
 class IngredientsRecipePostSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
+    id = BulkPrimaryKeyRelatedField(
         queryset=Ingredient.objects.all()
     )
     amount = serializers.IntegerField(write_only=True)
@@ -76,6 +97,7 @@ class IngredientsRecipePostSerializer(serializers.ModelSerializer):
     class Meta:
         model = IngredientsRecipe
         fields = ('id', 'amount')
+        list_serializer_class = BulkListSerializer
         constraints = (
             UniqueTogetherValidator(
                 queryset=IngredientsRecipe.objects.all(),
@@ -84,14 +106,105 @@ class IngredientsRecipePostSerializer(serializers.ModelSerializer):
         )
 
 
+AUTHOR_FIELDS = UserGetSerializer.Meta.fields
+INGREDIENT_FIELDS = RecipeIngredientGetSerializer.Meta.fields
+
+
+def card_image(name, storage, request):
+    if not name:
+        return None
+    url = storage.url(name)
+    return request.build_absolute_uri(url) if request else url
+
+
+def recipe_cards(rows, request):
+    """Карточки рецептов из строк as_cards тремя запросами на страницу.
+
+    Повторяет вывод RecipeGetSerializer: те же ключи в том же порядке и
+    те же значения, но без полей DRF на каждый объект.
+    """
+    if not rows:
+        return []
+    ids = [row['id'] for row in rows]
+    user = request.user if request else AnonymousUser()
+    authors = {
+        author['id']: author
+        for author in annotate_is_subscribed(
+            User.objects.filter(pk__in={row['author_id'] for row in rows}),
+            user
+        ).order_by().values(*AUTHOR_FIELDS)
+    }
+    catalog = TAG_CATALOG.get().by_id
+    links = list(TagRecipe.objects.filter(recipe_id__in=ids).order_by(
+        'tag_id'
+    ).values_list('recipe_id', 'tag_id'))
+    tags = dict(catalog)
+    missing = {tag for _, tag in links if tag not in tags}
+    if missing:
+        tags.update(
+            (tag.id, TagSerializer(tag).data)
+            for tag in Tag.objects.filter(id__in=missing)
+        )
+    recipe_tags = defaultdict(list)
+    for recipe, tag in links:
+        recipe_tags[recipe].append(tags[tag])
+    ingredients = defaultdict(list)
+    for recipe, *values in IngredientsRecipe.objects.filter(
+        recipe_id__in=ids
+    ).order_by('id').values_list(
+        'recipe_id', 'ingredient_id', 'ingredient__name',
+        'ingredient__measurement_unit', 'amount'
+    ):
+        ingredients[recipe].append(dict(zip(INGREDIENT_FIELDS, values)))
+    storage = Recipe._meta.get_field('image').storage
+    return [
+        {
+            'id': row['id'],
+            'tags': recipe_tags[row['id']],
+            'author': authors[row['author_id']],
+            'ingredients': ingredients[row['id']],
+            'is_favorited': row['is_favorited'],
+            'is_in_shopping_cart': row['is_in_shopping_cart'],
+            'name': row['name'],
+            'image': card_image(row['image'], storage, request),
+            'image_variants': describe_variants(
+                json.loads(row['image_variants'] or '{}'), storage, request
+            ),
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+        }
+        for row in rows
+    ]
+
+
+class RecipeCardListSerializer(ViewerListSerializer):
+    """Список рецептов: строки из as_cards собираются recipe_cards.
+
+    Модели, например из with_related, сериализуются обычным путём.
+    """
+
+    def to_representation(self, data):
+        rows = list(data.all() if isinstance(data, Manager) else data)
+        if not rows or not isinstance(rows[0], dict):
+            return super().to_representation(rows)
+        return recipe_cards(rows, self.context.get('request'))
+
+
 class RecipeGetSerializer(serializers.ModelSerializer):
-    tags = TagSerializer(read_only=True, many=True)
+    tags = serializers.SerializerMethodField(
+        method_name='get_tags',
+        read_only=True
+    )
     author = UserGetSerializer()
     ingredients = serializers.SerializerMethodField(
         method_name='get_ingredients',
         read_only=True
     )
     image = Base64ImageField(read_only=True)
+    image_variants = serializers.SerializerMethodField(
+        method_name='get_image_variants',
+        read_only=True
+    )
     is_favorited = serializers.SerializerMethodField(
         method_name='get_is_favorited',
         read_only=True
@@ -112,46 +225,51 @@ class RecipeGetSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
         )
+        list_serializer_class = RecipeCardListSerializer
         read_only_fields = (
             'name',
             'text',
             'cooking_time',
         )
 
+    viewer_relations = (
+        (FAVORITES, 'pk'), (CART, 'pk'), (SUBSCRIPTIONS, 'author_id')
+    )
+
+    def get_image_variants(self, obj):
+        return represent_variants(obj, self.context.get('request'))
+
+    def get_tags(self, obj):
+        tags = TAG_CATALOG.get().by_id
+        return [
+            tags[tag.id] if tag.id in tags else TagSerializer(tag).data
+            for tag in obj.tags.all()
+        ]
+
     def get_ingredients(self, obj):
-        queryset = IngredientsRecipe.objects.filter(recipe=obj)
-        return RecipeIngredientGetSerializer(queryset, many=True).data
+        return RecipeIngredientGetSerializer(
+            obj.ingredients_recipe.all(), many=True
+        ).data
 
     def get_is_favorited(self, obj):
-        user = self.context['request'].user
-        if user.is_anonymous:
-            return False
-        return Favorite.objects.filter(
-            user=user,
-            recipe=obj
-        ).exists()
+        return viewer_flag(self.context, FAVORITES, obj)
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context['request'].user
-        if user.is_anonymous:
-            return False
-        return ShoppingList.objects.filter(
-            user=user,
-            recipe=obj
-        ).exists()
+        return viewer_flag(self.context, CART, obj)
 
 
 class RecipeSerializer(serializers.ModelSerializer):
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
         many=True,
     )
     author = UserGetSerializer(read_only=True)
     ingredients = IngredientsRecipePostSerializer(many=True)
-    image = Base64ImageField()
+    image = RecipeImageField()
 
     class Meta:
         model = Recipe
@@ -166,149 +284,153 @@ class RecipeSerializer(serializers.ModelSerializer):
             'cooking_time',
         )
 
+    def to_internal_value(self, data):
+        if html.is_html_input(data):
+            data = self.decode_form(data)
+        return super().to_internal_value(data)
+
+    def decode_form(self, data):
+        """Данные multipart/form-data в виде словаря.
+
+        Ингредиенты передаются строкой JSON, теги — строкой JSON или
+        повторением поля.
+        """
+        decoded = {}
+        for key, values in data.lists():
+            if key == 'tags' and not values[0].startswith('['):
+                decoded[key] = values
+            elif key in ('tags', 'ingredients'):
+                try:
+                    decoded[key] = json.loads(values[0])
+                except ValueError:
+                    raise serializers.ValidationError(
+                        {key: [INVALID_JSON_FIELD]}
+                    )
+            else:
+                decoded[key] = values[-1]
+        return decoded
+
     def validate(self, data):
-        init_ingredients = self.initial_data['ingredients']
-        if not init_ingredients:
-            raise serializers.ValidationError(INGREDIENT_VALIDATE_ERROR)
-        ingredients_check = []
+        if 'ingredients' not in data:
+            return data
         ingredients = data['ingredients']
+        if not ingredients:
+            raise serializers.ValidationError(INGREDIENT_VALIDATE_ERROR)
+        ingredients_check = set()
         for ingredient in ingredients:
             amount = ingredient['amount']
             name_ingredient = ingredient['id']
-            if name_ingredient in ingredients_check:
+            if name_ingredient.id in ingredients_check:
                 raise serializers.ValidationError(INGREDIENT_UNIQUE_ERROR)
-            ingredients_check.append(name_ingredient)
+            ingredients_check.add(name_ingredient.id)
             if int(amount) <= 0:
                 raise serializers.ValidationError(
                     f'{name_ingredient.name} {AMOUNT_VALIDATE_ERROR}'
                 )
         return data
 
-    def validate_tags(self, data):
-        tags = self.initial_data['tags']
+    def validate_tags(self, tags):
         if not tags:
             raise serializers.ValidationError(TAG_VALIDATION_ERROR)
-        return data
+        return tags
 
     def validate_cooking_time(self, value):
         if value <= 0:
             raise serializers.ValidationError(COOKING_TIME_ERROR)
         return value
 
-    def add_to_ingredients(self, ingredients, recipe):
-        for ingredient in ingredients:
-            amount = ingredient['amount']
-            name_ingredient = ingredient['id']
-            IngredientsRecipe.objects.create(
-                ingredient=name_ingredient,
-                recipe=recipe,
-                amount=amount
+    def set_tags(self, recipe, tags, created=False):
+        """Добавляет и удаляет только изменившиеся связи с тегами.
+
+        Маску тегов в базе обновляют триггеры, а в recipe она
+        выставляется здесь, чтобы последующий save её не затёр.
+        Прежняя маска нужна, чтобы сбросить ответы по снятым тегам.
+        """
+        recipe.replaced_tags_mask = 0 if created else recipe.tags_mask
+        recipe.tags_mask = sum(tag.flag for tag in tags)
+        new = {tag.id for tag in tags}
+        old = set() if created else set(
+            TagRecipe.objects.filter(recipe=recipe).values_list(
+                'tag_id', flat=True
             )
+        )
+        if old - new:
+            TagRecipe.objects.filter(
+                recipe=recipe, tag_id__in=old - new
+            ).delete()
+        TagRecipe.objects.bulk_create(
+            TagRecipe(recipe=recipe, tag_id=tag) for tag in new - old
+        )
 
+    def set_ingredients(self, recipe, ingredients, created=False):
+        """Приводит состав рецепта к ingredients минимумом запросов.
+
+        bulk_create и bulk_update не вызывают сигналов, поэтому
+        изменения списков покупок переносятся явно. Удаление строк
+        сигналы вызывает и учитывается ими.
+        """
+        new = {item['id'].id: item['amount'] for item in ingredients}
+        old = {} if created else {
+            link.ingredient_id: link
+            for link in IngredientsRecipe.objects.filter(recipe=recipe)
+        }
+        removed = old.keys() - new.keys()
+        if removed:
+            IngredientsRecipe.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        changed = []
+        amounts = {}
+        for ingredient, amount in new.items():
+            link = old.get(ingredient)
+            if link is not None and link.amount != amount:
+                amounts[ingredient] = amount - link.amount
+                link.amount = amount
+                changed.append(link)
+        IngredientsRecipe.objects.bulk_update(changed, ('amount',))
+        IngredientsRecipe.objects.bulk_create(
+            IngredientsRecipe(
+                recipe=recipe, ingredient_id=ingredient, amount=amount
+            )
+            for ingredient, amount in new.items()
+            if ingredient not in old
+        )
+        amounts.update(
+            (ingredient, amount) for ingredient, amount in new.items()
+            if ingredient not in old
+        )
+        if amounts and not created:
+            change_recipe_ingredients(recipe.id, amounts)
+
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(**validated_data)
-        self.add_to_ingredients(ingredients, recipe)
-        recipe.tags.set(tags)
+        self.set_ingredients(recipe, ingredients, created=True)
+        self.set_tags(recipe, tags, created=True)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        tags = validated_data['tags']
-        instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.add_to_ingredients(validated_data.pop('ingredients'), instance)
+        if 'tags' in validated_data:
+            self.set_tags(instance, validated_data.pop('tags'))
+        if 'ingredients' in validated_data:
+            self.set_ingredients(instance, validated_data.pop('ingredients'))
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
-        return RecipeGetSerializer(instance, context=context).data
-
-
-class FavoriteSerializer(serializers.ModelSerializer):
-    user = serializers.PrimaryKeyRelatedField(read_only=True)
-    recipe = serializers.PrimaryKeyRelatedField(read_only=True)
-
-    class Meta:
-        model = Favorite
-        fields = (
-            'user',
-            'recipe'
-        )
-        constraints = (
-            UniqueTogetherValidator(
-                queryset=Favorite.objects.all(),
-                fields=('user', 'recipe'),
-            ),
-        )
-
-    def validate(self, data):
-        user = get_object_or_404(
-            User,
-            username=self.context['request'].user
-        )
-        recipe = get_object_or_404(
-            Recipe,
-            id=self.context['view'].kwargs.get('id')
-        )
-        is_already_add = Favorite.objects.filter(
-            user=user,
-            recipe=recipe
-        ).exists()
-        if is_already_add:
-            raise serializers.ValidationError(RECIPE_ADD_UNVALIDATED)
-        return data
-
-    def to_representation(self, instance):
-        request = self.context.get('request')
-        context = {'request': request}
-        instance = get_object_or_404(
-            Recipe,
-            id=self.context['view'].kwargs.get('id')
-        )
-        return RecipeUserSerializer(instance, context=context).data
-
-
-class ShoppingCartSerializer(serializers.ModelSerializer):
-    user = serializers.PrimaryKeyRelatedField(read_only=True)
-    recipe = serializers.PrimaryKeyRelatedField(read_only=True)
-
-    class Meta:
-        model = ShoppingList
-        fields = (
-            'user',
-            'recipe'
-        )
-        constraints = (
-            UniqueTogetherValidator(
-                queryset=ShoppingList.objects.all(),
-                fields=('user', 'recipe'),
-            ),
+        instance = Recipe.objects.with_related(request.user).get(
+            pk=instance.pk
         )
+        return RecipeGetSerializer(instance, context=context).data
 
-    def validate(self, data):
-        user = get_object_or_404(
-            User,
-            username=self.context['request'].user
-        )
-        recipe = get_object_or_404(
-            Recipe,
-            id=self.context['view'].kwargs.get('id')
-        )
-        already_add = ShoppingList.objects.filter(
-            user=user,
-            recipe=recipe
-        ).exists()
-        if already_add:
-            raise serializers.ValidationError(SHOPLIST_ADD_UNVALIDATED)
-        return data
 
-    def to_representation(self, instance):
-        request = self.context.get('request')
-        context = {'request': request}
-        instance = get_object_or_404(
-            Recipe,
-            id=self.context['view'].kwargs.get('id')
-        )
-        return RecipeUserSerializer(instance, context=context).data
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.RELATIONS_BULK_MAX_SIZE
+    )
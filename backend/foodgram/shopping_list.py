@@ -0,0 +1,152 @@
+import csv
+import json
+from collections import defaultdict
+from itertools import chain
+
+from django.conf import settings
+from django.db.models import Case, F, IntegerField, Value, When
+
+from foodgram.models import IngredientsRecipe, ShoppingCartItem, ShoppingList
+from foodgram.pdf import PdfDocument
+
+SHOPPING_LIST_TITLE = 'список покупок:'
+CSV_HEADER = ('number', 'name', 'measurement_unit', 'amount')
+ITERATOR_CHUNK_SIZE = 500
+
+
+def get_shopping_list(user):
+    """Ингредиенты из списка покупок с суммарным количеством.
+
+    Количества заранее сложены в ShoppingCartItem, поэтому это простое
+    чтение по индексу пользователя. Строки читаются с сервера порциями.
+    """
+    return ShoppingCartItem.objects.filter(user=user).annotate(
+        total=F('total_amount')
+    ).values(
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        'total'
+    ).order_by('ingredient__name').iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+
+
+def change_cart_items(users, amounts):
+    """Прибавляет количества ингредиентов к спискам покупок.
+
+    users — id пользователей или подзапрос с ними, amounts — словарь
+    {id ингредиента: изменение количества}. Недостающие позиции
+    вставляются с нулём, пропуская уже вставленные параллельным
+    запросом, и затем все позиции меняются одним UPDATE. Позиции,
+    количество которых стало нулевым, удаляются.
+    """
+    amounts = {
+        ingredient: amount for ingredient, amount in amounts.items() if amount
+    }
+    if not amounts:
+        return
+    users = list(users)
+    if not users:
+        return
+    added = [
+        ingredient for ingredient, amount in amounts.items() if amount > 0
+    ]
+    if added:
+        ShoppingCartItem.objects.bulk_create(
+            (
+                ShoppingCartItem(
+                    user_id=user, ingredient_id=ingredient, total_amount=0
+                )
+                for user in users
+                for ingredient in added
+            ),
+            ignore_conflicts=True
+        )
+    items = ShoppingCartItem.objects.filter(
+        user_id__in=users, ingredient_id__in=amounts
+    )
+    items.update(total_amount=F('total_amount') + Case(
+        *(When(ingredient_id=ingredient, then=Value(amount))
+          for ingredient, amount in amounts.items()),
+        output_field=IntegerField()
+    ))
+    if len(added) < len(amounts):
+        items.filter(total_amount__lte=0).delete()
+
+
+def change_cart_recipes(user_id, recipe_ids, sign):
+    """Добавляет (sign=1) или убирает (sign=-1) рецепты из списка покупок."""
+    amounts = defaultdict(int)
+    for ingredient, amount in IngredientsRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('ingredient_id', 'amount'):
+        amounts[ingredient] += sign * amount
+    change_cart_items([user_id], amounts)
+
+
+def change_recipe_ingredients(recipe_id, amounts):
+    """Переносит изменение состава рецепта во все списки покупок с ним."""
+    change_cart_items(
+        ShoppingList.objects.filter(recipe_id=recipe_id).values_list(
+            'user_id', flat=True
+        ),
+        amounts
+    )
+
+
+def text_lines(rows):
+    for number, ingredient in enumerate(rows, start=1):
+        yield (
+            f'{number} '
+            f'{ingredient["ingredient__name"]}'
+            f'({ingredient["ingredient__measurement_unit"]}) - '
+            f'{ingredient["total"]}'
+        )
+
+
+def export_txt(rows):
+    yield f'{SHOPPING_LIST_TITLE}\n'
+    for line in text_lines(rows):
+        yield f'{line} \n'
+
+
+class EchoBuffer:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def export_csv(rows):
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(CSV_HEADER)
+    for number, ingredient in enumerate(rows, start=1):
+        yield writer.writerow((
+            number,
+            ingredient['ingredient__name'],
+            ingredient['ingredient__measurement_unit'],
+            ingredient['total'],
+        ))
+
+
+def export_json(rows):
+    separator = '['
+    for ingredient in rows:
+        yield separator + json.dumps({
+            'name': ingredient['ingredient__name'],
+            'measurement_unit': ingredient['ingredient__measurement_unit'],
+            'amount': ingredient['total'],
+        }, ensure_ascii=False)
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+def export_pdf(rows):
+    document = PdfDocument(settings.SHOPPING_LIST_PDF_FONT)
+    return document.render(chain((SHOPPING_LIST_TITLE,), text_lines(rows)))
+
+
+EXPORTERS = {
+    'txt': export_txt,
+    'csv': export_csv,
+    'json': export_json,
+    'pdf': export_pdf,
+}
@@ -0,0 +1,118 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from users.models import User
+
+from foodgram.fuzzy import INGREDIENT_INDEX
+from foodgram.images import delete_variants, load_variants, update_variants
+from foodgram.models import (Favorite, Ingredient, IngredientsRecipe, Recipe,
+                             ShoppingList, Tag)
+from foodgram.relations import relation_changed
+from foodgram.response_cache import (EVERYTHING, TAG_FLAGS, invalidate,
+                                     invalidate_recipe)
+from foodgram.serializers import INGREDIENT_CATALOG, TAG_CATALOG
+from foodgram.shopping_list import change_recipe_ingredients
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно изменяет счётчик на delta на уровне базы данных."""
+    model.objects.filter(pk=pk).update(**{field: F(field) + delta})
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingList)
+def relation_created(sender, instance, created, **kwargs):
+    if created:
+        relation_changed(sender, instance.user_id, instance.recipe_id, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingList)
+def relation_deleted(sender, instance, **kwargs):
+    relation_changed(sender, instance.user_id, instance.recipe_id, -1)
+
+
+@receiver(pre_save, sender=IngredientsRecipe)
+def ingredient_link_changing(sender, instance, **kwargs):
+    instance.saved_amount = None
+    if instance.pk is not None:
+        instance.saved_amount = IngredientsRecipe.objects.filter(
+            pk=instance.pk
+        ).values_list('ingredient_id', 'amount').first()
+
+
+@receiver(post_save, sender=IngredientsRecipe)
+def ingredient_link_saved(sender, instance, **kwargs):
+    amounts = {instance.ingredient_id: instance.amount}
+    if instance.saved_amount is not None:
+        ingredient, amount = instance.saved_amount
+        amounts[ingredient] = amounts.get(ingredient, 0) - amount
+    change_recipe_ingredients(instance.recipe_id, amounts)
+
+
+@receiver(post_delete, sender=IngredientsRecipe)
+def ingredient_link_deleted(sender, instance, **kwargs):
+    change_recipe_ingredients(
+        instance.recipe_id, {instance.ingredient_id: -instance.amount}
+    )
+
+
+def release_file(storage, name):
+    if name:
+        transaction.on_commit(lambda: storage.delete(name))
+
+
+@receiver(pre_save, sender=Recipe)
+def recipe_changing(sender, instance, **kwargs):
+    """Запоминает прежнее изображение, если сохраняется новое."""
+    instance.replaced_image = None
+    if instance.pk is not None and instance.image and (
+            not instance.image._committed):
+        instance.replaced_image = Recipe.objects.filter(
+            pk=instance.pk
+        ).values_list('image', flat=True).first()
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+    release_file(instance.image.storage, instance.replaced_image)
+    update_variants(instance)
+    invalidate_recipe(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+    variants = load_variants(instance)
+    storage = instance.image.storage
+    release_file(storage, instance.image.name)
+    transaction.on_commit(lambda: delete_variants(storage, variants))
+    invalidate_recipe(instance)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    INGREDIENT_INDEX.invalidate()
+    INGREDIENT_CATALOG.invalidate()
+    invalidate(EVERYTHING)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    TAG_CATALOG.invalidate()
+    TAG_FLAGS.invalidate()
+    invalidate(EVERYTHING)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    """Данные автора есть в ответах о его рецептах, вход их не меняет."""
+    if not instance.recipes_count:
+        return
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        invalidate(EVERYTHING)
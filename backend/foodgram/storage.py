@@ -0,0 +1,92 @@
+"""Хранилище медиафайлов с именами по хешу содержимого.
+
+Файл сохраняется как MEDIA_HASHED_DIR/ab/<sha256>.<расширение>, поэтому
+одинаковые картинки лежат на диске один раз, а файл по данному адресу
+никогда не меняется и его можно кешировать навсегда. Каждое сохранение
+увеличивает счётчик ссылок в StoredFile, каждое удаление уменьшает его;
+сам файл удаляется, когда ссылок не остаётся. Файлы вне MEDIA_HASHED_DIR
+(загруженные до появления хранилища) удаляются сразу, как раньше.
+"""
+import hashlib
+import os
+import uuid
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_hashed(name):
+    return name.startswith(f'{settings.MEDIA_HASHED_DIR}/')
+
+
+class HashedStorage(FileSystemStorage):
+
+    def hashed_name(self, digest, name):
+        extension = os.path.splitext(name)[1].lower()
+        return (
+            f'{settings.MEDIA_HASHED_DIR}/{digest[:2]}/{digest}{extension}'
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(content_hash(content), name)
+        self.acquire(name, content.size)
+        if not self.exists(name):
+            self._save(name, content)
+        return name
+
+    def _save(self, name, content):
+        """Пишет во временный файл и атомарно переименовывает его.
+
+        Параллельная загрузка того же содержимого не получит другое имя,
+        а читатель не увидит файл записанным наполовину.
+        """
+        temporary = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        os.replace(self.path(temporary), self.path(name))
+        return name
+
+    def acquire(self, name, size):
+        """Добавляет ссылку на файл двумя запросами, новый он или нет."""
+        from foodgram.models import StoredFile
+
+        StoredFile.objects.bulk_create(
+            (StoredFile(name=name, size=size),), ignore_conflicts=True
+        )
+        StoredFile.objects.filter(name=name).update(
+            references=F('references') + 1
+        )
+
+    def delete(self, name):
+        """Снимает одну ссылку и удаляет файл, когда ссылок не осталось.
+
+        Файл удаляется до фиксации транзакции: параллельное сохранение
+        того же содержимого ждёт на уникальном индексе и после него
+        записывает файл заново.
+        """
+        from foodgram.models import StoredFile
+
+        if not is_hashed(name):
+            super().delete(name)
+            return
+        with transaction.atomic():
+            StoredFile.objects.filter(name=name, references__gt=0).update(
+                references=F('references') - 1
+            )
+            deleted, _ = StoredFile.objects.filter(
+                name=name, references=0
+            ).delete()
+            if deleted:
+                super().delete(name)
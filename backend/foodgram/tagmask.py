@@ -0,0 +1,28 @@
+"""Поддержка Recipe.tags_mask триггерами базы данных.
+
+Маска — сумма Tag.flag тегов рецепта. Триггеры на foodgram_tagrecipe
+обновляют её при любой записи связей, в том числе bulk_create и
+удалении queryset'ом, не добавляя запросов со стороны Django.
+В PostgreSQL их создаёт миграция 0011_tags_mask_trigger.
+"""
+TAG_FLAG = (
+    'coalesce((SELECT flag FROM foodgram_tag WHERE id = {link}.tag_id), 0)'
+)
+ADD_FLAG = (
+    'UPDATE foodgram_recipe SET tags_mask = tags_mask | '
+    f"{TAG_FLAG.format(link='NEW')} WHERE id = NEW.recipe_id;"
+)
+REMOVE_FLAG = (
+    'UPDATE foodgram_recipe SET tags_mask = tags_mask & ~'
+    f"{TAG_FLAG.format(link='OLD')} WHERE id = OLD.recipe_id;"
+)
+
+SQLITE = (
+    'CREATE TRIGGER IF NOT EXISTS foodgram_recipe_tags_mask_insert '
+    f'AFTER INSERT ON foodgram_tagrecipe BEGIN {ADD_FLAG} END',
+    'CREATE TRIGGER IF NOT EXISTS foodgram_recipe_tags_mask_delete '
+    f'AFTER DELETE ON foodgram_tagrecipe BEGIN {REMOVE_FLAG} END',
+    'CREATE TRIGGER IF NOT EXISTS foodgram_recipe_tags_mask_update '
+    'AFTER UPDATE OF recipe_id, tag_id ON foodgram_tagrecipe '
+    f'BEGIN {REMOVE_FLAG} {ADD_FLAG} END',
+)
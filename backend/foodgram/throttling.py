@@ -0,0 +1,195 @@
+"""Ограничение частоты и числа одновременных запросов.
+
+Частота ограничивается корзиной токенов: в корзине помещается столько
+запросов, сколько разрешено за период, и она равномерно наполняется
+за этот период. Так клиент может сделать всплеск запросов, но в среднем
+не превысит заданную скорость. Скорости задаются по областям в
+DEFAULT_THROTTLE_RATES, состояние корзин хранится в кэше THROTTLE_CACHE:
+общий кэш ограничивает клиента по всем процессам, локальный — в каждом
+процессе отдельно. Чтение и запись корзины не атомарны, поэтому
+параллельные запросы одного клиента могут изредка пройти сверх лимита.
+
+Число одновременно выполняемых тяжёлых запросов (вход, загрузка
+изображений) считается в том же кэше: запрос увеличивает счётчик
+области и уменьшает его по завершении. Общий кэш ограничивает все
+процессы вместе, поэтому предел работает и у синхронных воркеров
+gunicorn, выполняющих по одному запросу. Счётчик живёт
+CONCURRENCY_SLOT_TIMEOUT секунд с момента создания, так что места, не
+освобождённые упавшим процессом, со временем возвращаются.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import exceptions, status
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+BUSY = 'Сервер занят, повторите запрос позже'
+
+# Пауза между попытками занять место, секунды.
+SLOT_POLL = 0.05
+
+
+def record_limit(request, limit, remaining, reset):
+    """Запоминает для заголовков ответа самое строгое из ограничений."""
+    request = request._request
+    current = getattr(request, 'rate_limit', None)
+    if current is None or remaining < current[1]:
+        request.rate_limit = (limit, remaining, reset)
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    cache_format = 'foodgram:throttle:%(scope)s:%(ident)s'
+
+    def __init__(self):
+        # Область и скорость известны только в allow_request вместе с view.
+        pass
+
+    @property
+    def cache(self):
+        return caches[settings.THROTTLE_CACHE]
+
+    def get_scope(self, view):
+        return self.scope
+
+    def get_rate(self):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_ident_key(self, request):
+        if request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        self.scope = self.get_scope(view)
+        self.rate = self.get_rate() if self.scope else None
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        refill = self.num_requests / self.duration
+        now = self.timer()
+        tokens, stamp = self.cache.get(self.key, (self.num_requests, now))
+        self.tokens = min(
+            self.num_requests, tokens + max(now - stamp, 0) * refill
+        )
+        allowed = self.tokens >= 1
+        if allowed:
+            self.tokens -= 1
+            self.cache.set(self.key, (self.tokens, now), self.duration)
+        record_limit(
+            request, self.num_requests, math.floor(self.tokens),
+            math.ceil((self.num_requests - self.tokens) / refill)
+        )
+        return allowed
+
+    def wait(self):
+        return (1 - self.tokens) * self.duration / self.num_requests
+
+
+class AnonBucketThrottle(TokenBucketThrottle):
+    """Анонимные запросы по IP-адресу."""
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user.is_authenticated:
+            return None
+        return self.get_ident_key(request)
+
+
+class UserBucketThrottle(TokenBucketThrottle):
+    """Запросы пользователя, откуда бы они ни шли."""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if not request.user.is_authenticated:
+            return None
+        return self.get_ident_key(request)
+
+
+class ScopedBucketThrottle(TokenBucketThrottle):
+    """Запросы к точке с throttle_scope от пользователя или IP-адреса."""
+
+    def get_scope(self, view):
+        return getattr(view, 'throttle_scope', None)
+
+    def get_cache_key(self, request, view):
+        return self.get_ident_key(request)
+
+
+class Busy(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = BUSY
+    default_code = 'busy'
+    wait = 1
+
+
+def slot_key(scope):
+    return f'foodgram:concurrency:{scope}'
+
+
+def acquire_slot(scope, limit):
+    """Занимает место области, ожидая его CONCURRENCY_WAIT секунд.
+
+    Возвращает ключ счётчика или None, если место не освободилось.
+    """
+    cache = caches[settings.THROTTLE_CACHE]
+    key = slot_key(scope)
+    deadline = time.monotonic() + settings.CONCURRENCY_WAIT
+    while True:
+        cache.add(key, 0, settings.CONCURRENCY_SLOT_TIMEOUT)
+        try:
+            if cache.incr(key) <= limit:
+                return key
+            cache.decr(key)
+        except ValueError:
+            # Счётчик истёк между add и incr: создаём его заново.
+            continue
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(SLOT_POLL)
+
+
+def release_slot(key):
+    try:
+        caches[settings.THROTTLE_CACHE].decr(key)
+    except ValueError:
+        pass
+
+
+class ConcurrencyLimitMixin:
+    """Не даёт выполнять больше CONCURRENCY_LIMITS[scope] запросов сразу.
+
+    Запрос ждёт свободного места CONCURRENCY_WAIT секунд, а затем
+    получает ответ 503. Место занимается после проверок доступа и
+    частоты, чтобы отклонённые запросы его не расходовали.
+    """
+    concurrency_scope = None
+
+    def get_concurrency_scope(self):
+        return self.concurrency_scope
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        scope = self.get_concurrency_scope()
+        limit = settings.CONCURRENCY_LIMITS.get(scope) if scope else None
+        if not limit:
+            return
+        slot = acquire_slot(scope, limit)
+        if slot is None:
+            raise Busy()
+        self.concurrency_slot = slot
+
+    def dispatch(self, request, *args, **kwargs):
+        self.concurrency_slot = None
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self.concurrency_slot is not None:
+                release_slot(self.concurrency_slot)
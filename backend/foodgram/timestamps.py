@@ -0,0 +1,25 @@
+"""Recipe.updated_at при записи связей рецепта с тегами и ингредиентами.
+
+Сам рецепт обновляет поле через auto_now, а связи пишутся в том числе
+bulk_create и удалением queryset'ом, поэтому время ставят триггеры.
+В PostgreSQL их создаёт миграция 0012_recipe_touch_trigger.
+"""
+LINKS = ('foodgram_ingredientsrecipe', 'foodgram_tagrecipe')
+
+SQLITE_TOUCH = (
+    'UPDATE foodgram_recipe '
+    "SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') "
+    'WHERE id IN ({recipes});'
+)
+
+SQLITE = tuple(
+    f'CREATE TRIGGER IF NOT EXISTS {table}_touch_{event.lower()} '
+    f'AFTER {event} ON {table} BEGIN '
+    f'{SQLITE_TOUCH.format(recipes=recipes)} END'
+    for table in LINKS
+    for event, recipes in (
+        ('INSERT', 'NEW.recipe_id'),
+        ('DELETE', 'OLD.recipe_id'),
+        ('UPDATE', 'OLD.recipe_id, NEW.recipe_id'),
+    )
+)
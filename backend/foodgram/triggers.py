@@ -0,0 +1,34 @@
+"""Установка функций и триггеров базы данных.
+
+В PostgreSQL они создаются миграциями через PostgreSQLRunSQL и
+удаляются при их откате. В SQLite изменение таблицы пересоздаёт её и
+удаляет триггеры, поэтому там они восстанавливаются после каждой
+миграции вызовом execute.
+"""
+from django.db import connections, migrations
+
+
+def execute(statements, using='default'):
+    """Выполняет statements в базе using."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+class PostgreSQLRunSQL(migrations.RunSQL):
+    """RunSQL, который в других базах ничего не делает."""
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(
+                app_label, schema_editor, from_state, to_state
+            )
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from rest_framework.exceptions import ValidationError
+
+IMAGE_TOO_LARGE = 'Файл больше {size} МБ'
+
+
+def too_large_error():
+    return IMAGE_TOO_LARGE.format(
+        size=settings.RECIPE_IMAGE_MAX_SIZE // (1024 * 1024)
+    )
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """Пишет файлы сразу на диск и обрывает загрузку сверх лимита.
+
+    Лимит проверяется по мере получения данных, так что слишком большой
+    файл не дочитывается до конца.
+    """
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.RECIPE_IMAGE_MAX_SIZE:
+            raise ValidationError({self.field_name: [too_large_error()]})
+        return super().receive_data_chunk(raw_data, start)
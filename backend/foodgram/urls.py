@@ -21,5 +21,19 @@ router.register(
 )
 
 urlpatterns = [
+    path(
+        'recipes/favorite/',
+        FavoriteViewSet.as_view(
+            {'post': 'create_many', 'delete': 'delete_many'}
+        ),
+        name='favorite-many'
+    ),
+    path(
+        'recipes/shopping_cart/',
+        ShoppingCartViewSet.as_view(
+            {'post': 'create_many', 'delete': 'delete_many'}
+        ),
+        name='shopping_cart-many'
+    ),
     path('', include(router.urls)),
 ]
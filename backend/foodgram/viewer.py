@@ -0,0 +1,94 @@
+"""Связи текущего пользователя с авторами и рецептами в пределах запроса.
+
+Флаги is_subscribed, is_favorited и is_in_shopping_cart сериализаторы
+берут из аннотации объекта, если queryset уже посчитал их в том же
+запросе, а иначе из ViewerContext. Контекст создаётся на запрос при
+первом обращении и для каждой связи читает из базы только id объектов
+страницы: списочный сериализатор заранее сообщает их контексту, и
+первый же флаг загружает всю страницу одним запросом. Для анонима
+контекста нет и флаги всегда ложны.
+"""
+from django.db.models import Manager
+from rest_framework import serializers
+from users.models import Subscriptions
+
+from foodgram.models import Favorite, ShoppingList
+
+SUBSCRIPTIONS = 'subscriptions'
+FAVORITES = 'favorites'
+CART = 'cart'
+
+# Связь -> (модель, поле с id объекта, имя аннотации).
+RELATIONS = {
+    SUBSCRIPTIONS: (Subscriptions, 'author_id', 'is_subscribed'),
+    FAVORITES: (Favorite, 'recipe_id', 'is_favorited'),
+    CART: (ShoppingList, 'recipe_id', 'is_in_shopping_cart'),
+}
+
+
+class ViewerContext:
+
+    def __init__(self, user):
+        self.user = user
+        self.pending = {relation: set() for relation in RELATIONS}
+        self.loaded = {relation: set() for relation in RELATIONS}
+        self.related = {relation: set() for relation in RELATIONS}
+
+    def expect(self, relation, ids):
+        """Запоминает id, которые загрузятся вместе с первым флагом."""
+        self.pending[relation].update(ids)
+
+    def load(self, relation, pk):
+        ids = (self.pending[relation] | {pk}) - self.loaded[relation]
+        self.pending[relation].clear()
+        model, field, _ = RELATIONS[relation]
+        self.related[relation].update(model.objects.filter(
+            user=self.user, **{f'{field}__in': ids}
+        ).values_list(field, flat=True))
+        self.loaded[relation].update(ids)
+
+    def has(self, relation, pk):
+        if relation == SUBSCRIPTIONS and pk == self.user.pk:
+            return False
+        if pk not in self.loaded[relation]:
+            self.load(relation, pk)
+        return pk in self.related[relation]
+
+
+def get_viewer(context):
+    """Контекст пользователя из запроса сериализатора или None."""
+    request = context.get('request')
+    if request is None or not request.user.is_authenticated:
+        return None
+    viewer = getattr(request, 'viewer', None)
+    if viewer is None:
+        viewer = request.viewer = ViewerContext(request.user)
+    return viewer
+
+
+def viewer_flag(context, relation, obj):
+    annotation = RELATIONS[relation][2]
+    if hasattr(obj, annotation):
+        return getattr(obj, annotation)
+    viewer = get_viewer(context)
+    if viewer is None:
+        return False
+    return viewer.has(relation, obj.pk)
+
+
+class ViewerListSerializer(serializers.ListSerializer):
+    """Сообщает контексту id страницы для связей из viewer_relations.
+
+    viewer_relations дочернего сериализатора — пары (связь, атрибут
+    объекта с id).
+    """
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, Manager) else data)
+        viewer = get_viewer(self.context)
+        if viewer is not None:
+            for relation, attribute in self.child.viewer_relations:
+                viewer.expect(
+                    relation, (getattr(item, attribute) for item in items)
+                )
+        return super().to_representation(items)
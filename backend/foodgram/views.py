@@ -1,52 +1,105 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+import os
+
+from django.db import transaction
+from django.db.models import (BooleanField, Count, Exists, Max, OuterRef,
+                              Value)
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import exceptions, filters, mixins, status, viewsets
+from rest_framework import exceptions, filters, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import (IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
-from users.models import User
+from users.models import Subscriptions
+from users.serializers import RecipeUserSerializer
 
-from foodgram.filters import IngredientFilter, RecipeFilter
-from foodgram.models import (Favorite, Ingredient, IngredientsRecipe, Recipe,
-                             ShoppingList, Tag)
-from foodgram.pagination import RecipeLimitPagination
+from foodgram.conditional import ConditionalGetMixin, relation_version
+from foodgram.filters import RecipeFilter
+from foodgram.fuzzy import suggest_ingredients
+from foodgram.models import Favorite, Ingredient, Recipe, ShoppingList, Tag
+from foodgram.pagination import (CursorPaginationMixin, KeysetPagination,
+                                 RecipeCursorPagination,
+                                 RecipeLimitPagination)
+from foodgram.parsers import FastJSONParser
 from foodgram.permissions import CheckingUserIsAuthor
-from foodgram.serializers import (FavoriteSerializer, IngredientSerializer,
-                                  RecipeGetSerializer, RecipeSerializer,
-                                  ShoppingCartSerializer, TagSerializer)
+from foodgram.relations import add_relations, remove_relations
+from foodgram.renderers import (CSVRenderer, FastJSONRenderer, PDFRenderer,
+                                PlainTextRenderer)
+from foodgram.response_cache import (COUNTER_ORDERINGS, COUNTERS, EVERYTHING,
+                                     RECIPES, TAG_FLAGS, ResponseCache,
+                                     ResponseCacheMixin, recipe_generation,
+                                     tag_generation)
+from foodgram.search import get_search_limit
+from foodgram.serializers import (INGREDIENT_CATALOG, TAG_CATALOG,
+                                  IngredientSerializer, RecipeGetSerializer,
+                                  RecipeIdsSerializer, RecipeSerializer,
+                                  TagSerializer)
+from foodgram.shopping_list import EXPORTERS, get_shopping_list
+from foodgram.throttling import ConcurrencyLimitMixin
+from foodgram.uploads import LimitedTemporaryFileUploadHandler
 from django.conf import settings
 
-DELETE_RECIPE_ERROR = 'Рецепта нет в избранном'
-DELETE_SHOPLIST_ERROR = 'Рецепта нет в покупках'
-CONTENT_TYPE = 'text/plain'
+MISSING_RECIPES = 'Рецептов нет: {}'
+
+
+class CatalogViewSet(viewsets.ReadOnlyModelViewSet):
+    """Справочник из кэша процесса с ETag и ответом 304."""
+    catalog = None
+    pagination_class = None
+
+    def list(self, request, *args, **kwargs):
+        snapshot = self.catalog.get()
+        return self.conditional_response(snapshot.data, snapshot.etag)
 
+    def retrieve(self, request, *args, **kwargs):
+        snapshot = self.catalog.get()
+        item = snapshot.get_item(kwargs[self.lookup_field])
+        return self.conditional_response(item, snapshot.etags[item['id']])
 
-class CreateDestroyModelViewSet(mixins.CreateModelMixin,
-                                mixins.DestroyModelMixin,
-                                viewsets.GenericViewSet):
-    pass
+    def conditional_response(self, data, etag):
+        etag = quote_etag(etag)
+        response = get_conditional_response(self.request._request, etag=etag)
+        if response is None:
+            response = Response(data)
+        response['ETag'] = etag
+        return response
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ResponseCacheMixin, CatalogViewSet):
+    response_cache = ResponseCache('tags')
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
-    pagination_class = None
+    catalog = TAG_CATALOG
 
 
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientsViewSet(CatalogViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = (IngredientFilter,)
-    search_fields = ('^name', 'name')
-    pagination_class = None
+    catalog = INGREDIENT_CATALOG
+    filter_backends = ()
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        ingredients = suggest_ingredients(
+            self.get_queryset(), name, get_search_limit(request)
+        )
+        serializer = self.get_serializer(ingredients, many=True)
+        return Response(serializer.data)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.all()
+class RecipeViewSet(ConcurrencyLimitMixin, ResponseCacheMixin,
+                    ConditionalGetMixin, CursorPaginationMixin,
+                    viewsets.ModelViewSet):
+    response_cache = ResponseCache('recipes')
+    throttle_scope = None
     pagination_class = RecipeLimitPagination
+    cursor_pagination_class = RecipeCursorPagination
     permission_classes = (CheckingUserIsAuthor, IsAuthenticatedOrReadOnly)
     lookup_field = 'id'
     filter_backends = (
@@ -54,10 +107,114 @@ class RecipeViewSet(viewsets.ModelViewSet):
         filters.OrderingFilter,
     )
     filterset_class = RecipeFilter
+    ordering_fields = (
+        'id',
+        'pub_date',
+        'name',
+        'cooking_time',
+        'favorites_count',
+        'in_carts_count',
+    )
+
+    parser_classes = (FastJSONParser, MultiPartParser)
+
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers = [
+            LimitedTemporaryFileUploadHandler(request)
+        ]
+        return super().initialize_request(request, *args, **kwargs)
+
+    def get_concurrency_scope(self):
+        if self.action in ('create', 'update', 'partial_update'):
+            return 'upload'
+        return None
+
+    def get_queryset(self):
+        if self.action == 'list':
+            return Recipe.objects.as_cards(self.request.user)
+        return Recipe.objects.with_related(self.request.user)
+
+    def catalog_versions(self):
+        return [TAG_CATALOG.get().etag, INGREDIENT_CATALOG.get().etag]
+
+    def get_list_dependencies(self):
+        """Список с фильтром по тегам зависит только от рецептов с ними."""
+        params = self.request.query_params
+        flags = TAG_FLAGS.get()
+        slugs = params.getlist('tags')
+        dependencies = [EVERYTHING]
+        if slugs and all(flags.get(slug) for slug in slugs):
+            dependencies += [tag_generation(flags[slug]) for slug in slugs]
+        else:
+            dependencies.append(RECIPES)
+        if self.ordered_by_counter():
+            dependencies.append(COUNTERS)
+        return dependencies
+
+    def ordered_by_counter(self):
+        ordering = self.request.query_params.get(
+            filters.OrderingFilter.ordering_param, ''
+        )
+        return any(field in ordering for field in COUNTER_ORDERINGS)
+
+    def get_detail_dependencies(self):
+        return [EVERYTHING, recipe_generation(self.kwargs[self.lookup_field])]
+
+    def get_list_version(self):
+        if isinstance(self.paginator, KeysetPagination):
+            return None
+        user = self.request.user
+        totals = self.filter_queryset(Recipe.objects.all()).order_by(
+        ).aggregate(
+            count=Count('pk'),
+            updated=Max('updated_at'),
+            authors=Max('author__updated_at')
+        )
+        version = [
+            totals['count'], totals['updated'], totals['authors'],
+            *self.catalog_versions()
+        ]
+        if self.ordered_by_counter():
+            # Порядок меняют чужие лайки и покупки без отметки времени.
+            version += self.response_cache.generations([COUNTERS])
+        if not user.is_anonymous:
+            version += relation_version(user, (
+                (Favorite, 'user'),
+                (ShoppingList, 'user'),
+                (Subscriptions, 'user'),
+            ))
+        return version, None
 
+    def get_detail_version(self):
+        user = self.request.user
+        subscribed = Value(False, output_field=BooleanField())
+        if not user.is_anonymous:
+            subscribed = Exists(Subscriptions.objects.filter(
+                user=user, author=OuterRef('author_id')
+            ))
+        try:
+            row = Recipe.objects.filter(
+                pk=self.kwargs[self.lookup_field]
+            ).with_user_flags(user).annotate(
+                author_is_subscribed=subscribed
+            ).values_list(
+                'updated_at', 'author__updated_at', 'is_favorited',
+                'is_in_shopping_cart', 'author_is_subscribed'
+            ).first()
+        except (TypeError, ValueError):
+            return None
+        if row is None:
+            return None
+        return [*row, *self.catalog_versions()], max(row[:2])
+
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
+
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return RecipeGetSerializer
@@ -65,67 +222,88 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(
         detail=False,
-        permission_classes=(IsAuthenticated,)
+        permission_classes=(IsAuthenticated,),
+        throttle_scope='shopping_cart',
+        renderer_classes=(
+            PlainTextRenderer,
+            CSVRenderer,
+            FastJSONRenderer,
+            PDFRenderer,
+        )
     )
     def download_shopping_cart(self, request):
-        ingredients = IngredientsRecipe.objects.filter(
-            recipe__shopping_list__user=request.user).values(
-            'ingredient__name',
-            'ingredient__measurement_unit').annotate(total=Sum('amount'))
-        shopping_list = 'список покупок:\n'
-        for number, ingredient in enumerate(ingredients, start=1):
-            shopping_list += (
-                f'{number} '
-                f'{ingredient["ingredient__name"]}'
-                f'({ingredient["ingredient__measurement_unit"]}) - '
-                f'{ingredient["total"]} \n'
-            )
-        shopping = settings.SHOPPING_LIST_FILENAME
-        response = HttpResponse(shopping_list, content_type=CONTENT_TYPE)
-        response['Content-Disposition'] = (f'attachment;'
-                                           f'filename={shopping}')
+        renderer = request.accepted_renderer
+        export = EXPORTERS[renderer.format]
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        response = StreamingHttpResponse(
+            export(get_shopping_list(request.user)),
+            content_type=content_type
+        )
+        shopping, _ = os.path.splitext(settings.SHOPPING_LIST_FILENAME)
+        response['Content-Disposition'] = (
+            f'attachment;filename={shopping}.{renderer.format}'
+        )
         return response
 
 
-class FavoriteViewSet(CreateDestroyModelViewSet):
+class RecipeRelationViewSet(viewsets.GenericViewSet):
+    """Рецепты в связи пользователя: избранном или списке покупок.
+
+    Запись идемпотентна: повторное добавление отвечает 200 вместо 201,
+    удаление отсутствующей связи — тем же 204. create_many и delete_many
+    принимают список id в поле recipes.
+    """
+    relation = None
     queryset = Recipe.objects.all()
-    serializer_class = FavoriteSerializer
+    serializer_class = RecipeUserSerializer
     permission_classes = (IsAuthenticated,)
 
-    def perform_create(self, serializer):
-        user = get_object_or_404(User, username=self.request.user)
-        recipe = get_object_or_404(Recipe, id=self.kwargs.get('id'))
-        serializer.save(user=user, recipe=recipe)
+    def added_response(self, added, data):
+        return Response(
+            data,
+            status=status.HTTP_201_CREATED if added else status.HTTP_200_OK
+        )
+
+    def get_recipe_ids(self):
+        serializer = RecipeIdsSerializer(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        return list(dict.fromkeys(serializer.validated_data['recipes']))
+
+    def create(self, request, *args, **kwargs):
+        recipe = get_object_or_404(Recipe, id=self.kwargs['id'])
+        added = add_relations(self.relation, request.user, [recipe.id])
+        return self.added_response(added, self.get_serializer(recipe).data)
 
     def delete(self, request, *args, **kwargs):
-        recipe = get_object_or_404(Recipe, id=self.kwargs.get('id'))
-        favorite = Favorite.objects.filter(
-            user=self.request.user,
-            recipe=recipe
-        )
-        if not favorite.exists():
-            raise exceptions.ValidationError(DELETE_RECIPE_ERROR)
-        favorite.delete()
+        recipe_id = int(self.kwargs['id'])
+        removed = remove_relations(self.relation, request.user, [recipe_id])
+        if not removed and not Recipe.objects.filter(id=recipe_id).exists():
+            raise Http404
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def create_many(self, request, *args, **kwargs):
+        ids = self.get_recipe_ids()
+        recipes = Recipe.objects.in_bulk(ids)
+        missing = [str(pk) for pk in ids if pk not in recipes]
+        if missing:
+            raise exceptions.ValidationError(
+                {'recipes': [MISSING_RECIPES.format(', '.join(missing))]}
+            )
+        added = add_relations(self.relation, request.user, ids)
+        return self.added_response(added, self.get_serializer(
+            [recipes[pk] for pk in ids], many=True
+        ).data)
 
-class ShoppingCartViewSet(CreateDestroyModelViewSet):
-    queryset = Recipe.objects.all()
-    serializer_class = ShoppingCartSerializer
-    permission_classes = (IsAuthenticated,)
+    def delete_many(self, request, *args, **kwargs):
+        remove_relations(self.relation, request.user, self.get_recipe_ids())
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
-    def perform_create(self, serializer):
-        user = get_object_or_404(User, username=self.request.user)
-        recipe = get_object_or_404(Recipe, id=self.kwargs.get('id'))
-        serializer.save(user=user, recipe=recipe)
 
-    def delete(self, request, *args, **kwargs):
-        recipe = get_object_or_404(Recipe, id=self.kwargs.get('id'))
-        shopping_list = ShoppingList.objects.filter(
-            user=self.request.user,
-            recipe=recipe
-        )
-        if not shopping_list.exists():
-            raise exceptions.ValidationError(DELETE_SHOPLIST_ERROR)
-        shopping_list.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+class FavoriteViewSet(RecipeRelationViewSet):
+    relation = Favorite
+
+
+class ShoppingCartViewSet(RecipeRelationViewSet):
+    relation = ShoppingList
@@ -0,0 +1,185 @@
+import base64
+from io import StringIO
+
+import pytest
+from django.core.cache import caches
+from django.core.management import call_command
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from foodgram.fuzzy import INGREDIENT_INDEX
+from foodgram.models import (Favorite, Ingredient, IngredientsRecipe, Recipe,
+                             ShoppingList, Tag, TagRecipe)
+from foodgram.response_cache import TAG_FLAGS
+from foodgram.serializers import INGREDIENT_CATALOG, TAG_CATALOG
+from users.models import Subscriptions, User
+
+PASSWORD = 'Foodgram-Test-Pass-1'
+RECIPES_PER_AUTHOR = 10
+TAGS_COUNT = 3
+INGREDIENTS_COUNT = 50
+INGREDIENTS_PER_RECIPE = 3
+SMALL_GIF = base64.b64encode(
+    b'GIF89a\x01\x00\x01\x00\x00\x00\x00!\xf9\x04\x01\x00\x00\x00\x00,'
+    b'\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x01\x00\x00'
+).decode()
+IMAGE = f'data:image/gif;base64,{SMALL_GIF}'
+
+
+class Seeder:
+    """Наполняет базу рецептами, добавляя недостающие до нужного объёма.
+
+    Просматривающий пользователь подписан на всех авторов, добавляет в
+    избранное каждый второй рецепт и в покупки каждый третий, поэтому
+    вместе с числом рецептов растут и его связи.
+    """
+
+    def __init__(self):
+        self.viewer = User.objects.create_user(
+            username='viewer',
+            email='viewer@foodgram.test',
+            password=PASSWORD,
+            first_name='Viewer',
+            last_name='Viewer'
+        )
+        self.stranger = User.objects.create_user(
+            username='stranger',
+            email='stranger@foodgram.test',
+            password=PASSWORD,
+            first_name='Stranger',
+            last_name='Stranger'
+        )
+        self.tags = [
+            Tag.objects.create(
+                name=f'Тэг {number}',
+                color=f'#00000{number}',
+                slug=f'tag-{number}'
+            )
+            for number in range(TAGS_COUNT)
+        ]
+        Ingredient.objects.bulk_create(
+            Ingredient(
+                name=f'Ингредиент {number}',
+                measurement_unit='г',
+                search_name=f'ингредиент {number}'
+            )
+            for number in range(INGREDIENTS_COUNT)
+        )
+        self.ingredients = list(Ingredient.objects.order_by('id'))
+        self.target = Recipe.objects.create(
+            author=self.stranger,
+            name='Чужой рецепт',
+            text='Рецепт без связей с просматривающим',
+            cooking_time=5,
+            image='recipes/images/target.gif'
+        )
+        self.target.tags.set(self.tags[:1])
+        self.own = Recipe.objects.create(
+            author=self.viewer,
+            name='Свой рецепт',
+            text='Рецепт просматривающего',
+            cooking_time=5,
+            image='recipes/images/own.gif'
+        )
+        self.own.tags.set(self.tags)
+        IngredientsRecipe.objects.bulk_create(
+            IngredientsRecipe(
+                recipe=self.own, ingredient=ingredient, amount=10
+            )
+            for ingredient in self.ingredients[:5]
+        )
+        self.recipes = 0
+
+    def grow(self, size):
+        """Доводит число сгенерированных рецептов до size."""
+        authors = User.objects.bulk_create(
+            User(
+                username=f'author{number}',
+                email=f'author{number}@foodgram.test',
+                first_name='Author',
+                last_name=str(number)
+            )
+            for number in range(
+                self.recipes // RECIPES_PER_AUTHOR,
+                size // RECIPES_PER_AUTHOR
+            )
+        )
+        authors = list(User.objects.filter(
+            username__in=[author.username for author in authors]
+        ).order_by('id'))
+        Subscriptions.objects.bulk_create(
+            Subscriptions(user=self.viewer, author=author)
+            for author in authors
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=author,
+                name=f'Рецепт {number}',
+                text='Описание рецепта',
+                cooking_time=number % 60 + 1,
+                image=f'recipes/images/{number}.gif'
+            )
+            for author in authors
+            for number in range(RECIPES_PER_AUTHOR)
+        )
+        recipes = list(Recipe.objects.filter(
+            author__in=authors
+        ).order_by('id'))
+        TagRecipe.objects.bulk_create(
+            TagRecipe(recipe=recipe, tag=tag)
+            for number, recipe in enumerate(recipes)
+            for tag in self.tags[:number % TAGS_COUNT + 1]
+        )
+        IngredientsRecipe.objects.bulk_create(
+            IngredientsRecipe(
+                recipe=recipe,
+                ingredient=self.ingredients[
+                    (number + offset) % INGREDIENTS_COUNT
+                ],
+                amount=offset + 1
+            )
+            for number, recipe in enumerate(recipes)
+            for offset in range(INGREDIENTS_PER_RECIPE)
+        )
+        Favorite.objects.bulk_create(
+            Favorite(user=self.viewer, recipe=recipe)
+            for recipe in recipes[::2]
+        )
+        ShoppingList.objects.bulk_create(
+            ShoppingList(user=self.viewer, recipe=recipe)
+            for recipe in recipes[::3]
+        )
+        call_command('rebuild_counters', stdout=StringIO())
+        call_command('rebuild_shopping_carts', stdout=StringIO())
+        self.recipes = size
+
+
+@pytest.fixture(autouse=True)
+def isolated_settings(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+    settings.PASSWORD_HASHERS = (
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    )
+    for alias in settings.CACHES:
+        caches[alias].clear()
+    for cached in (INGREDIENT_INDEX, INGREDIENT_CATALOG, TAG_CATALOG,
+                   TAG_FLAGS):
+        cached.bump()
+
+
+@pytest.fixture
+def seeder(db):
+    return Seeder()
+
+
+@pytest.fixture
+def anon_client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(seeder):
+    client = APIClient()
+    token, _ = Token.objects.get_or_create(user=seeder.viewer)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
@@ -0,0 +1,51 @@
+import pytest
+
+from foodgram.models import Ingredient, Tag
+
+
+@pytest.fixture
+def tag(db):
+    return Tag.objects.create(
+        name='Завтрак', color='#E26C2D', slug='breakfast'
+    )
+
+
+@pytest.mark.parametrize('url', ('/api/tags/', '/api/tags/{pk}/'))
+def test_etag_and_not_modified(tag, anon_client, url):
+    url = url.format(pk=tag.id)
+    response = anon_client.get(url)
+    etag = response['ETag']
+    assert response.status_code == 200
+    assert etag.startswith('"')
+    response = anon_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+    assert not response.content
+
+
+def test_catalog_follows_changes(tag, anon_client):
+    etag = anon_client.get('/api/tags/')['ETag']
+    tag.name = 'Ранний завтрак'
+    tag.save()
+    response = anon_client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert response.json()[0]['name'] == 'Ранний завтрак'
+
+
+def test_ingredient_catalog(db, anon_client):
+    salt = Ingredient.objects.create(name='Соль', measurement_unit='г')
+    assert anon_client.get('/api/ingredients/').json() == [
+        {'id': salt.id, 'name': 'Соль', 'measurement_unit': 'г'}
+    ]
+    salt.delete()
+    assert anon_client.get('/api/ingredients/').json() == []
+    assert anon_client.get(f'/api/ingredients/{salt.id}/').status_code == 404
+
+
+def test_nested_tags_match_catalog(seeder, anon_client):
+    seeder.grow(10)
+    tags = {tag['id']: tag for tag in anon_client.get('/api/tags/').json()}
+    recipe = anon_client.get(f'/api/recipes/{seeder.target.id}/').json()
+    assert recipe['tags']
+    assert recipe['tags'] == [tags[tag['id']] for tag in recipe['tags']]
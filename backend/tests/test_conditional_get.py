@@ -0,0 +1,106 @@
+from foodgram.models import Recipe, TagRecipe
+
+
+def revalidate(client, url, response, **headers):
+    return client.get(url, HTTP_IF_NONE_MATCH=response['ETag'], **headers)
+
+
+def test_recipe_detail_not_modified(seeder, anon_client, user_client):
+    url = f'/api/recipes/{seeder.target.id}/'
+    for client in (anon_client, user_client):
+        response = client.get(url)
+        assert response.status_code == 200
+        assert 'Authorization' in response['Vary']
+        repeated = revalidate(client, url, response)
+        assert repeated.status_code == 304
+        assert repeated['ETag'] == response['ETag']
+    anon_etag = anon_client.get(url)['ETag']
+    assert user_client.get(url)['ETag'] != anon_etag
+
+
+def test_last_modified_only_for_anonymous(seeder, anon_client, user_client):
+    url = f'/api/recipes/{seeder.target.id}/'
+    response = anon_client.get(url)
+    assert 'Last-Modified' in response
+    assert anon_client.get(
+        url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+    ).status_code == 304
+    assert 'Last-Modified' not in user_client.get(url)
+
+
+def test_viewer_flags_change_etag(seeder, user_client):
+    url = f'/api/recipes/{seeder.target.id}/'
+    before = user_client.get(url)
+    response = user_client.post(f'{url}favorite/')
+    assert response.status_code == 201
+    after = revalidate(user_client, url, before)
+    assert after.status_code == 200
+    assert after.json()['is_favorited'] is True
+    response = user_client.post(f'/api/users/{seeder.stranger.id}/subscribe/')
+    assert response.status_code == 201
+    assert revalidate(user_client, url, after).status_code == 200
+
+
+def test_link_write_touches_recipe(seeder, anon_client, settings):
+    settings.RESPONSE_CACHE_TIMEOUT = 0
+    url = f'/api/recipes/{seeder.target.id}/'
+    before = anon_client.get(url)
+    Recipe.objects.filter(pk=seeder.target.pk).update(
+        updated_at='2000-01-01T00:00:00Z'
+    )
+    TagRecipe.objects.create(recipe=seeder.target, tag=seeder.tags[1])
+    seeder.target.refresh_from_db()
+    assert seeder.target.updated_at.year > 2000
+    after = revalidate(anon_client, url, before)
+    assert after.status_code == 200
+    assert len(after.json()['tags']) == 2
+
+
+def test_recipe_list_not_modified(seeder, anon_client, user_client):
+    seeder.grow(10)
+    url = '/api/recipes/?limit=5'
+    response = anon_client.get(url)
+    assert revalidate(anon_client, url, response).status_code == 304
+    assert 'Last-Modified' not in response
+    Recipe.objects.filter(pk=seeder.target.pk).delete()
+    assert revalidate(anon_client, url, response).status_code == 200
+    response = user_client.get(url)
+    assert revalidate(user_client, url, response).status_code == 304
+    user_client.post(f'/api/recipes/{seeder.own.id}/shopping_cart/')
+    assert revalidate(user_client, url, response).status_code == 200
+
+
+def test_counter_ordering_changes_etag(seeder, anon_client, user_client,
+                                       settings):
+    settings.RESPONSE_CACHE_TIMEOUT = 0
+    seeder.grow(10)
+    url = '/api/recipes/?limit=5&ordering=-favorites_count'
+    response = anon_client.get(url)
+    assert revalidate(anon_client, url, response).status_code == 304
+    user_client.post(f'/api/recipes/{seeder.target.id}/favorite/')
+    after = revalidate(anon_client, url, response)
+    assert after.status_code == 200
+    assert after.json()['results'][0]['id'] == seeder.target.id
+
+
+def test_cursor_list_is_not_conditional(seeder, anon_client):
+    response = anon_client.get('/api/recipes/?cursor=&limit=5')
+    assert response.status_code == 200
+    assert 'ETag' not in response
+
+
+def test_user_endpoints_not_modified(seeder, user_client):
+    for url in (
+        '/api/users/?limit=5', f'/api/users/{seeder.stranger.id}/',
+        '/api/users/me/',
+    ):
+        response = user_client.get(url)
+        assert response.status_code == 200
+        assert revalidate(user_client, url, response).status_code == 304
+    url = f'/api/users/{seeder.stranger.id}/'
+    before = user_client.get(url)
+    seeder.stranger.first_name = 'Renamed'
+    seeder.stranger.save()
+    after = revalidate(user_client, url, before)
+    assert after.status_code == 200
+    assert after.json()['first_name'] == 'Renamed'
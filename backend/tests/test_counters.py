@@ -0,0 +1,82 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+from foodgram.models import Favorite, Recipe, ShoppingList
+from users.models import Subscriptions, User
+
+
+def test_favorite_and_cart_counters(seeder, user_client):
+    url = f'/api/recipes/{seeder.target.id}/'
+    user_client.post(url + 'favorite/')
+    user_client.post(url + 'shopping_cart/')
+    seeder.target.refresh_from_db()
+    assert seeder.target.favorites_count == 1
+    assert seeder.target.in_carts_count == 1
+    user_client.delete(url + 'favorite/')
+    user_client.delete(url + 'shopping_cart/')
+    seeder.target.refresh_from_db()
+    assert seeder.target.favorites_count == 0
+    assert seeder.target.in_carts_count == 0
+
+
+def test_subscription_counter(seeder, user_client):
+    url = f'/api/users/{seeder.stranger.id}/subscribe/'
+    response = user_client.post(url)
+    seeder.stranger.refresh_from_db()
+    assert seeder.stranger.followers_count == 1
+    assert response.json()['recipes_count'] == 1
+    user_client.delete(url)
+    seeder.stranger.refresh_from_db()
+    assert seeder.stranger.followers_count == 0
+
+
+def test_cascade_delete_keeps_counters(seeder):
+    Favorite.objects.create(user=seeder.stranger, recipe=seeder.own)
+    ShoppingList.objects.create(user=seeder.stranger, recipe=seeder.own)
+    seeder.stranger.delete()
+    seeder.own.refresh_from_db()
+    assert seeder.own.favorites_count == 0
+    assert seeder.own.in_carts_count == 0
+    seeder.viewer.refresh_from_db()
+    assert seeder.viewer.recipes_count == 1
+    seeder.own.delete()
+    seeder.viewer.refresh_from_db()
+    assert seeder.viewer.recipes_count == 0
+
+
+def test_rebuild_counters_reports_and_fixes_drift(seeder):
+    seeder.grow(20)
+    Recipe.objects.update(favorites_count=7)
+    User.objects.filter(pk=seeder.viewer.pk).update(recipes_count=0)
+    out = StringIO()
+    call_command('rebuild_counters', '--check', '--chunk-size=3', stdout=out)
+    assert 'Расхождений найдено: 23' in out.getvalue()
+    assert Recipe.objects.filter(favorites_count=7).count() == 22
+    call_command('rebuild_counters', '--chunk-size=3', stdout=StringIO())
+    out = StringIO()
+    call_command('rebuild_counters', '--check', stdout=out)
+    assert 'Счётчики в порядке' in out.getvalue()
+    assert Recipe.objects.get(pk=seeder.own.pk).favorites_count == 0
+    assert User.objects.get(pk=seeder.viewer.pk).followers_count == 0
+    assert User.objects.get(username='author0').followers_count == (
+        Subscriptions.objects.filter(author__username='author0').count()
+    )
+
+
+def test_full_save_keeps_counters(seeder):
+    recipe = Recipe.objects.get(pk=seeder.target.pk)
+    author = User.objects.get(pk=seeder.stranger.pk)
+    Favorite.objects.create(user=seeder.viewer, recipe=seeder.target)
+    ShoppingList.objects.create(user=seeder.viewer, recipe=seeder.target)
+    Subscriptions.objects.create(user=seeder.viewer, author=seeder.stranger)
+    recipe.name = 'Новое имя'
+    recipe.save()
+    author.first_name = 'Новое'
+    author.save()
+    recipe.refresh_from_db()
+    author.refresh_from_db()
+    assert recipe.name == 'Новое имя'
+    assert (recipe.favorites_count, recipe.in_carts_count) == (1, 1)
+    assert author.first_name == 'Новое'
+    assert (author.followers_count, author.recipes_count) == (1, 1)
@@ -0,0 +1,101 @@
+import json
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+from foodgram.models import IngredientsRecipe, Recipe
+
+from .test_image_variants import photo
+
+
+def jpeg(width, height):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), 'green').save(buffer, 'JPEG')
+    return SimpleUploadedFile(
+        'photo.jpg', buffer.getvalue(), content_type='image/jpeg'
+    )
+
+
+def multipart_payload(seeder, image):
+    return {
+        'tags': [seeder.tags[0].id, seeder.tags[1].id],
+        'ingredients': json.dumps([
+            {'id': seeder.ingredients[0].id, 'amount': 2},
+        ]),
+        'name': 'Из формы',
+        'image': image,
+        'text': 'Рецепт из multipart',
+        'cooking_time': 5,
+    }
+
+
+def test_multipart_create(seeder, user_client):
+    response = user_client.post(
+        '/api/recipes/', multipart_payload(seeder, jpeg(640, 480)),
+        format='multipart'
+    )
+    assert response.status_code == 201, response.content
+    recipe = Recipe.objects.get(pk=response.json()['id'])
+    assert recipe.image.width == 640
+    assert set(recipe.tags.all()) == set(seeder.tags[:2])
+    assert IngredientsRecipe.objects.get(recipe=recipe).amount == 2
+    assert response.json()['image_variants']['card']['width'] == 480
+
+
+def test_multipart_patch_image_only(seeder, user_client):
+    response = user_client.patch(
+        f'/api/recipes/{seeder.own.id}/', {'image': jpeg(100, 100)},
+        format='multipart'
+    )
+    assert response.status_code == 200, response.content
+    seeder.own.refresh_from_db()
+    assert seeder.own.image.width == 100
+
+
+def test_multipart_tags_as_json(seeder, user_client):
+    response = user_client.patch(
+        f'/api/recipes/{seeder.own.id}/',
+        {'tags': json.dumps([seeder.tags[2].id])}, format='multipart'
+    )
+    assert response.status_code == 200, response.content
+    assert list(seeder.own.tags.all()) == [seeder.tags[2]]
+
+
+def test_invalid_json_field(seeder, user_client):
+    payload = multipart_payload(seeder, jpeg(10, 10))
+    payload['ingredients'] = '[{'
+    response = user_client.post('/api/recipes/', payload, format='multipart')
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('upload', ('multipart', 'json'))
+def test_size_limit(seeder, user_client, settings, upload):
+    settings.RECIPE_IMAGE_MAX_SIZE = 1024
+    image = jpeg(400, 400) if upload == 'multipart' else photo(400, 400)
+    payload = multipart_payload(seeder, image)
+    if upload == 'json':
+        payload['ingredients'] = json.loads(payload['ingredients'])
+    response = user_client.post('/api/recipes/', payload, format=upload)
+    assert response.status_code == 400
+    assert 'image' in response.json()
+    assert not Recipe.objects.filter(name='Из формы').exists()
+
+
+def test_pixel_limit(seeder, user_client, settings):
+    settings.RECIPE_IMAGE_MAX_PIXELS = 100 * 100
+    response = user_client.post(
+        '/api/recipes/', multipart_payload(seeder, jpeg(101, 100)),
+        format='multipart'
+    )
+    assert response.status_code == 400
+    assert 'image' in response.json()
+
+
+def test_broken_base64(seeder, user_client):
+    response = user_client.patch(
+        f'/api/recipes/{seeder.own.id}/',
+        {'image': 'data:image/png;base64,@@@'}, format='json'
+    )
+    assert response.status_code == 400
@@ -0,0 +1,84 @@
+import base64
+from io import BytesIO, StringIO
+
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from PIL import Image
+
+from foodgram.images import load_variants
+from foodgram.models import Recipe
+
+
+def photo(width, height, mode='RGB', image_format='JPEG'):
+    buffer = BytesIO()
+    Image.new(mode, (width, height), 'orange').save(buffer, image_format)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/{image_format.lower()};base64,{encoded}'
+
+
+def create_recipe(seeder, client, image):
+    response = client.post('/api/recipes/', {
+        'tags': [seeder.tags[0].id],
+        'ingredients': [{'id': seeder.ingredients[0].id, 'amount': 1}],
+        'name': 'Фото',
+        'image': image,
+        'text': 'Рецепт с фотографией',
+        'cooking_time': 5,
+    }, format='json')
+    assert response.status_code == 201, response.content
+    return response.json()
+
+
+def test_variants_are_created_on_upload(seeder, user_client):
+    data = create_recipe(seeder, user_client, photo(3000, 1000))
+    variants = data['image_variants']
+    assert variants['placeholder'].startswith('data:image/')
+    assert (variants['card']['width'], variants['card']['height']) == (
+        480, 320
+    )
+    assert (variants['detail']['width'], variants['detail']['height']) == (
+        1200, 400
+    )
+    assert set(variants['card']['files']) == {'image/jpeg', 'image/webp'}
+    assert variants['srcset']['image/webp'].endswith('1200w')
+    for name in load_variants(Recipe.objects.get(pk=data['id'])).get(
+            'card')['files'].values():
+        with default_storage.open(name) as image:
+            assert Image.open(image).size == (480, 320)
+
+
+def test_small_and_transparent_images(seeder, user_client):
+    data = create_recipe(
+        seeder, user_client, photo(60, 60, 'RGBA', 'PNG')
+    )
+    card = data['image_variants']['card']
+    assert (card['width'], card['height']) == (60, 40)
+    assert set(card['files']) == {'image/png', 'image/webp'}
+
+
+def test_card_serializer_and_replacement(seeder, user_client):
+    data = create_recipe(seeder, user_client, photo(800, 600))
+    recipe = Recipe.objects.get(pk=data['id'])
+    old = load_variants(recipe)
+    response = user_client.post(f'/api/recipes/{recipe.id}/favorite/')
+    assert response.json()['image_variants'] == data['image_variants']
+    response = user_client.patch(
+        f'/api/recipes/{recipe.id}/', {'image': photo(900, 600)},
+        format='json'
+    )
+    recipe.refresh_from_db()
+    assert load_variants(recipe)['source'] == recipe.image.name
+    assert load_variants(recipe)['source'] != old['source']
+
+
+def test_backfill_command(seeder, user_client):
+    data = create_recipe(seeder, user_client, photo(800, 600))
+    Recipe.objects.filter(pk=data['id']).update(image_variants='')
+    out = StringIO()
+    call_command('build_image_variants', '--check', stdout=out)
+    assert 'Рецептов без копий: 1' in out.getvalue()
+    call_command('build_image_variants', stdout=StringIO())
+    assert 'card' in load_variants(Recipe.objects.get(pk=data['id']))
+    out = StringIO()
+    call_command('build_image_variants', '--check', stdout=out)
+    assert 'Копии в порядке' in out.getvalue()
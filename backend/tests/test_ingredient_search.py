@@ -0,0 +1,97 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from foodgram.models import Ingredient
+
+NAMES = (
+    ('Сахарная пудра', 'г'),
+    ('сахар', 'г'),
+    ('Сахар', 'г'),
+    ('сахар', 'кг'),
+    ('Тростниковый  сахар', 'г'),
+    ('Ванильный сахар', 'г'),
+    ('Ёжевика', 'г'),
+    ('ежевичный джем', 'г'),
+)
+
+
+@pytest.fixture
+def ingredients(db):
+    for name, unit in NAMES:
+        Ingredient.objects.create(name=name, measurement_unit=unit)
+
+
+def search(client, query):
+    response = client.get('/api/ingredients/', {'name': query})
+    assert response.status_code == 200, response.content
+    return [
+        (item['name'], item['measurement_unit']) for item in response.json()
+    ]
+
+
+def test_prefix_matches_go_first(ingredients, anon_client):
+    assert search(anon_client, 'САХ') == [
+        ('сахар', 'г'),
+        ('сахар', 'кг'),
+        ('Сахарная пудра', 'г'),
+        ('Ванильный сахар', 'г'),
+        ('Тростниковый  сахар', 'г'),
+    ]
+
+
+def test_yo_and_whitespace_are_normalized(ingredients, anon_client):
+    assert search(anon_client, 'еж') == [
+        ('Ёжевика', 'г'),
+        ('ежевичный джем', 'г'),
+    ]
+    assert search(anon_client, 'тростниковый сахар') == [
+        ('Тростниковый  сахар', 'г'),
+    ]
+
+
+def test_limit(ingredients, anon_client):
+    response = anon_client.get(
+        '/api/ingredients/', {'name': 'сахар', 'limit': 2}
+    )
+    assert [item['name'] for item in response.json()] == ['сахар', 'сахар']
+
+
+def test_substring_search_fills_missing_slots(ingredients, anon_client):
+    with CaptureQueriesContext(connection) as context:
+        search(anon_client, 'сахар')
+    assert sum('%сахар%' in query['sql']
+               for query in context.captured_queries) == 1
+    with CaptureQueriesContext(connection) as context:
+        response = anon_client.get(
+            '/api/ingredients/', {'name': 'сахар', 'limit': 2}
+        )
+    assert len(response.json()) == 2
+    assert not any('%сахар%' in query['sql']
+                   for query in context.captured_queries)
+
+
+def test_list_without_name_is_unchanged(ingredients, anon_client):
+    response = anon_client.get('/api/ingredients/')
+    assert len(response.json()) == len(NAMES)
+
+
+@pytest.mark.parametrize('query, expected', (
+    ('мaнго', 'Манго'),
+    ('карофель', 'Картофель'),
+    ('морковь', 'Морковь'),
+))
+def test_typos_fall_back_to_fuzzy(ingredients, anon_client, query, expected):
+    for name in ('Манго', 'Картофель', 'Морковь', 'Картофельный крахмал'):
+        Ingredient.objects.create(name=name, measurement_unit='г')
+    assert search(anon_client, query)[0] == (expected, 'г')
+
+
+def test_fuzzy_index_follows_changes(ingredients, anon_client):
+    assert search(anon_client, 'карофель') == []
+    potato = Ingredient.objects.create(
+        name='Картофель', measurement_unit='г'
+    )
+    assert search(anon_client, 'карофель') == [('Картофель', 'г')]
+    potato.delete()
+    assert search(anon_client, 'карофель') == []
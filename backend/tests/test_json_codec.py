@@ -0,0 +1,88 @@
+import datetime
+import decimal
+from io import BytesIO
+
+import pytest
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from foodgram import parsers, renderers
+from foodgram.parsers import FastJSONParser
+from foodgram.renderers import FastJSONRenderer
+
+PAYLOAD = ReturnList([
+    ReturnDict({
+        'name': gettext_lazy('Борщ'),
+        'amount': decimal.Decimal('1.50'),
+        'created': datetime.datetime(2021, 5, 1, 12, tzinfo=timezone.utc),
+        'day': datetime.date(2021, 5, 1),
+        'text': 'строка\u2028с\u2029разделителями',
+        'counts': {1: 'один', 2: None},
+        'flags': (True, False),
+    }, serializer=None),
+], serializer=None)
+
+
+@pytest.fixture(params=('orjson', 'json'))
+def codec(request, monkeypatch):
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    else:
+        monkeypatch.setattr(renderers, 'orjson', None)
+        monkeypatch.setattr(parsers, 'orjson', None)
+    return request.param
+
+
+def test_render_matches_drf(codec):
+    assert FastJSONRenderer().render(PAYLOAD) == JSONRenderer().render(
+        PAYLOAD
+    )
+
+
+def test_indent_uses_stdlib(codec):
+    media_type = 'application/json; indent=2'
+    assert FastJSONRenderer().render(PAYLOAD, media_type) == (
+        JSONRenderer().render(PAYLOAD, media_type)
+    )
+
+
+def test_api_response_matches_drf(codec, seeder, anon_client, settings):
+    settings.RESPONSE_CACHE_TIMEOUT = 0
+    seeder.grow(10)
+    response = anon_client.get('/api/recipes/?limit=20')
+    assert response.content == JSONRenderer().render(response.data)
+
+
+def parse(content, encoding='utf-8'):
+    return FastJSONParser().parse(
+        BytesIO(content), parser_context={'encoding': encoding}
+    )
+
+
+def test_parse(codec):
+    assert parse('{"name": "Щи", "amount": [1, 2.5]}'.encode()) == {
+        'name': 'Щи', 'amount': [1, 2.5]
+    }
+    assert parse('{"name": "Щи"}'.encode('cp1251'), 'cp1251') == {
+        'name': 'Щи'
+    }
+    for content in (b'{"name": ', b'{"amount": NaN}', b'\xff'):
+        with pytest.raises(ParseError):
+            parse(content)
+
+
+def test_recipe_write_through_parser(codec, user_client, seeder):
+    response = user_client.patch(
+        f'/api/recipes/{seeder.own.id}/', {'name': 'Новое имя'},
+        format='json'
+    )
+    assert response.status_code == 200
+    assert response.json()['name'] == 'Новое имя'
+    response = user_client.patch(
+        f'/api/recipes/{seeder.own.id}/', b'{"name": ',
+        content_type='application/json'
+    )
+    assert response.status_code == 400
@@ -0,0 +1,92 @@
+import os
+from collections import Counter
+from io import StringIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+
+from foodgram.images import load_variants, variant_files
+from foodgram.models import Recipe, StoredFile
+
+from .test_image_variants import create_recipe, photo
+
+
+def stored_names(recipe):
+    recipe.refresh_from_db()
+    return [recipe.image.name, *variant_files(load_variants(recipe))]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_same_photo_is_stored_once(seeder, user_client):
+    first = Recipe.objects.get(
+        pk=create_recipe(seeder, user_client, photo(300, 200))['id']
+    )
+    second = Recipe.objects.get(
+        pk=create_recipe(seeder, user_client, photo(300, 200))['id']
+    )
+    names = stored_names(first)
+    assert names == stored_names(second)
+    assert first.image.name.startswith('hashed/')
+    assert dict(StoredFile.objects.values_list('name', 'references')) == {
+        name: 2 * count for name, count in Counter(names).items()
+    }
+    user_client.delete(f'/api/recipes/{first.id}/')
+    assert all(default_storage.exists(name) for name in names)
+    user_client.delete(f'/api/recipes/{second.id}/')
+    assert not any(default_storage.exists(name) for name in names)
+    assert not StoredFile.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_replaced_image_is_released(seeder, user_client):
+    recipe = Recipe.objects.get(
+        pk=create_recipe(seeder, user_client, photo(300, 200))['id']
+    )
+    old = stored_names(recipe)
+    response = user_client.patch(
+        f'/api/recipes/{recipe.id}/', {'image': photo(200, 300)},
+        format='json'
+    )
+    assert response.status_code == 200, response.content
+    assert not any(default_storage.exists(name) for name in old)
+    assert all(
+        default_storage.exists(name) for name in stored_names(recipe)
+    )
+    assert StoredFile.objects.count() == len(stored_names(recipe))
+
+
+def test_urls_are_stable(seeder, user_client):
+    data = create_recipe(seeder, user_client, photo(300, 200))
+    again = create_recipe(seeder, user_client, photo(300, 200))
+    assert data['image'] == again['image']
+    assert '/media/hashed/' in data['image']
+
+
+def test_rehash_command(seeder):
+    name = 'recipes/images/own.gif'
+    os.makedirs(os.path.dirname(default_storage.path(name)))
+    with open(default_storage.path(name), 'wb') as file:
+        file.write(b'GIF89a')
+    out = StringIO()
+    call_command('rehash_media', '--check', stdout=out)
+    assert 'Файлов со старыми именами: 1' in out.getvalue()
+    call_command('rehash_media', stdout=StringIO())
+    seeder.own.refresh_from_db()
+    assert seeder.own.image.name.startswith('hashed/')
+    assert StoredFile.objects.get(name=seeder.own.image.name).references == 1
+    assert not default_storage.exists(name)
+
+    orphan = default_storage.save('orphan.gif', ContentFile(b'orphan'))
+    StoredFile.objects.all().delete()
+    out = StringIO()
+    call_command('rehash_media', stdout=out)
+    assert (
+        'исправлено ссылок: 1, удалено файлов без ссылок: 1'
+    ) in out.getvalue()
+    assert not default_storage.exists(orphan)
+    assert StoredFile.objects.get(name=seeder.own.image.name).references == 1
+    out = StringIO()
+    call_command('rehash_media', '--check', stdout=out)
+    assert 'Медиафайлы в порядке' in out.getvalue()
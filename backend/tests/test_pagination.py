@@ -0,0 +1,121 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from foodgram.models import Recipe
+from users.models import User
+
+
+def walk(client, url, link='next'):
+    ids = []
+    pages = 0
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200, response.content
+        data = response.json()
+        assert 'count' not in data
+        page = [item['id'] for item in data['results']]
+        ids = ids + page if link == 'next' else page + ids
+        url = data[link]
+        pages += 1
+    return ids, pages
+
+
+def test_cursor_walk_matches_ordering(seeder, anon_client):
+    seeder.grow(100)
+    expected = list(
+        Recipe.objects.order_by('-pub_date', '-id').values_list(
+            'id', flat=True
+        )
+    )
+    ids, pages = walk(anon_client, '/api/recipes/?cursor=&limit=7')
+    assert ids == expected
+    assert pages == len(expected) // 7 + 1
+
+
+def test_cursor_walk_backwards(seeder, anon_client):
+    seeder.grow(30)
+    forward, _ = walk(anon_client, '/api/recipes/?cursor=&limit=4')
+    url = '/api/recipes/?cursor=&limit=4'
+    while True:
+        data = anon_client.get(url).json()
+        if data['next'] is None:
+            break
+        url = data['next']
+    last_page = [item['id'] for item in data['results']]
+    backward, _ = walk(anon_client, data['previous'], link='previous')
+    assert backward + last_page == forward
+
+
+def test_cursor_honours_filters(seeder, user_client):
+    seeder.grow(100)
+    expected = list(
+        Recipe.objects.filter(
+            tags__slug='tag-2', favorites__user=seeder.viewer
+        ).order_by('-pub_date', '-id').values_list('id', flat=True)
+    )
+    ids, _ = walk(
+        user_client,
+        '/api/recipes/?cursor=&limit=5&tags=tag-2&is_favorited=1'
+    )
+    assert ids == expected
+
+
+def test_cursor_skips_count_query(seeder, anon_client):
+    seeder.grow(10)
+    with CaptureQueriesContext(connection) as context:
+        anon_client.get('/api/recipes/?cursor=&limit=5')
+    assert not any(
+        'COUNT(' in query['sql'] for query in context.captured_queries
+    )
+
+
+@pytest.mark.parametrize('cursor', ('garbage', 'e30', 'eyJ2IjogMX0'))
+def test_invalid_cursor(seeder, anon_client, cursor):
+    response = anon_client.get(f'/api/recipes/?cursor={cursor}')
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize('url', (
+    '/api/recipes/?cursor=&limit=1000000',
+    '/api/recipes/?limit=1000000',
+))
+def test_page_size_is_capped(seeder, anon_client, settings, url):
+    settings.PAGE_MAX_SIZE = 4
+    seeder.grow(10)
+    response = anon_client.get(url)
+    assert response.status_code == 200
+    assert len(response.json()['results']) == 4
+
+
+@pytest.mark.parametrize('url, params', (
+    ('/api/recipes/?cursor=&ordering=name', {'ordering'}),
+    ('/api/recipes/?cursor=&search=рецепт', {'search'}),
+    ('/api/recipes/?cursor=&search=рецепт&ordering=-id',
+     {'search', 'ordering'}),
+    ('/api/users/subscriptions/?cursor=&ordering=id', {'ordering'}),
+))
+def test_cursor_rejects_ordering(seeder, user_client, url, params):
+    response = user_client.get(url)
+    assert response.status_code == 400
+    assert set(response.json()) == params
+
+
+def test_page_number_mode_is_default(seeder, anon_client):
+    seeder.grow(10)
+    data = anon_client.get('/api/recipes/?page=2&limit=5').json()
+    assert data['count'] == Recipe.objects.count()
+
+
+def test_subscriptions_cursor(seeder, user_client):
+    seeder.grow(100)
+    expected = list(
+        User.objects.filter(following__user=seeder.viewer).order_by(
+            '-id'
+        ).values_list('id', flat=True)
+    )
+    ids, _ = walk(
+        user_client, '/api/users/subscriptions/?cursor=&limit=3'
+        '&recipes_limit=1'
+    )
+    assert ids == expected
@@ -0,0 +1,361 @@
+"""Бюджет SQL-запросов для каждого эндпоинта API.
+
+Каждый эндпоинт вызывается на нескольких объёмах данных. Число запросов
+не должно расти вместе с данными и не должно превышать бюджет из
+таблицы QUERY_BUDGETS.
+"""
+from collections import namedtuple
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from foodgram.models import Favorite, IngredientsRecipe, Recipe, ShoppingList
+from foodgram.relations import add_relations, remove_relations
+from foodgram.serializers import INGREDIENT_CATALOG, TAG_CATALOG
+from users.models import Subscriptions, User
+
+from .conftest import IMAGE, PASSWORD
+
+SIZES = (10, 100, 1000)
+BULK_SIZE = 5
+
+Case = namedtuple(
+    'Case',
+    ('viewer', 'method', 'url', 'budget', 'data', 'prepare', 'cleanup'),
+)
+
+
+def case(viewer, method, url, budget, data=None, prepare=None,
+         cleanup=None):
+    return Case(viewer, method, url, budget, data, prepare, cleanup)
+
+
+def recipe_payload(seeder):
+    return {
+        'tags': [tag.id for tag in seeder.tags],
+        'ingredients': [
+            {'id': ingredient.id, 'amount': 10}
+            for ingredient in seeder.ingredients[:5]
+        ],
+        'name': 'Новый рецепт',
+        'image': IMAGE,
+        'text': 'Описание нового рецепта',
+        'cooking_time': 15,
+    }
+
+
+def reset_own_recipe(seeder):
+    IngredientsRecipe.objects.filter(recipe=seeder.own).delete()
+    IngredientsRecipe.objects.bulk_create(
+        IngredientsRecipe(recipe=seeder.own, ingredient=ingredient, amount=10)
+        for ingredient in seeder.ingredients[:5]
+    )
+    seeder.own.tags.set(seeder.tags)
+
+
+def reset_own_image(seeder):
+    Recipe.objects.filter(pk=seeder.own.pk).update(
+        image='recipes/images/own.gif', image_variants=''
+    )
+
+
+def edit_payload(seeder):
+    return {
+        'tags': [seeder.tags[0].id],
+        'ingredients': [
+            {'id': ingredient.id, 'amount': 20}
+            for ingredient in seeder.ingredients[3:8]
+        ],
+    }
+
+
+def add_favorite(seeder):
+    Favorite.objects.create(user=seeder.viewer, recipe=seeder.target)
+
+
+def drop_favorite(seeder):
+    Favorite.objects.filter(user=seeder.viewer, recipe=seeder.target).delete()
+
+
+def add_to_cart(seeder):
+    ShoppingList.objects.create(user=seeder.viewer, recipe=seeder.target)
+
+
+def drop_from_cart(seeder):
+    ShoppingList.objects.filter(
+        user=seeder.viewer, recipe=seeder.target
+    ).delete()
+
+
+def pick_bulk(model):
+    """Пять рецептов без связи model с просматривающим для пачки."""
+    def prepare(seeder):
+        seeder.bulk = list(Recipe.objects.exclude(
+            pk__in=model.objects.filter(user=seeder.viewer).values('recipe')
+        ).order_by('id').values_list('id', flat=True)[:BULK_SIZE])
+        assert len(seeder.bulk) == BULK_SIZE
+    return prepare
+
+
+def link_bulk(model):
+    def prepare(seeder):
+        pick_bulk(model)(seeder)
+        add_relations(model, seeder.viewer, seeder.bulk)
+    return prepare
+
+
+def unlink_bulk(model):
+    def cleanup(seeder):
+        remove_relations(model, seeder.viewer, seeder.bulk)
+    return cleanup
+
+
+def bulk_payload(seeder):
+    return {'recipes': seeder.bulk}
+
+
+def subscribe(seeder):
+    Subscriptions.objects.create(user=seeder.viewer, author=seeder.stranger)
+
+
+def unsubscribe(seeder):
+    Subscriptions.objects.filter(
+        user=seeder.viewer, author=seeder.stranger
+    ).delete()
+
+
+def drop_new_recipe(seeder):
+    Recipe.objects.filter(name='Новый рецепт').delete()
+
+
+def create_disposable_recipe(seeder):
+    recipe = Recipe.objects.create(
+        author=seeder.viewer,
+        name='Удаляемый рецепт',
+        text='Описание',
+        cooking_time=1,
+        image='recipes/images/disposable.gif'
+    )
+    recipe.tags.set(seeder.tags)
+    return {'disposable': recipe.id}
+
+
+def drop_catalogs(seeder):
+    TAG_CATALOG.invalidate()
+    INGREDIENT_CATALOG.invalidate()
+
+
+def drop_new_user(seeder):
+    User.objects.filter(username='newcomer').delete()
+
+
+def restore_token(seeder):
+    Token.objects.get_or_create(user=seeder.viewer, key=seeder.token)
+
+
+QUERY_BUDGETS = {
+    'recipe-list-anon': case('anon', 'get', '/api/recipes/?limit=50', 6),
+    'recipe-list-user': case('user', 'get', '/api/recipes/?limit=50', 7),
+    'recipe-list-filtered': case(
+        'user', 'get',
+        '/api/recipes/?limit=50&is_favorited=1&tags=tag-0&tags=tag-1', 9
+    ),
+    'recipe-list-cursor': case(
+        'user', 'get', '/api/recipes/?cursor=&limit=50', 4
+    ),
+    'recipe-list-tags-all': case(
+        'anon', 'get',
+        '/api/recipes/?limit=50&tags=tag-0&tags=tag-2&tags_mode=all', 8
+    ),
+    'recipe-search': case(
+        'anon', 'get', '/api/recipes/?search=рецепт&tags=tag-1&limit=50', 8
+    ),
+    'recipe-detail-anon': case('anon', 'get', '/api/recipes/{target}/', 5),
+    'recipe-detail-user': case('user', 'get', '/api/recipes/{target}/', 5),
+    'recipe-create': case(
+        'user', 'post', '/api/recipes/', 25,
+        data=recipe_payload, cleanup=drop_new_recipe
+    ),
+    'recipe-update': case(
+        'user', 'patch', '/api/recipes/{own}/', 29,
+        data=recipe_payload, prepare=reset_own_image
+    ),
+    'recipe-update-text': case(
+        'user', 'patch', '/api/recipes/{own}/', 13,
+        data=lambda seeder: {'text': 'Исправленное описание'}
+    ),
+    'recipe-update-diff': case(
+        'user', 'patch', '/api/recipes/{own}/', 30,
+        data=edit_payload, prepare=reset_own_recipe
+    ),
+    'recipe-delete': case(
+        'user', 'delete', '/api/recipes/{disposable}/', 10,
+        prepare=create_disposable_recipe
+    ),
+    'download-shopping-cart': case(
+        'user', 'get', '/api/recipes/download_shopping_cart/', 1
+    ),
+    'download-shopping-cart-pdf': case(
+        'user', 'get', '/api/recipes/download_shopping_cart/?format=pdf', 1
+    ),
+    'favorite-add': case(
+        'user', 'post', '/api/recipes/{target}/favorite/', 7,
+        cleanup=drop_favorite
+    ),
+    'favorite-delete': case(
+        'user', 'delete', '/api/recipes/{target}/favorite/', 6,
+        prepare=add_favorite
+    ),
+    'shopping-cart-add': case(
+        'user', 'post', '/api/recipes/{target}/shopping_cart/', 8,
+        cleanup=drop_from_cart
+    ),
+    'shopping-cart-delete': case(
+        'user', 'delete', '/api/recipes/{target}/shopping_cart/', 7,
+        prepare=add_to_cart
+    ),
+    'favorite-bulk-add': case(
+        'user', 'post', '/api/recipes/favorite/', 7,
+        data=bulk_payload, prepare=pick_bulk(Favorite),
+        cleanup=unlink_bulk(Favorite)
+    ),
+    'favorite-bulk-delete': case(
+        'user', 'delete', '/api/recipes/favorite/', 6,
+        data=bulk_payload, prepare=link_bulk(Favorite)
+    ),
+    'shopping-cart-bulk-add': case(
+        'user', 'post', '/api/recipes/shopping_cart/', 10,
+        data=bulk_payload, prepare=pick_bulk(ShoppingList),
+        cleanup=unlink_bulk(ShoppingList)
+    ),
+    'shopping-cart-bulk-delete': case(
+        'user', 'delete', '/api/recipes/shopping_cart/', 9,
+        data=bulk_payload, prepare=link_bulk(ShoppingList)
+    ),
+    'tag-list': case('anon', 'get', '/api/tags/', 0),
+    'tag-list-cold': case(
+        'anon', 'get', '/api/tags/', 1, prepare=drop_catalogs
+    ),
+    'tag-detail': case('anon', 'get', '/api/tags/{tag}/', 0),
+    'ingredient-list': case('anon', 'get', '/api/ingredients/', 0),
+    'ingredient-list-cold': case(
+        'anon', 'get', '/api/ingredients/', 1, prepare=drop_catalogs
+    ),
+    'ingredient-search': case(
+        'anon', 'get', '/api/ingredients/?name=Ингр', 1
+    ),
+    'ingredient-detail': case(
+        'anon', 'get', '/api/ingredients/{ingredient}/', 0
+    ),
+    'user-list-anon': case('anon', 'get', '/api/users/?limit=50', 3),
+    'user-list-user': case('user', 'get', '/api/users/?limit=50', 5),
+    'user-detail': case('user', 'get', '/api/users/{author}/', 3),
+    'user-me': case('user', 'get', '/api/users/me/', 1),
+    'user-create': case(
+        'anon', 'post', '/api/users/', 5,
+        data=lambda seeder: {
+            'username': 'newcomer',
+            'email': 'newcomer@foodgram.test',
+            'first_name': 'New',
+            'last_name': 'Comer',
+            'password': PASSWORD,
+        },
+        cleanup=drop_new_user
+    ),
+    'set-password': case(
+        'user', 'post', '/api/users/set_password/', 1,
+        data=lambda seeder: {
+            'current_password': PASSWORD,
+            'new_password': PASSWORD,
+        }
+    ),
+    'subscriptions': case(
+        'user', 'get', '/api/users/subscriptions/?limit=50&recipes_limit=3',
+        3
+    ),
+    'subscriptions-cursor': case(
+        'user', 'get', '/api/users/subscriptions/?cursor=&limit=50'
+        '&recipes_limit=3', 2
+    ),
+    'subscribe': case(
+        'user', 'post', '/api/users/{author}/subscribe/', 8,
+        cleanup=unsubscribe
+    ),
+    'unsubscribe': case(
+        'user', 'delete', '/api/users/{author}/subscribe/', 6,
+        prepare=subscribe
+    ),
+    'token-login': case(
+        'anon', 'post', '/api/auth/token/login/', 4,
+        data=lambda seeder: {
+            'email': seeder.viewer.email,
+            'password': PASSWORD,
+        }
+    ),
+    'token-logout': case(
+        'user', 'post', '/api/auth/token/logout/', 2, cleanup=restore_token
+    ),
+}
+
+
+def format_queries(queries):
+    return '\n'.join(
+        f'{number}. {query["sql"]}'
+        for number, query in enumerate(queries, start=1)
+    )
+
+
+def call(client, seeder, endpoint):
+    url_kwargs = {
+        'target': seeder.target.id,
+        'own': seeder.own.id,
+        'author': seeder.stranger.id,
+        'tag': seeder.tags[0].id,
+        'ingredient': seeder.ingredients[0].id,
+    }
+    TAG_CATALOG.get()
+    INGREDIENT_CATALOG.get()
+    if endpoint.viewer == 'user':
+        # Как в установившемся режиме: пользователь токена уже в кэше.
+        client.get('/api/users/me/')
+    if endpoint.prepare is not None:
+        url_kwargs.update(endpoint.prepare(seeder) or {})
+    data = endpoint.data(seeder) if endpoint.data else None
+    with CaptureQueriesContext(connection) as context:
+        response = getattr(client, endpoint.method)(
+            endpoint.url.format(**url_kwargs), data=data, format='json'
+        )
+        if response.streaming:
+            b''.join(response.streaming_content)
+    if endpoint.cleanup is not None:
+        endpoint.cleanup(seeder)
+    assert response.status_code < 300, (
+        f'{endpoint.method.upper()} {endpoint.url} вернул '
+        f'{response.status_code}: {response.content[:500]}'
+    )
+    return context.captured_queries
+
+
+@pytest.mark.parametrize('name', sorted(QUERY_BUDGETS))
+def test_query_count_is_flat(name, seeder, anon_client, user_client,
+                             settings):
+    endpoint = QUERY_BUDGETS[name]
+    # Seeder пишет bulk_create без сигналов, и кэш ответов не сбросился бы.
+    settings.RESPONSE_CACHE_TIMEOUT = 0
+    client = user_client if endpoint.viewer == 'user' else anon_client
+    seeder.token = Token.objects.get(user=seeder.viewer).key
+    counts = {}
+    for size in SIZES:
+        seeder.grow(size)
+        queries = call(client, seeder, endpoint)
+        counts[size] = len(queries)
+    assert len(set(counts.values())) == 1, (
+        f'{name}: число запросов растёт вместе с данными {counts}\n'
+        f'{format_queries(queries)}'
+    )
+    assert counts[SIZES[-1]] <= endpoint.budget, (
+        f'{name}: {counts[SIZES[-1]]} запросов при бюджете '
+        f'{endpoint.budget}\n{format_queries(queries)}'
+    )
@@ -0,0 +1,69 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from foodgram.models import Recipe, Tag, TagRecipe
+from foodgram.serializers import RecipeGetSerializer
+
+from .test_image_variants import create_recipe, photo
+
+
+def render(rows, request):
+    return JSONRenderer().render(
+        RecipeGetSerializer(rows, many=True, context={'request': request}).data
+    )
+
+
+def make_request(user=None):
+    request = APIRequestFactory().get('/api/recipes/')
+    if user is not None:
+        force_authenticate(request, user)
+    return Request(request)
+
+
+@pytest.fixture
+def recipes(seeder, user_client):
+    seeder.grow(30)
+    create_recipe(seeder, user_client, photo(800, 600))
+    stale = Tag.objects.bulk_create([
+        Tag(name='Без кэша', color='#ffffff', slug='stale')
+    ])
+    TagRecipe.objects.create(
+        recipe=seeder.own, tag=Tag.objects.get(slug=stale[0].slug)
+    )
+    Recipe.objects.filter(pk=seeder.target.pk).update(image='')
+    return seeder
+
+
+@pytest.mark.parametrize('viewer', ('anon', 'user'))
+def test_cards_match_serializer_bytes(recipes, viewer):
+    request = make_request(recipes.viewer if viewer == 'user' else None)
+    user = request.user
+    expected = render(list(Recipe.objects.with_related(user)), request)
+    with CaptureQueriesContext(connection) as context:
+        rows = list(Recipe.objects.as_cards(user))
+        content = render(rows, request)
+    assert content == expected
+    # Страница, авторы, теги, ингредиенты и тег, которого нет в кэше.
+    assert len(context.captured_queries) == 5
+    assert b'"image":null' in content
+    assert b'"placeholder":"data:image/' in content
+    assert b'"slug":"stale"' in content
+
+
+def test_empty_page_runs_no_queries(seeder):
+    request = make_request()
+    with CaptureQueriesContext(connection) as context:
+        assert render([], request) == b'[]'
+    assert not context.captured_queries
+
+
+def test_api_list_uses_cards(recipes, user_client):
+    response = user_client.get('/api/recipes/?limit=50')
+    request = make_request(recipes.viewer)
+    instances = list(Recipe.objects.with_related(recipes.viewer)[:50])
+    expected = render(instances, request)
+    assert JSONRenderer().render(response.json()['results']) == expected
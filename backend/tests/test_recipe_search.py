@@ -0,0 +1,80 @@
+import pytest
+
+from foodgram.models import Ingredient, IngredientsRecipe, Recipe
+
+
+@pytest.fixture
+def recipes(seeder):
+    beet = Ingredient.objects.create(name='Свёкла', measurement_unit='г')
+    salt = Ingredient.objects.create(name='Соль', measurement_unit='г')
+
+    def create(name, text, ingredients=()):
+        recipe = Recipe.objects.create(
+            author=seeder.stranger, name=name, text=text, cooking_time=5,
+            image='recipes/images/search.gif'
+        )
+        IngredientsRecipe.objects.bulk_create(
+            IngredientsRecipe(recipe=recipe, ingredient=ingredient, amount=1)
+            for ingredient in ingredients
+        )
+        return recipe
+
+    return {
+        'borscht': create('Борщ', 'Классический суп', (beet, salt)),
+        'salad': create('Винегрет', 'Салат из вареного борщевого набора',
+                        (beet,)),
+        'soup': create('Щи', 'Суп из капусты', (salt,)),
+        'beet': beet,
+    }
+
+
+def found(client, query):
+    response = client.get(f'/api/recipes/?search={query}&limit=50')
+    assert response.status_code == 200
+    return [recipe['id'] for recipe in response.json()['results']]
+
+
+def test_name_ranks_above_text(anon_client, recipes):
+    assert found(anon_client, 'борщ') == [
+        recipes['borscht'].id, recipes['salad'].id
+    ]
+
+
+def test_ingredients_and_yo(anon_client, recipes):
+    assert set(found(anon_client, 'свекла')) == {
+        recipes['borscht'].id, recipes['salad'].id
+    }
+    assert found(anon_client, 'СУП КАП') == [recipes['soup'].id]
+    assert found(anon_client, 'суп пирог') == []
+
+
+def test_search_follows_changes(anon_client, recipes, settings):
+    settings.RESPONSE_CACHE_TIMEOUT = 0
+    recipes['beet'].name = 'Буряк'
+    recipes['beet'].save()
+    assert set(found(anon_client, 'буряк')) == {
+        recipes['borscht'].id, recipes['salad'].id
+    }
+    IngredientsRecipe.objects.filter(recipe=recipes['salad']).delete()
+    Recipe.objects.filter(pk=recipes['soup'].pk).update(name='Буряковый')
+    assert found(anon_client, 'буряк') == [
+        recipes['soup'].id, recipes['borscht'].id
+    ]
+    recipes['borscht'].delete()
+    assert found(anon_client, 'буряк') == [recipes['soup'].id]
+
+
+def test_search_combines_with_filters(anon_client, user_client, recipes,
+                                      seeder):
+    seeder.grow(10)
+    assert set(found(anon_client, 'рецепт')) == set(
+        Recipe.objects.exclude(
+            author=seeder.stranger, name__in=('Борщ', 'Винегрет', 'Щи')
+        ).values_list('id', flat=True)
+    )
+    response = anon_client.get(
+        f'/api/recipes/?search=суп&author={seeder.stranger.id}&limit=1'
+    )
+    assert response.json()['count'] == 2
+    assert len(response.json()['results']) == 1
+    assert found(anon_client, '!!!') == found(anon_client, '')
@@ -0,0 +1,102 @@
+from foodgram.models import IngredientsRecipe, Recipe
+
+from .conftest import IMAGE
+
+
+def links(recipe):
+    return dict(
+        IngredientsRecipe.objects.filter(recipe=recipe).values_list(
+            'ingredient_id', 'amount'
+        )
+    )
+
+
+def test_create(seeder, user_client):
+    response = user_client.post('/api/recipes/', {
+        'tags': [tag.id for tag in seeder.tags],
+        'ingredients': [
+            {'id': seeder.ingredients[1].id, 'amount': 5},
+            {'id': seeder.ingredients[2].id, 'amount': 7},
+        ],
+        'name': 'Новый рецепт',
+        'image': IMAGE,
+        'text': 'Описание',
+        'cooking_time': 10,
+    }, format='json')
+    assert response.status_code == 201, response.content
+    recipe = Recipe.objects.get(pk=response.json()['id'])
+    assert links(recipe) == {
+        seeder.ingredients[1].id: 5, seeder.ingredients[2].id: 7
+    }
+    assert set(recipe.tags.all()) == set(seeder.tags)
+    assert [
+        item['amount'] for item in response.json()['ingredients']
+    ] == [5, 7]
+
+
+def test_patch_without_tags_and_ingredients(seeder, user_client):
+    before = links(seeder.own)
+    response = user_client.patch(
+        f'/api/recipes/{seeder.own.id}/', {'text': 'Исправлено'},
+        format='json'
+    )
+    assert response.status_code == 200, response.content
+    assert response.json()['text'] == 'Исправлено'
+    assert links(seeder.own) == before
+    assert len(response.json()['tags']) == len(seeder.tags)
+
+
+def test_patch_applies_diff(seeder, user_client):
+    kept = IngredientsRecipe.objects.get(
+        recipe=seeder.own, ingredient=seeder.ingredients[0]
+    )
+    response = user_client.patch(f'/api/recipes/{seeder.own.id}/', {
+        'tags': [seeder.tags[1].id],
+        'ingredients': [
+            {'id': seeder.ingredients[0].id, 'amount': 10},
+            {'id': seeder.ingredients[1].id, 'amount': 3},
+            {'id': seeder.ingredients[9].id, 'amount': 4},
+        ],
+    }, format='json')
+    assert response.status_code == 200, response.content
+    assert links(seeder.own) == {
+        seeder.ingredients[0].id: 10,
+        seeder.ingredients[1].id: 3,
+        seeder.ingredients[9].id: 4,
+    }
+    assert IngredientsRecipe.objects.filter(pk=kept.pk).exists()
+    assert list(seeder.own.tags.all()) == [seeder.tags[1]]
+
+
+def test_empty_tags_and_ingredients_are_rejected(seeder, user_client):
+    for field in ('tags', 'ingredients'):
+        response = user_client.patch(
+            f'/api/recipes/{seeder.own.id}/', {field: []}, format='json'
+        )
+        assert response.status_code == 400
+
+
+def test_unknown_ids_are_reported_together(seeder, user_client):
+    response = user_client.patch(f'/api/recipes/{seeder.own.id}/', {
+        'tags': [seeder.tags[0].id, 9001, 9002],
+        'ingredients': [
+            {'id': seeder.ingredients[0].id, 'amount': 1},
+            {'id': 9003, 'amount': 1},
+            {'id': '9004', 'amount': 1},
+        ],
+    }, format='json')
+    assert response.status_code == 400
+    errors = response.json()
+    assert '9001, 9002' in errors['tags'][0]
+    assert '9003, 9004' in errors['ingredients'][0]
+
+
+def test_duplicate_ingredients_are_rejected(seeder, user_client):
+    ingredient = seeder.ingredients[0].id
+    response = user_client.patch(f'/api/recipes/{seeder.own.id}/', {
+        'ingredients': [
+            {'id': ingredient, 'amount': 1},
+            {'id': str(ingredient), 'amount': 2},
+        ],
+    }, format='json')
+    assert response.status_code == 400
@@ -0,0 +1,138 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from foodgram.models import Favorite, Recipe, ShoppingList
+from foodgram.relations import add_relations, remove_relations
+from users.models import Subscriptions
+
+from .test_shopping_list import cart_items, expected_totals
+
+
+def counters(*recipes):
+    return list(Recipe.objects.filter(
+        pk__in=[recipe.pk for recipe in recipes]
+    ).order_by('pk').values_list('favorites_count', 'in_carts_count'))
+
+
+@pytest.mark.parametrize('relation', ('favorite', 'shopping_cart'))
+def test_single_writes_are_idempotent(seeder, user_client, relation):
+    url = f'/api/recipes/{seeder.target.id}/{relation}/'
+    first = user_client.post(url)
+    assert first.status_code == 201
+    assert first.json()['id'] == seeder.target.id
+    second = user_client.post(url)
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert sum(counters(seeder.target)[0]) == 1
+    assert user_client.delete(url).status_code == 204
+    assert user_client.delete(url).status_code == 204
+    assert counters(seeder.target) == [(0, 0)]
+    missing = '/api/recipes/0/'
+    assert user_client.post(f'{missing}{relation}/').status_code == 404
+    assert user_client.delete(f'{missing}{relation}/').status_code == 404
+
+
+def test_bulk_cart_sync(seeder, user_client):
+    seeder.grow(20)
+    recipes = list(Recipe.objects.exclude(
+        shopping_list__user=seeder.viewer
+    ).order_by('id')[:4])
+    ids = [recipe.id for recipe in recipes]
+    url = '/api/recipes/shopping_cart/'
+    response = user_client.post(
+        url, {'recipes': [*ids, ids[0]]}, format='json'
+    )
+    assert response.status_code == 201
+    assert [item['id'] for item in response.json()] == ids
+    assert cart_items(seeder.viewer) == expected_totals(seeder.viewer)
+    assert counters(*recipes) == [
+        (recipe.favorites_count, recipe.in_carts_count + 1)
+        for recipe in recipes
+    ]
+    response = user_client.post(url, {'recipes': ids[:2]}, format='json')
+    assert response.status_code == 200
+    response = user_client.delete(url, {'recipes': ids[1:]}, format='json')
+    assert response.status_code == 204
+    assert cart_items(seeder.viewer) == expected_totals(seeder.viewer)
+    assert set(ShoppingList.objects.filter(
+        user=seeder.viewer, recipe_id__in=ids
+    ).values_list('recipe_id', flat=True)) == {ids[0]}
+    assert counters(*recipes)[1:] == [
+        (recipe.favorites_count, recipe.in_carts_count)
+        for recipe in recipes[1:]
+    ]
+
+
+def test_bulk_rejects_unknown_recipes(seeder, user_client):
+    url = '/api/recipes/favorite/'
+    response = user_client.post(
+        url, {'recipes': [seeder.target.id, 0, 999999]}, format='json'
+    )
+    assert response.status_code == 400
+    assert not Favorite.objects.filter(user=seeder.viewer).exists()
+    for payload in ({'recipes': []}, {'recipes': 'x'}, {}):
+        response = user_client.post(url, payload, format='json')
+        assert response.status_code == 400
+    assert user_client.post(url).status_code == 400
+
+
+def test_insert_ignores_existing_rows(seeder):
+    Favorite.objects.bulk_create([
+        Favorite(user=seeder.viewer, recipe=seeder.target)
+    ])
+    added = add_relations(
+        Favorite, seeder.viewer, [seeder.target.id, seeder.own.id]
+    )
+    assert added == [seeder.own.id]
+    assert Favorite.objects.filter(user=seeder.viewer).count() == 2
+
+
+def test_subscribe_is_idempotent(seeder, user_client):
+    url = f'/api/users/{seeder.stranger.id}/subscribe/'
+    first = user_client.post(url)
+    assert first.status_code == 201
+    assert first.json()['is_subscribed'] is True
+    assert user_client.post(url).status_code == 200
+    seeder.stranger.refresh_from_db()
+    assert seeder.stranger.followers_count == 1
+    assert user_client.delete(url).status_code == 204
+    assert user_client.delete(url).status_code == 204
+    assert not Subscriptions.objects.filter(
+        user=seeder.viewer, author=seeder.stranger
+    ).exists()
+    seeder.stranger.refresh_from_db()
+    assert seeder.stranger.followers_count == 0
+    response = user_client.post(f'/api/users/{seeder.viewer.id}/subscribe/')
+    assert response.status_code == 400
+    assert 'non_field_errors' in response.json()
+    assert user_client.delete('/api/users/0/subscribe/').status_code == 404
+
+
+def test_subscription_locks_both_users(seeder):
+    with CaptureQueriesContext(connection) as context:
+        add_relations(Subscriptions, seeder.stranger, [seeder.viewer.id])
+    lock = next(
+        query['sql'] for query in context.captured_queries
+        if 'users_user' in query['sql']
+    )
+    assert 'ORDER BY' in lock
+    ids = sorted((seeder.viewer.id, seeder.stranger.id))
+    assert f'IN ({ids[0]}, {ids[1]})' in lock
+
+
+def test_removal_counts_each_link_once(seeder):
+    ids = [seeder.target.id, seeder.own.id]
+    for recipe_id in ids:
+        Favorite.objects.create(user=seeder.viewer, recipe_id=recipe_id)
+    before = counters(seeder.target, seeder.own)
+    removed = remove_relations(Favorite, seeder.viewer, [*ids, 0])
+    assert sorted(removed) == sorted(ids)
+    assert counters(seeder.target, seeder.own) == [
+        (favorites - 1, in_carts) for favorites, in_carts in before
+    ]
+    Favorite.objects.create(user=seeder.viewer, recipe=seeder.target)
+    Favorite.objects.filter(user=seeder.viewer).delete()
+    assert counters(seeder.target, seeder.own) == [
+        (favorites - 1, in_carts) for favorites, in_carts in before
+    ]
@@ -0,0 +1,123 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from foodgram.models import Recipe
+from foodgram.views import RecipeViewSet
+
+
+def outcome(client, url, **headers):
+    response = client.get(url, **headers)
+    assert response.status_code in (200, 304), response.content
+    return response.get('X-Cache')
+
+
+@pytest.fixture
+def recipe(seeder):
+    recipe = Recipe.objects.create(
+        author=seeder.viewer,
+        name='Рецепт с одним тегом',
+        text='Только последний тег',
+        cooking_time=5,
+        image='recipes/images/tagged.gif'
+    )
+    recipe.tags.set(seeder.tags[2:])
+    return recipe
+
+
+def test_anonymous_hit_without_queries(seeder, anon_client):
+    url = '/api/recipes/?limit=5&tags=tag-1&tags=tag-0'
+    first = anon_client.get(url)
+    assert first['X-Cache'] == 'MISS'
+    with CaptureQueriesContext(connection) as context:
+        second = anon_client.get('/api/recipes/?tags=tag-0&limit=5&tags=tag-1')
+    assert second['X-Cache'] == 'HIT'
+    assert not context.captured_queries
+    assert second.content == first.content
+    assert second['ETag'] == first['ETag']
+    not_modified = anon_client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+    assert not_modified.status_code == 304
+
+
+def test_authenticated_not_cached(seeder, user_client):
+    url = '/api/recipes/?limit=5'
+    assert outcome(user_client, url) is None
+    assert outcome(user_client, url) is None
+
+
+def test_recipe_write_is_targeted(seeder, anon_client, user_client, recipe):
+    urls = {
+        'list': '/api/recipes/?limit=5',
+        'tag-0': '/api/recipes/?limit=5&tags=tag-0',
+        'tag-2': '/api/recipes/?limit=5&tags=tag-2',
+        'target': f'/api/recipes/{seeder.target.id}/',
+        'recipe': f'/api/recipes/{recipe.id}/',
+    }
+    for url in urls.values():
+        assert outcome(anon_client, url) == 'MISS'
+    response = user_client.patch(
+        f'/api/recipes/{recipe.id}/', {'name': 'Новое имя'}, format='json'
+    )
+    assert response.status_code == 200
+    results = {name: outcome(anon_client, url) for name, url in urls.items()}
+    assert results == {
+        'list': 'MISS', 'tag-0': 'HIT', 'tag-2': 'MISS',
+        'target': 'HIT', 'recipe': 'MISS',
+    }
+    assert anon_client.get(urls['recipe']).json()['name'] == 'Новое имя'
+
+
+def test_removed_tag_is_invalidated(seeder, anon_client, user_client, recipe):
+    url = '/api/recipes/?limit=5&tags=tag-2'
+    ids = [item['id'] for item in anon_client.get(url).json()['results']]
+    assert recipe.id in ids
+    response = user_client.patch(
+        f'/api/recipes/{recipe.id}/',
+        {'tags': [seeder.tags[1].id]}, format='json'
+    )
+    assert response.status_code == 200
+    response = anon_client.get(url)
+    assert response['X-Cache'] == 'MISS'
+    assert recipe.id not in [item['id'] for item in response.json()['results']]
+
+
+def test_counters_ordering(seeder, anon_client, user_client):
+    ordered = '/api/recipes/?limit=5&ordering=-favorites_count'
+    plain = '/api/recipes/?limit=5'
+    assert outcome(anon_client, ordered) == 'MISS'
+    assert outcome(anon_client, plain) == 'MISS'
+    user_client.post(f'/api/recipes/{seeder.target.id}/favorite/')
+    assert outcome(anon_client, ordered) == 'MISS'
+    assert outcome(anon_client, plain) == 'HIT'
+
+
+def test_tag_change_resets_everything(seeder, anon_client):
+    urls = ('/api/tags/', '/api/recipes/?limit=5&tags=tag-0')
+    for url in urls:
+        assert outcome(anon_client, url) == 'MISS'
+        assert outcome(anon_client, url) == 'HIT'
+    seeder.tags[0].name = 'Переименованный'
+    seeder.tags[0].save()
+    for url in urls:
+        assert outcome(anon_client, url) == 'MISS'
+
+
+def test_cache_can_be_disabled(seeder, anon_client, settings):
+    settings.RESPONSE_CACHE_TIMEOUT = 0
+    assert outcome(anon_client, '/api/recipes/?limit=5') is None
+
+
+def test_stats_command(seeder, anon_client):
+    RecipeViewSet.response_cache.reset_stats()
+    for _ in range(3):
+        anon_client.get('/api/recipes/?limit=5')
+    assert RecipeViewSet.response_cache.stats() == {'hits': 2, 'misses': 1}
+    out = StringIO()
+    call_command('cache_stats', '--reset', stdout=out)
+    assert 'responses-recipes: попаданий 2, промахов 1 (67%)' in (
+        out.getvalue()
+    )
+    assert RecipeViewSet.response_cache.stats() == {'hits': 0, 'misses': 0}
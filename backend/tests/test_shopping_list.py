@@ -0,0 +1,190 @@
+import csv
+import io
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from foodgram.models import IngredientsRecipe, ShoppingCartItem, ShoppingList
+from foodgram.shopping_list import change_cart_items
+
+from .conftest import IMAGE
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+def expected_totals(user):
+    totals = {}
+    for link in IngredientsRecipe.objects.filter(
+        recipe__shopping_list__user=user
+    ).select_related('ingredient'):
+        key = (link.ingredient.name, link.ingredient.measurement_unit)
+        totals[key] = totals.get(key, 0) + link.amount
+    return sorted(totals.items())
+
+
+def download(client, query=''):
+    response = client.get(URL + query)
+    assert response.status_code == 200
+    assert response.streaming
+    return response, b''.join(response.streaming_content)
+
+
+def test_txt_is_default(seeder, user_client):
+    seeder.grow(30)
+    response, content = download(user_client)
+    assert response['Content-Type'] == 'text/plain; charset=utf-8'
+    assert 'shopping_list.txt' in response['Content-Disposition']
+    lines = content.decode().splitlines()
+    assert lines[0] == 'список покупок:'
+    assert lines[1:] == [
+        f'{number} {name}({unit}) - {total} '
+        for number, ((name, unit), total) in enumerate(
+            expected_totals(seeder.viewer), start=1
+        )
+    ]
+
+
+def test_csv(seeder, user_client):
+    seeder.grow(30)
+    response, content = download(user_client, '?format=csv')
+    assert response['Content-Type'] == 'text/csv; charset=utf-8'
+    assert 'shopping_list.csv' in response['Content-Disposition']
+    rows = list(csv.reader(io.StringIO(content.decode())))
+    assert rows[0] == ['number', 'name', 'measurement_unit', 'amount']
+    assert [(row[1], row[2], int(row[3])) for row in rows[1:]] == [
+        (name, unit, total)
+        for (name, unit), total in expected_totals(seeder.viewer)
+    ]
+
+
+@pytest.mark.parametrize('in_cart', (True, False))
+def test_json(seeder, user_client, in_cart):
+    if in_cart:
+        seeder.grow(30)
+    response, content = download(user_client, '?format=json')
+    assert response['Content-Type'] == 'application/json'
+    assert json.loads(content) == [
+        {'name': name, 'measurement_unit': unit, 'amount': total}
+        for (name, unit), total in expected_totals(seeder.viewer)
+    ]
+
+
+def test_pdf(seeder, user_client):
+    seeder.grow(1000)
+    response, content = download(user_client, '?format=pdf')
+    assert response['Content-Type'] == 'application/pdf'
+    assert content.startswith(b'%PDF-1.4')
+    assert content.rstrip().endswith(b'%%EOF')
+    assert content.count(b'/Type /Page ') > 1
+    startxref = int(content.rsplit(b'startxref', 1)[1].split()[0])
+    assert content[startxref:].startswith(b'xref')
+
+
+def test_pdf_with_empty_cart(seeder, user_client):
+    ShoppingList.objects.filter(user=seeder.viewer).delete()
+    _, content = download(user_client, '?format=pdf')
+    assert content.count(b'/Type /Page ') == 1
+
+
+def test_format_from_accept_header(seeder, user_client):
+    response = user_client.get(URL, HTTP_ACCEPT='text/csv')
+    assert response['Content-Type'] == 'text/csv; charset=utf-8'
+
+
+def test_unknown_format(seeder, user_client):
+    assert user_client.get(URL + '?format=xlsx').status_code == 404
+
+
+def test_anonymous_is_rejected(anon_client):
+    assert anon_client.get(URL + '?format=pdf').status_code == 401
+
+
+def cart_items(user):
+    return sorted(
+        ((item.ingredient.name, item.ingredient.measurement_unit),
+         item.total_amount)
+        for item in ShoppingCartItem.objects.filter(
+            user=user
+        ).select_related('ingredient')
+    )
+
+
+def test_cart_items_follow_cart_changes(seeder, user_client):
+    seeder.grow(20)
+    url = f'/api/recipes/{seeder.target.id}/shopping_cart/'
+    IngredientsRecipe.objects.create(
+        recipe=seeder.target, ingredient=seeder.ingredients[0], amount=5
+    )
+    IngredientsRecipe.objects.create(
+        recipe=seeder.target, ingredient=seeder.ingredients[49], amount=7
+    )
+    user_client.post(url)
+    assert cart_items(seeder.viewer) == expected_totals(seeder.viewer)
+    user_client.delete(url)
+    assert cart_items(seeder.viewer) == expected_totals(seeder.viewer)
+
+
+def test_cart_items_follow_recipe_edits(seeder, user_client):
+    ShoppingList.objects.create(user=seeder.viewer, recipe=seeder.own)
+    ShoppingList.objects.create(user=seeder.stranger, recipe=seeder.own)
+    response = user_client.patch(f'/api/recipes/{seeder.own.id}/', {
+        'tags': [seeder.tags[0].id],
+        'ingredients': [
+            {'id': seeder.ingredients[0].id, 'amount': 3},
+            {'id': seeder.ingredients[7].id, 'amount': 4},
+        ],
+        'name': 'Свой рецепт',
+        'image': IMAGE,
+        'text': 'Новый текст',
+        'cooking_time': 5,
+    }, format='json')
+    assert response.status_code == 200
+    for user in (seeder.viewer, seeder.stranger):
+        assert cart_items(user) == expected_totals(user)
+    link = IngredientsRecipe.objects.get(
+        recipe=seeder.own, ingredient=seeder.ingredients[7]
+    )
+    link.amount = 10
+    link.save()
+    link.delete()
+    seeder.own.delete()
+    for user in (seeder.viewer, seeder.stranger):
+        assert cart_items(user) == expected_totals(user)
+
+
+def test_cart_items_skip_rows_inserted_meanwhile(seeder):
+    first, second = seeder.ingredients[:2]
+    users = [seeder.viewer.pk, seeder.stranger.pk]
+    ShoppingCartItem.objects.create(
+        user=seeder.stranger, ingredient=first, total_amount=2
+    )
+    change_cart_items(users, {first.pk: 3, second.pk: 4})
+    change_cart_items(users, {second.pk: -4})
+    assert sorted(ShoppingCartItem.objects.filter(
+        user_id__in=users
+    ).values_list('user_id', 'ingredient_id', 'total_amount')) == sorted((
+        (seeder.viewer.pk, first.pk, 3), (seeder.stranger.pk, first.pk, 5),
+    ))
+
+
+def test_rebuild_shopping_carts(seeder):
+    seeder.grow(20)
+    expected = cart_items(seeder.viewer)
+    item = ShoppingCartItem.objects.filter(user=seeder.viewer).first()
+    item.total_amount += 100
+    item.save()
+    ShoppingCartItem.objects.create(
+        user=seeder.stranger, ingredient=seeder.ingredients[1],
+        total_amount=1
+    )
+    out = StringIO()
+    call_command('rebuild_shopping_carts', '--check', stdout=out)
+    assert 'Расхождений найдено: 2' in out.getvalue()
+    call_command('rebuild_shopping_carts', '--chunk-size=1', stdout=out)
+    assert cart_items(seeder.viewer) == expected
+    assert not ShoppingCartItem.objects.filter(user=seeder.stranger).exists()
+    out = StringIO()
+    call_command('rebuild_shopping_carts', stdout=out)
+    assert 'Списки покупок в порядке' in out.getvalue()
@@ -0,0 +1,71 @@
+import pytest
+
+from foodgram.models import Recipe
+from users.models import User
+
+
+def recipe_ids(author, limit):
+    return list(
+        Recipe.objects.filter(author=author).order_by(
+            '-pub_date', '-id'
+        ).values_list('id', flat=True)[:limit]
+    )
+
+
+@pytest.mark.parametrize('recipes_limit, expected', (
+    ('2', 2), ('', 3), ('abc', 3), ('-1', 3), ('1000', 10),
+))
+def test_latest_recipes_per_author(settings, seeder, user_client,
+                                   recipes_limit, expected):
+    settings.SUBSCRIPTION_RECIPES_MAX_LIMIT = 10
+    seeder.grow(50)
+    response = user_client.get(
+        f'/api/users/subscriptions/?limit=10&recipes_limit={recipes_limit}'
+    )
+    authors = response.json()['results']
+    assert len(authors) == 5
+    for author in authors:
+        assert [recipe['id'] for recipe in author['recipes']] == (
+            recipe_ids(author['id'], expected)
+        )
+        assert set(author['recipes'][0]) == {
+            'id', 'name', 'image', 'image_variants', 'cooking_time'
+        }
+        assert author['recipes_count'] == 10
+        assert author['is_subscribed'] is True
+
+
+def test_subscribe_response_is_limited(seeder, user_client):
+    seeder.grow(10)
+    author = Recipe.objects.filter(author__username='author0').first().author
+    user_client.delete(f'/api/users/{author.id}/subscribe/')
+    response = user_client.post(
+        f'/api/users/{author.id}/subscribe/?recipes_limit=4'
+    )
+    assert [recipe['id'] for recipe in response.json()['recipes']] == (
+        recipe_ids(author, 4)
+    )
+
+
+def test_subscriptions_ordering(seeder, user_client):
+    seeder.grow(40)
+    ids = sorted(User.objects.filter(
+        following__user=seeder.viewer
+    ).values_list('id', flat=True))
+    for number, pk in enumerate(ids):
+        User.objects.filter(pk=pk).update(
+            recipes_count=number, followers_count=len(ids) - number
+        )
+
+    def order(ordering):
+        response = user_client.get(
+            f'/api/users/subscriptions/?limit=10&ordering={ordering}'
+        )
+        assert response.status_code == 200
+        return [author['id'] for author in response.json()['results']]
+
+    assert order('id') == ids
+    assert order('-id') == ids[::-1]
+    assert order('recipes_count') == ids
+    assert order('-recipes_count') == ids[::-1]
+    assert order('followers_count') == ids[::-1]
@@ -0,0 +1,74 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from foodgram.models import Recipe, Tag, TagRecipe
+
+
+def expected(slugs, match_all):
+    result = []
+    for recipe in Recipe.objects.prefetch_related('tags'):
+        tags = {tag.slug for tag in recipe.tags.all()}
+        if (tags >= slugs) if match_all else (tags & slugs):
+            result.append(recipe.id)
+    return sorted(result)
+
+
+def found(client, slugs, mode=None):
+    query = '&'.join(f'tags={slug}' for slug in slugs)
+    if mode:
+        query += f'&tags_mode={mode}'
+    response = client.get(f'/api/recipes/?{query}&limit=1000')
+    assert response.status_code == 200, response.content
+    data = response.json()
+    ids = [recipe['id'] for recipe in data['results']]
+    assert len(ids) == len(set(ids)) == data['count']
+    return sorted(ids)
+
+
+@pytest.mark.parametrize('mode', (None, 'any', 'all'))
+@pytest.mark.parametrize('slugs', (
+    {'tag-0'}, {'tag-1', 'tag-2'}, {'tag-0', 'tag-1', 'tag-2'},
+))
+def test_tags_modes(seeder, anon_client, slugs, mode):
+    seeder.grow(30)
+    assert found(anon_client, slugs, mode) == expected(slugs, mode == 'all')
+
+
+def test_exists_fallback_without_flag(seeder, anon_client):
+    seeder.grow(30)
+    slugs = {'tag-1', 'tag-2'}
+    with_mask = found(anon_client, slugs, 'all')
+    Tag.objects.filter(slug='tag-2').update(flag=0)
+    assert found(anon_client, slugs, 'all') == with_mask
+    assert found(anon_client, slugs, 'any') == expected(slugs, False)
+    Tag.objects.get(slug='tag-2').save()
+    out = StringIO()
+    call_command('rebuild_counters', '--check', stdout=out)
+    assert 'Счётчики в порядке' in out.getvalue()
+
+
+def test_mask_follows_links(seeder, user_client):
+    tags = {tag.slug: tag for tag in seeder.tags}
+    response = user_client.patch(
+        f'/api/recipes/{seeder.own.id}/',
+        {'tags': [tags['tag-1'].id]}, format='json'
+    )
+    assert response.status_code == 200
+    seeder.own.refresh_from_db()
+    assert seeder.own.tags_mask == tags['tag-1'].flag
+    TagRecipe.objects.create(recipe=seeder.own, tag=tags['tag-2'])
+    seeder.own.refresh_from_db()
+    assert seeder.own.tags_mask == tags['tag-1'].flag | tags['tag-2'].flag
+    tags['tag-1'].delete()
+    seeder.own.refresh_from_db()
+    assert seeder.own.tags_mask == tags['tag-2'].flag
+    assert Tag.objects.create(
+        name='Новый', color='#FFFFFF', slug='new'
+    ).flag == tags['tag-1'].flag
+
+
+def test_invalid_mode(seeder, anon_client):
+    response = anon_client.get('/api/recipes/?tags=tag-0&tags_mode=none')
+    assert response.status_code == 400
@@ -0,0 +1,123 @@
+import pytest
+from django.core.cache import caches
+from rest_framework.test import APIClient
+
+from foodgram.throttling import TokenBucketThrottle, slot_key
+
+from .conftest import PASSWORD
+
+LOGIN = '/api/auth/token/login/'
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(TokenBucketThrottle, 'timer', clock)
+    return clock
+
+
+@pytest.fixture
+def rates(settings):
+    def configure(**rates):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates
+        }
+    return configure
+
+
+def login(client, seeder):
+    return client.post(LOGIN, {
+        'email': seeder.viewer.email, 'password': PASSWORD
+    }, format='json')
+
+
+def test_login_bucket_refills(seeder, anon_client, clock, rates):
+    rates(login='3/min')
+    for remaining in (2, 1, 0):
+        response = login(anon_client, seeder)
+        assert response.status_code == 200
+        assert response['X-RateLimit-Limit'] == '3'
+        assert response['X-RateLimit-Remaining'] == str(remaining)
+    response = login(anon_client, seeder)
+    assert response.status_code == 429
+    assert response['Retry-After'] == '20'
+    assert response['X-RateLimit-Remaining'] == '0'
+    assert response['X-RateLimit-Reset'] == '60'
+    clock.now += 20
+    assert login(anon_client, seeder).status_code == 200
+    assert login(anon_client, seeder).status_code == 429
+
+
+def test_buckets_are_per_client(seeder, anon_client, clock, rates):
+    rates(login='1/min')
+    assert login(anon_client, seeder).status_code == 200
+    assert login(anon_client, seeder).status_code == 429
+    other = APIClient(REMOTE_ADDR='10.0.0.2')
+    assert login(other, seeder).status_code == 200
+
+
+def test_forwarded_for_is_not_spoofable(seeder, clock, rates):
+    rates(login='2/min')
+    statuses = [
+        login(APIClient(
+            REMOTE_ADDR='172.17.0.1',
+            HTTP_X_FORWARDED_FOR=f'10.1.0.{number}, 10.0.0.5'
+        ), seeder).status_code
+        for number in range(3)
+    ]
+    assert statuses == [200, 200, 429]
+    other = APIClient(
+        REMOTE_ADDR='172.17.0.1', HTTP_X_FORWARDED_FOR='10.0.0.6'
+    )
+    assert login(other, seeder).status_code == 200
+
+
+def test_user_and_endpoint_scopes(seeder, user_client, clock, rates):
+    rates(user='3/min', shopping_cart='1/min')
+    url = '/api/recipes/download_shopping_cart/'
+    assert user_client.get(url).status_code == 200
+    response = user_client.get(url)
+    assert response.status_code == 429
+    assert response['Retry-After'] == '60'
+    response = user_client.get('/api/tags/')
+    assert response.status_code == 200
+    assert response['X-RateLimit-Remaining'] == '0'
+    assert user_client.get('/api/tags/').status_code == 429
+    assert APIClient().get('/api/tags/').status_code == 200
+
+
+def test_anonymous_rate(seeder, anon_client, user_client, clock, rates):
+    rates(anon='1/s')
+    assert anon_client.get('/api/tags/').status_code == 200
+    assert anon_client.get('/api/tags/').status_code == 429
+    assert user_client.get('/api/tags/').status_code == 200
+
+
+def test_local_store(seeder, anon_client, clock, rates, settings):
+    settings.THROTTLE_CACHE = 'local'
+    rates(login='1/min')
+    assert login(anon_client, seeder).status_code == 200
+    assert login(anon_client, seeder).status_code == 429
+
+
+def test_concurrency_limit(seeder, anon_client, settings):
+    settings.CONCURRENCY_LIMITS = {'login': 1}
+    settings.CONCURRENCY_WAIT = 0
+    cache = caches[settings.THROTTLE_CACHE]
+    cache.set(slot_key('login'), 1)
+    response = login(anon_client, seeder)
+    assert response.status_code == 503
+    assert response['Retry-After'] == '1'
+    assert cache.get(slot_key('login')) == 1
+    cache.decr(slot_key('login'))
+    assert login(anon_client, seeder).status_code == 200
+    assert cache.get(slot_key('login')) == 0
@@ -0,0 +1,85 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from users.authentication import TOKEN_STATS
+from users.models import User
+
+from .conftest import PASSWORD
+
+ME = '/api/users/me/'
+
+
+def token_queries(client):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(ME)
+    queries = [
+        query for query in context.captured_queries
+        if 'authtoken_token' in query['sql']
+    ]
+    return response.status_code, len(queries)
+
+
+def test_user_is_cached(seeder, user_client):
+    TOKEN_STATS.reset_stats()
+    assert token_queries(user_client) == (200, 1)
+    assert token_queries(user_client) == (200, 0)
+    assert token_queries(user_client) == (200, 0)
+    assert TOKEN_STATS.stats() == {'hits': 2, 'misses': 1}
+
+
+def test_cache_can_be_disabled(seeder, user_client, settings):
+    settings.TOKEN_CACHE_TIMEOUT = 0
+    assert token_queries(user_client) == (200, 1)
+    assert token_queries(user_client) == (200, 1)
+
+
+def test_logout_revokes_token(seeder, user_client):
+    assert token_queries(user_client) == (200, 1)
+    response = user_client.post('/api/auth/token/logout/')
+    assert response.status_code == 204
+    assert token_queries(user_client) == (401, 1)
+
+
+def test_token_deletion_revokes_token(seeder, user_client):
+    assert token_queries(user_client) == (200, 1)
+    Token.objects.filter(user=seeder.viewer).delete()
+    assert token_queries(user_client)[0] == 401
+
+
+def test_password_change_evicts_user(seeder, user_client):
+    assert token_queries(user_client) == (200, 1)
+    response = user_client.post('/api/users/set_password/', {
+        'current_password': PASSWORD, 'new_password': 'Another-Pass-2'
+    }, format='json')
+    assert response.status_code == 204, response.content
+    assert token_queries(user_client) == (200, 1)
+
+
+def test_password_change_keeps_other_fields(seeder, user_client):
+    assert token_queries(user_client) == (200, 1)
+    User.objects.filter(pk=seeder.viewer.pk).update(
+        first_name='Renamed', followers_count=7
+    )
+    response = user_client.post('/api/users/set_password/', {
+        'current_password': PASSWORD, 'new_password': 'Another-Pass-2'
+    }, format='json')
+    assert response.status_code == 204, response.content
+    seeder.viewer.refresh_from_db()
+    assert seeder.viewer.first_name == 'Renamed'
+    assert seeder.viewer.followers_count == 7
+    assert seeder.viewer.check_password('Another-Pass-2')
+
+
+def test_deactivation_revokes_token(seeder, user_client):
+    assert token_queries(user_client) == (200, 1)
+    seeder.viewer.is_active = False
+    seeder.viewer.save()
+    assert token_queries(user_client)[0] == 401
+
+
+def test_profile_change_is_visible(seeder, user_client):
+    assert user_client.get(ME).json()['first_name'] == 'Viewer'
+    seeder.viewer.first_name = 'Renamed'
+    seeder.viewer.save()
+    assert user_client.get(ME).json()['first_name'] == 'Renamed'
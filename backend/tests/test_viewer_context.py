@@ -0,0 +1,87 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from foodgram.models import Recipe
+from foodgram.serializers import RecipeGetSerializer
+from foodgram.viewer import CART, FAVORITES, SUBSCRIPTIONS, get_viewer
+from users.models import User, annotate_is_subscribed
+from users.serializers import UserGetSerializer
+
+from .test_recipe_cards import make_request
+
+FLAGS = ('is_favorited', 'is_in_shopping_cart')
+
+
+def serialize(serializer_class, items, request):
+    with CaptureQueriesContext(connection) as context:
+        data = serializer_class(
+            items, many=True, context={'request': request}
+        ).data
+    return data, context.captured_queries
+
+
+def relation_queries(queries):
+    tables = ('users_subscriptions', 'foodgram_favorite',
+              'foodgram_shoppinglist')
+    return [
+        query for query in queries
+        if any(table in query['sql'] for table in tables)
+    ]
+
+
+def test_user_page_loads_subscriptions_once(seeder):
+    seeder.grow(50)
+    request = make_request(seeder.viewer)
+    users = list(User.objects.order_by('id'))
+    data, queries = serialize(UserGetSerializer, users, request)
+    expected = dict(annotate_is_subscribed(
+        User.objects.all(), seeder.viewer
+    ).values_list('id', 'is_subscribed'))
+    assert {item['id']: item['is_subscribed'] for item in data} == expected
+    assert any(expected.values())
+    assert len(queries) == 1
+
+
+def test_recipe_page_loads_each_relation_once(seeder):
+    seeder.grow(30)
+    request = make_request(seeder.viewer)
+    recipes = list(Recipe.objects.with_related(seeder.viewer))
+    expected = {
+        recipe.id: (recipe.is_favorited, recipe.is_in_shopping_cart,
+                    recipe.author.is_subscribed)
+        for recipe in recipes
+    }
+    plain = list(Recipe.objects.prefetch_related(
+        'author', 'tags', 'ingredients_recipe__ingredient'
+    ))
+    data, queries = serialize(RecipeGetSerializer, plain, request)
+    assert {
+        item['id']: (*(item[flag] for flag in FLAGS),
+                     item['author']['is_subscribed'])
+        for item in data
+    } == expected
+    assert len(relation_queries(queries)) == 3
+
+
+def test_anonymous_has_no_context(seeder):
+    request = make_request()
+    recipes = list(Recipe.objects.prefetch_related(
+        'author', 'tags', 'ingredients_recipe__ingredient'
+    ))
+    data, queries = serialize(RecipeGetSerializer, recipes, request)
+    assert get_viewer({'request': request}) is None
+    assert not relation_queries(queries)
+    assert not any(item[flag] for item in data for flag in FLAGS)
+
+
+def test_single_object_and_self(seeder):
+    seeder.grow(10)
+    request = make_request(seeder.viewer)
+    viewer = get_viewer({'request': request})
+    assert get_viewer({'request': request}) is viewer
+    with CaptureQueriesContext(connection) as context:
+        assert not viewer.has(SUBSCRIPTIONS, seeder.viewer.pk)
+        assert not viewer.has(FAVORITES, seeder.target.pk)
+        assert not viewer.has(FAVORITES, seeder.target.pk)
+        assert not viewer.has(CART, seeder.target.pk)
+    assert len(context.captured_queries) == 2
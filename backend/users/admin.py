@@ -8,7 +8,9 @@ class CustomUserAdmin(UserAdmin):
         'username',
         'email',
         'first_name',
-        'last_name'
+        'last_name',
+        'recipes_count',
+        'followers_count'
     )
     search_fields = ('username', 'email')
     list_filter = ('username', 'email')
@@ -0,0 +1,66 @@
+"""Аутентификация по токену с пользователем из кэша Django.
+
+Найденный в базе пользователь кладётся в кэш по ключу токена на
+TOKEN_CACHE_TIMEOUT секунд, а рядом — ключ токена по id пользователя,
+чтобы сбросить запись, зная только пользователя. Запись сбрасывается
+при удалении токена (выход), любом сохранении пользователя (смена
+пароля, блокировка, правка профиля) и его удалении. Локальный кэш в
+памяти ограничен по размеру и вытесняет давние записи; другие процессы
+видят сброс только при общем кэше, иначе запись живёт до таймаута.
+Поэтому request.user может быть устаревшим и целиком не сохраняется:
+запись меняет только свои поля через update_fields.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from foodgram.cache import HitCounter
+
+TOKEN_STATS = HitCounter('tokens')
+
+
+def token_key(key):
+    return f'foodgram:token:{key}'
+
+
+def user_token_key(user_id):
+    return f'foodgram:user-token:{user_id}'
+
+
+def evict(user_id, key=None):
+    keys = [user_token_key(user_id)]
+    if key is None:
+        key = cache.get(keys[0])
+    if key is not None:
+        keys.append(token_key(key))
+    cache.delete_many(keys)
+
+
+def forget_token(user_id, key=None):
+    """Сбрасывает запись сразу и ещё раз после фиксации транзакции.
+
+    Повторный сброс убирает пользователя, которого параллельный запрос
+    успел прочитать из базы до фиксации и положить в кэш.
+    """
+    evict(user_id, key)
+    transaction.on_commit(lambda: evict(user_id, key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        if settings.TOKEN_CACHE_TIMEOUT <= 0:
+            return super().authenticate_credentials(key)
+        user = cache.get(token_key(key))
+        if user is not None:
+            TOKEN_STATS.count('hits')
+            return user, Token(key=key, user=user)
+        TOKEN_STATS.count('misses')
+        user, token = super().authenticate_credentials(key)
+        cache.set_many(
+            {token_key(key): user, user_token_key(user.pk): key},
+            settings.TOKEN_CACHE_TIMEOUT
+        )
+        return user, token
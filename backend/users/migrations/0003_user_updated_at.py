@@ -0,0 +1,20 @@
+# Generated by Django 2.2.16 on 2026-10-18 09:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, help_text='Меняется при каждом сохранении профиля', verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+    ]
@@ -1,8 +1,10 @@
+from backend.core import MaintainedFieldsMixin
 from django.db import models
+from django.db.models import BooleanField, Exists, OuterRef, Value
 from django.contrib.auth.models import AbstractUser
 
 
-class User(AbstractUser):
+class User(MaintainedFieldsMixin, AbstractUser):
     email = models.EmailField(
         'Почта',
         unique=True,
@@ -24,6 +26,26 @@ class User(AbstractUser):
         max_length=150,
         help_text='Укажите фамилию'
     )
+    recipes_count = models.PositiveIntegerField(
+        'Рецептов',
+        default=0,
+        editable=False,
+        help_text='Число рецептов пользователя'
+    )
+    followers_count = models.PositiveIntegerField(
+        'Подписчиков',
+        default=0,
+        editable=False,
+        help_text='Число подписчиков пользователя'
+    )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+        db_index=True,
+        help_text='Меняется при каждом сохранении профиля'
+    )
+
+    maintained_fields = ('recipes_count', 'followers_count')
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'first_name', 'last_name')
@@ -65,3 +87,14 @@ class Subscriptions(models.Model):
 
     def __str__(self):
         return f'{self.user} подписался на {self.author}'
+
+
+def annotate_is_subscribed(queryset, user):
+    """Аннотирует пользователей флагом подписки на них."""
+    if user.is_anonymous:
+        return queryset.annotate(
+            is_subscribed=Value(False, output_field=BooleanField())
+        )
+    return queryset.annotate(is_subscribed=Exists(
+        Subscriptions.objects.filter(user=user, author=OuterRef('pk'))
+    ))
@@ -1,6 +1,11 @@
+from foodgram.pagination import KeysetPagination
 from rest_framework.pagination import PageNumberPagination
 
 
 class UserLimitPagination(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = 6
+
+
+class UserCursorPagination(KeysetPagination):
+    ordering = ('-id',)
@@ -1,12 +1,12 @@
+from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
-from django.shortcuts import get_object_or_404
+from foodgram.images import represent_variants
 from foodgram.models import Recipe
+from foodgram.viewer import SUBSCRIPTIONS, ViewerListSerializer, viewer_flag
 from rest_framework import serializers
-from users.models import Subscriptions, User
+from users.models import User
 
 INVALID_EMAIL_OR_PASSWORD = 'Неверные электронная почта или пароль'
-SUBS_VALIDATE_ERROR = 'Нельзя подписаться на самого себя!'
-ALREADY_FOLLOW = 'Вы уже подписаны!'
 INVALID_PASSWORD = 'Неверный пароль'
 
 
@@ -45,17 +45,12 @@ class UserGetSerializer(serializers.ModelSerializer):
             'last_name',
             'is_subscribed'
         )
+        list_serializer_class = ViewerListSerializer
+
+    viewer_relations = ((SUBSCRIPTIONS, 'pk'),)
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        if request is None:
-            return False
-        if request.user.is_anonymous:
-            return False
-        return Subscriptions.objects.filter(
-            user=request.user,
-            author=obj
-        ).exists()
+        return viewer_flag(self.context, SUBSCRIPTIONS, obj)
 
 
 class TokenSerializer(serializers.Serializer):
@@ -92,6 +87,10 @@ class UserChangePassSerializer(serializers.Serializer):
 
 
 class RecipeUserSerializer(serializers.ModelSerializer):
+    image_variants = serializers.SerializerMethodField(
+        method_name='get_image_variants',
+        read_only=True
+    )
 
     class Meta:
         model = Recipe
@@ -99,6 +98,7 @@ class RecipeUserSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'image',
+            'image_variants',
             'cooking_time',
         )
         read_only_fields = (
@@ -108,19 +108,43 @@ class RecipeUserSerializer(serializers.ModelSerializer):
             'cooking_time',
         )
 
+    def get_image_variants(self, obj):
+        return represent_variants(obj, self.context.get('request'))
+
+
+def get_recipes_limit(request):
+    """Число рецептов автора из recipes_limit в пределах настроек."""
+    try:
+        limit = int(request.query_params['recipes_limit'])
+    except (KeyError, ValueError):
+        return settings.SUBSCRIPTION_RECIPES_LIMIT
+    if limit <= 0:
+        return settings.SUBSCRIPTION_RECIPES_LIMIT
+    return min(limit, settings.SUBSCRIPTION_RECIPES_MAX_LIMIT)
+
+
+class SubsListSerializer(ViewerListSerializer):
+
+    def to_representation(self, data):
+        authors = list(data)
+        request = self.context.get('request')
+        if request and not request.user.is_anonymous:
+            self.child.recipes_by_author = Recipe.objects.latest_by_author(
+                [author.id for author in authors],
+                get_recipes_limit(request)
+            )
+        return super().to_representation(authors)
+
 
 class SubsSerializer(UserGetSerializer):
     recipes = serializers.SerializerMethodField(
         method_name='get_recipes',
         read_only=True
     )
-    recipes_count = serializers.SerializerMethodField(
-        method_name='get_recipes_count',
-        read_only=True
-    )
 
     class Meta(UserGetSerializer.Meta):
         model = User
+        list_serializer_class = SubsListSerializer
         fields = (
             'id',
             'username',
@@ -137,6 +161,7 @@ class SubsSerializer(UserGetSerializer):
             'email',
             'first_name',
             'last_name',
+            'recipes_count',
         )
 
     def get_recipes(self, obj):
@@ -144,49 +169,11 @@ class SubsSerializer(UserGetSerializer):
         if not request or request.user.is_anonymous:
             return False
         context = {'request': request}
-        recipes_limit = request.query_params.get('recipes_limit')
-        if recipes_limit:
-            recipes = obj.recipes.all()
-            recipes = recipes[:int(recipes_limit)]
-        else:
-            recipes = obj.recipes.all()
-        return RecipeUserSerializer(recipes, many=True, context=context).data
-
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
-
-class SubscribeSerializer(serializers.ModelSerializer):
-    author = serializers.PrimaryKeyRelatedField(read_only=True)
-    user = serializers.PrimaryKeyRelatedField(read_only=True)
-
-    class Meta:
-        model = Subscriptions
-        fields = ('user', 'author')
-
-    def validate(self, data):
-        user = get_object_or_404(
-            User, username=self.context['request'].user
-        )
-        author = get_object_or_404(
-            User,
-            id=self.context['view'].kwargs.get('user_id')
-        )
-        if user == author:
-            raise serializers.ValidationError(SUBS_VALIDATE_ERROR)
-        already_subs = Subscriptions.objects.filter(
-            user=user,
-            author=author
-        ).exists()
-        if already_subs:
-            raise serializers.ValidationError(ALREADY_FOLLOW)
-        return data
-
-    def to_representation(self, instance):
-        request = self.context.get('request')
-        context = {'request': request}
-        instance = get_object_or_404(
-            User,
-            id=self.context['view'].kwargs.get('user_id')
-        )
-        return SubsSerializer(instance, context=context).data
+        recipes_by_author = getattr(self, 'recipes_by_author', None)
+        if recipes_by_author is None or obj.id not in recipes_by_author:
+            recipes_by_author = Recipe.objects.latest_by_author(
+                [obj.id], get_recipes_limit(request)
+            )
+        return RecipeUserSerializer(
+            recipes_by_author[obj.id], many=True, context=context
+        ).data
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from foodgram.relations import relation_changed
+from rest_framework.authtoken.models import Token
+
+from users.authentication import forget_token
+from users.models import Subscriptions, User
+
+
+@receiver(post_save, sender=Subscriptions)
+def subscription_created(sender, instance, created, **kwargs):
+    if created:
+        relation_changed(sender, instance.user_id, instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Subscriptions)
+def subscription_deleted(sender, instance, **kwargs):
+    relation_changed(sender, instance.user_id, instance.author_id, -1)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    forget_token(instance.user_id, instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    forget_token(instance.pk)
@@ -1,31 +1,32 @@
 from backend.core import HTTPMethod
 from django.contrib.auth.hashers import make_password
+from django.db.models import Count, Max
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import (exceptions, generics, mixins, status, views,
+from rest_framework import (exceptions, filters, generics, status, views,
                             viewsets)
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-
-from users.models import Subscriptions, User
-from users.pagination import UserLimitPagination
+from rest_framework.settings import api_settings
+
+from foodgram.conditional import ConditionalGetMixin, relation_version
+from foodgram.pagination import CursorPaginationMixin
+from foodgram.relations import add_relations, remove_relations
+from foodgram.throttling import ConcurrencyLimitMixin
+from users.models import Subscriptions, User, annotate_is_subscribed
+from users.pagination import UserCursorPagination, UserLimitPagination
 from users.permissions import CurrentUserOrAdmin
-from users.serializers import (SubscribeSerializer, SubsSerializer,
-                               TokenSerializer, UserChangePassSerializer,
-                               UserGetSerializer, UserPostSerializer)
-
-UNFOLLOW_ERROR = 'Пользователя нет в подписках'
+from users.serializers import (SubsSerializer, TokenSerializer,
+                               UserChangePassSerializer, UserGetSerializer,
+                               UserPostSerializer)
 
+SUBS_VALIDATE_ERROR = 'Нельзя подписаться на самого себя!'
 
-class CreateDestroyModelViewSet(mixins.CreateModelMixin,
-                                mixins.DestroyModelMixin,
-                                viewsets.GenericViewSet):
-    pass
 
-
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = UserGetSerializer
     permission_classes = (AllowAny,)
     pagination_class = UserLimitPagination
@@ -42,6 +43,31 @@ class UserViewSet(viewsets.ModelViewSet):
             return UserChangePassSerializer
         return UserGetSerializer
 
+    def get_list_version(self):
+        totals = self.filter_queryset(self.get_queryset()).order_by(
+        ).aggregate(count=Count('pk'), updated=Max('updated_at'))
+        version = [totals['count'], totals['updated']]
+        if not self.request.user.is_anonymous:
+            version += relation_version(
+                self.request.user, ((Subscriptions, 'user'),)
+            )
+        return version, None
+
+    def get_detail_version(self):
+        pk = (
+            self.request.user.pk if self.action == 'me'
+            else self.kwargs[self.lookup_field]
+        )
+        try:
+            row = annotate_is_subscribed(
+                User.objects.filter(pk=pk), self.request.user
+            ).values_list('updated_at', 'is_subscribed').first()
+        except (TypeError, ValueError):
+            return None
+        if row is None:
+            return None
+        return list(row), row[0]
+
     def perform_create(self, serializer):
         password = make_password(serializer.initial_data['password'])
         serializer.save(password=password)
@@ -66,62 +92,62 @@ class UserViewSet(viewsets.ModelViewSet):
     def set_password(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        self.get_instance().set_password(
-            serializer.validated_data['new_password']
-        )
-        self.get_instance().save()
+        user = self.get_instance()
+        user.set_password(serializer.validated_data['new_password'])
+        user.save(update_fields=('password',))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class SubscriptionsView(generics.ListAPIView):
+class SubscriptionsView(CursorPaginationMixin, generics.ListAPIView):
     pagination_class = UserLimitPagination
+    cursor_pagination_class = UserCursorPagination
     permission_classes = (IsAuthenticated,)
     serializer_class = SubsSerializer
     filter_backends = (
         DjangoFilterBackend,
+        filters.OrderingFilter,
     )
+    ordering_fields = ('id', 'recipes_count', 'followers_count')
 
     def get_queryset(self):
-        return User.objects.filter(
-            following__user=self.request.user
+        return annotate_is_subscribed(
+            User.objects.filter(following__user=self.request.user),
+            self.request.user
         )
 
-    def get(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
-
 
-class SubscribeViewSet(CreateDestroyModelViewSet):
-    serializer_class = SubscribeSerializer
+class SubscribeViewSet(viewsets.GenericViewSet):
+    """Подписка на автора; запись идемпотентна, как у избранного."""
+    serializer_class = SubsSerializer
     permission_classes = (IsAuthenticated,)
     queryset = User.objects.all()
-    pagination_class = UserLimitPagination
 
-    def perform_create(self, serializer):
-        user = get_object_or_404(User, username=self.request.user)
-        author = get_object_or_404(User, id=self.kwargs.get('user_id'))
-        serializer.save(user=user, author=author)
+    def create(self, request, *args, **kwargs):
+        author = get_object_or_404(User, id=self.kwargs['user_id'])
+        if author == request.user:
+            raise exceptions.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [SUBS_VALIDATE_ERROR]}
+            )
+        added = add_relations(Subscriptions, request.user, [author.pk])
+        author.is_subscribed = True
+        return Response(
+            self.get_serializer(author).data,
+            status=status.HTTP_201_CREATED if added else status.HTTP_200_OK
+        )
 
     def delete(self, request, *args, **kwargs):
-        author = get_object_or_404(User, id=self.kwargs.get('user_id'))
-        subscribe = Subscriptions.objects.filter(
-            user=self.request.user,
-            author=author
-        )
-        if not subscribe.exists():
-            raise exceptions.ValidationError(UNFOLLOW_ERROR)
-        subscribe.delete()
+        author_id = int(self.kwargs['user_id'])
+        removed = remove_relations(Subscriptions, request.user, [author_id])
+        if not removed and not User.objects.filter(id=author_id).exists():
+            raise Http404
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class TokenCreateView(generics.CreateAPIView):
+class TokenCreateView(ConcurrencyLimitMixin, generics.CreateAPIView):
     serializer_class = TokenSerializer
     permission_classes = (AllowAny,)
+    throttle_scope = 'login'
+    concurrency_scope = 'login'
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)